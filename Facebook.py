@@ -1,280 +1,279 @@
-import asyncio
 import random
 import sys
 import os
-import json
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from waits import wait_for_locator, wait_for_dom_quiet, wait_for_network_idle
+from locators import first_visible, use_selector_stats
+from resources import record_page_load
+from diagnostics import use_diagnostics, capture_diagnostics
+from telemetry import use_telemetry, span
+from engine import Platform, run_cli, script_entry_points
 
 # === CONFIGURATION ===
 AGENT_NAME = "facebook_agent"
 USER_DATA_DIR = f"./user_data/{AGENT_NAME}"
 SESSION_FILE = f"{USER_DATA_DIR}/session_storage.json"
+# Automation session: profile (persistent USER_DATA_DIR) | storage (fresh context from SESSION_FILE), see engine.py
+SESSION_MODE = os.getenv("SESSION_MODE", "profile")
+
+# Site root; point FACEBOOK_BASE_URL elsewhere (e.g. benchmark.py's fixture server) to run offline
+FACEBOOK_URL = os.getenv("FACEBOOK_BASE_URL", "https://www.facebook.com/").rstrip("/") + "/"
 
 MIN_DELAY = 30    # seconds
 MAX_DELAY = 60
 
-COMMENT_OPTIONS = ["🔥🔥🔥", "Love this!", "Amazing post!", "💯", "So good!"]
+LOGIN_CACHE_SECONDS = 600    # trust a verified login this long before checking again (0 disables)
+LOGIN_STATE_FILE = f"{USER_DATA_DIR}/login_state.json"
+SESSION_COOKIES = ("c_user", "xs")    # all must be present and unexpired for the cookie fast path
 
-# === LOGIN DETECTION ===
-async def wait_until_logged_in(page):
-    print("[🔐] Checking if we're logged in...")
-    while True:
-        try:
-            await page.goto("https://www.facebook.com/", timeout=60000)
-            await page.wait_for_timeout(5000)
-
-            cookies = await page.context.cookies()
-            if any(c['name'] == 'c_user' for c in cookies):
-                print("[✅] Found Facebook session cookie. Assuming logged in.")
-                return
-
-            selectors = [
-                'div[aria-label="Your profile"]',
-                'div[aria-label="Home"]',
-                'div[aria-label="Create a post"]',
-                'img[alt*="profile picture"]',
-                'a[href*="/me/"]',
-            ]
-            
-            is_logged_in_via_ui = False
-            for selector in selectors:
-                try:
-                    el = page.locator(selector).first
-                    await el.wait_for(state="visible", timeout=3000) 
-                    if await el.is_visible():
-                        print(f"[✅] Detected logged-in session via `{selector}`.")
-                        is_logged_in_via_ui = True
-                        break
-                except PlaywrightTimeoutError:
-                    continue
-                except Exception as e:
-                    print(f"[⚠️] Error checking selector `{selector}`: {e}")
-                    continue
+# Learned selector order / pruning for the fallback lists (export: python locators.py <file>)
+SELECTOR_STATS_FILE = f"{USER_DATA_DIR}/selector_stats.json"
 
-            if is_logged_in_via_ui:
-                return
+# Request filtering for post/inbox runs: off | lean | safe (see resources.py)
+RESOURCE_FILTER_MODE = os.getenv("RESOURCE_FILTER", "off")
+RESOURCE_STATS_FILE = f"{USER_DATA_DIR}/resource_stats.json"
 
-            if "facebook.com/login" in page.url or "facebook.com/checkpoint" in page.url:
-                print("[🚫] Redirected to login/checkpoint page. Manual login required.")
-            
-        except PlaywrightTimeoutError:
-            print("[⏳] Page navigation timed out during login check. Retrying...")
-        except Exception as e:
-            print(f"[❌] An error occurred during login detection: {e}")
-            
-        print("[⏳] Still waiting for manual login... (Browser open)")
-        await page.screenshot(path="facebook_login_wait.png")
-        await page.wait_for_timeout(5000)
-
-# === MANUAL MODE ===
-async def manual_mode():
-    print("[🧍] Launching browser in manual mode for Facebook...")
-    os.makedirs(USER_DATA_DIR, exist_ok=True)
-    async with async_playwright() as p:
-        browser = await p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            viewport={"width": 1280, "height": 800},
-        )
-        page = await browser.new_page()
-        await page.goto("https://www.facebook.com/", timeout=0)
-        print("[✅] Please log in manually to Facebook, then close the browser tab.")
-        while len(browser.pages) > 0:
-            await asyncio.sleep(2)
-        print("[💾] Saving cookies and localStorage...")
-        storage_state = await browser.storage_state()
-        with open(SESSION_FILE, "w") as f:
-            json.dump(storage_state, f, indent=2)
-        print(f"[✅] Session saved to {SESSION_FILE}")
-        await browser.close()
+# Browser runtime profile: headed | headless | minimal (see runtime.py); manual login is always headed
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "headed")
+RUNTIME_STATS_FILE = f"{USER_DATA_DIR}/runtime_stats.json"    # per-profile CPU/RSS (report: python runtime.py <file>)
+PROFILE_BUNDLES_DIR = f"{USER_DATA_DIR}/profiles"    # --profile runs: trace, Python profile, CDP metrics
+
+# Which posts were already liked/commented on; handled posts are skipped before launching (see ledger.py)
+LEDGER_FILE = f"{USER_DATA_DIR}/post_ledger.sqlite3"
+
+# Failure snapshots: jpeg | dom | off, kept in a size-capped ring directory (see diagnostics.py)
+DIAGNOSTICS_MODE = os.getenv("DIAGNOSTICS", "jpeg")
+DIAGNOSTICS_DIR = f"{USER_DATA_DIR}/diagnostics"
+DIAGNOSTICS_MAX_MB = 50
+DIAGNOSTICS_MIN_INTERVAL = 30    # seconds between snapshots of the same job + phase
+
+# Per-phase timing spans as JSON lines (summary: python telemetry.py <file>); TELEMETRY=0 disables
+TELEMETRY_FILE = f"{USER_DATA_DIR}/telemetry.jsonl"
+
+# Point the shared helpers at this agent's files (called by the entry point, and
+# re-applied per job by engine.py; importing this module doesn't touch them)
+def use_agent_settings():
+    use_selector_stats(SELECTOR_STATS_FILE)
+    use_diagnostics(DIAGNOSTICS_DIR, DIAGNOSTICS_MODE, DIAGNOSTICS_MAX_MB, DIAGNOSTICS_MIN_INTERVAL)
+    use_telemetry(TELEMETRY_FILE if os.getenv("TELEMETRY", "1") != "0" else None)
+
+# Homepage UI that only shows when logged in (login probe)
+LOGIN_UI_SELECTORS = [
+    'div[aria-label="Your profile"]',
+    'div[aria-label="Home"]',
+    'div[aria-label="Create a post"]',
+    'img[alt*="profile picture"]',
+    'a[href*="/me/"]',
+]
+LOGIN_PATHS = ("login", "checkpoint")    # under FACEBOOK_URL: login wall / security checkpoint
+
+# Readiness signal after navigating to a post: any like/unlike control or comment box
+POST_READY_SELECTOR = (
+    'div[role="button"][aria-label="Tetszik"], div[role="button"][aria-label="Like"], '
+    'div[aria-label="Tetszik eltávolítása"], div[aria-label="Unlike"], '
+    'div[role="textbox"][contenteditable="true"]'
+)
+
+COMMENT_OPTIONS = ["🔥🔥🔥", "Love this!", "Amazing post!", "💯", "So good!"]
 
 # === AUTOMATION MODE ===
-async def interact_with_post(url: str):
-    print(f"[🚀] Launching automation bot for {AGENT_NAME} on Facebook")
-    os.makedirs(USER_DATA_DIR, exist_ok=True)
-    async with async_playwright() as p:
-        browser = await p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            viewport={"width": 1280, "height": 800},
-        )
-        page = await browser.new_page()
-        await wait_until_logged_in(page)
-        print(f"[📷] Navigating to Facebook post: {url}")
-        await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        await page.wait_for_timeout(5000)
-
-        if not page.url.startswith("https://www.facebook.com/"):
-            print(f"[⚠️] Unexpected redirect. Still on: {page.url}")
-            await page.screenshot(path="facebook_redirect_error.png")
-            await browser.close()
-            return
-        else:
-            print("[📌] On Facebook post URL.")
+# Like + comment on one post using an already logged-in page. Returns a result record.
+async def process_post(page, url: str, skip_comment=False):
+    print(f"[📷] Navigating to Facebook post: {url}")
+    nav_span = span("navigation")
+    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+    await record_page_load(page, "post")
 
-        delay = random.randint(MIN_DELAY, MAX_DELAY)
-        print(f"[🕒] Sleeping {delay} seconds before interacting...")
+    # Login wall / checkpoint URLs are on FACEBOOK_URL too, so check them first
+    if PLATFORM.on_login_page(page.url):
+        nav_span.end(outcome="login_redirect")
+        print(f"[⚠️] Redirected to the login page: {page.url}")
+        await capture_diagnostics(page, "login_redirect")
+        PLATFORM.clear_login_state()  # the cached login is stale; the next job re-probes
+        return {"status": "redirected", "reason": "login", "final_url": page.url}
+
+    ready = await wait_for_locator(page, POST_READY_SELECTOR, 5000, label="post controls")
+    nav_span.end(outcome="redirected" if not page.url.startswith(FACEBOOK_URL) else ("ready" if ready else "not_ready"))
+
+    if not page.url.startswith(FACEBOOK_URL):
+        print(f"[⚠️] Unexpected redirect. Still on: {page.url}")
+        await capture_diagnostics(page, "redirect")
+        return {"status": "redirected", "final_url": page.url}
+    else:
+        print("[📌] On Facebook post URL.")
+
+    delay = random.randint(MIN_DELAY, MAX_DELAY)
+    print(f"[🕒] Sleeping {delay} seconds before interacting...")
+    with span("delay", seconds=delay):
         await page.wait_for_timeout(delay * 1000)
 
-        # === LIKE SECTION ===
-        try:
-            print("[🤍] Checking if Facebook post is already liked...")
-            
-            # Selectors for the "liked" state (button has changed to "Unlike" or icon has changed)
-            liked_state_locators = [
-                'div[aria-label="Tetszik eltávolítása"]', # Hungarian for "Remove Like"
-                'div[aria-label="Unlike"]',              # English for "Unlike"
-                # Check for the specific icon background position that indicates liked
-                'div[role="button"] i[data-visualcompletion="css-img"][style*="background-position: 0px -714px;"]',
-                # Check for the blue text color on the 'Tetszik' span
-                'span[data-ad-rendering-role="tetszik_button"][style*="color: var(--reaction-like, #0866FF);"]'
+    result = {"status": "done", "already_liked": False, "liked": False, "commented": False, "delay_s": delay}
+
+    # === LIKE SECTION ===
+    like_span = span("like")
+    try:
+        print("[🤍] Checking if Facebook post is already liked...")
+        
+        # Selectors for the "liked" state (button has changed to "Unlike" or icon has changed)
+        liked_state_locators = [
+            'div[aria-label="Tetszik eltávolítása"]', # Hungarian for "Remove Like"
+            'div[aria-label="Unlike"]',              # English for "Unlike"
+            # Check for the specific icon background position that indicates liked
+            'div[role="button"] i[data-visualcompletion="css-img"][style*="background-position: 0px -714px;"]',
+            # Check for the blue text color on the 'Tetszik' span
+            'span[data-ad-rendering-role="tetszik_button"][style*="color: var(--reaction-like, #0866FF);"]'
+        ]
+
+        liked_selector, _ = await first_visible(page, liked_state_locators, 2000, label="liked state", group="liked_state")
+        is_already_liked = liked_selector is not None
+        if is_already_liked:
+            print(f"[❤️] Post already liked (detected via: {liked_selector}).")
+
+        result["already_liked"] = result["liked"] = is_already_liked
+        if not is_already_liked:
+            print("[🤍] Facebook post not liked yet. Attempting to click the 'Like' button...")
+            clicked_successfully = False
+            # Selectors for the "unlike" state (i.e., the button to click to like)
+            # Prioritize specific combination of role="button" and aria-label/span text
+            like_button_locators = [
+                # Most specific: role="button" with aria-label matching "Tetszik" or "Like"
+                'div[role="button"][aria-label="Tetszik"]',
+                'div[role="button"][aria-label="Like"]',
+                # Less specific but still good: role="button" containing the 'Tetszik' span without color
+                'div[role="button"]:has(span[data-ad-rendering-role="tetszik_button"][style=""])',
+                'div[role="button"]:has(span[data-ad-rendering-role="tetszik_button"]):not(:has(span[style*="color: var(--reaction-like"]'
             ]
 
-            is_already_liked = False
-            for locator_str in liked_state_locators:
+            like_button_names = {
+                'div[role="button"][aria-label="Tetszik"], div[role="button"][aria-label="Like"]': "Like Button (aria-label Tetszik/Like)",
+                'div[role="button"]:has(span[data-ad-rendering-role="tetszik_button"][style=""]), div[role="button"]:has(span:has-text("Like"):not([style*="color"]))': "Like Button (Text Tetszik/Like without color)",
+            }
+
+            like_selector, like_button_element = await first_visible(page, list(like_button_names), 5000, label="like button", group="like_button")
+            if like_button_element is not None:
+                name = like_button_names[like_selector]
                 try:
-                    # Use wait_for for visibility with timeout, then check is_visible
-                    liked_el = page.locator(locator_str).first
-                    await liked_el.wait_for(state="visible", timeout=2000) 
-                    if await liked_el.is_visible(): # Now this will work correctly
-                        is_already_liked = True
-                        print(f"[❤️] Post already liked (detected via: {locator_str}).")
-                        break
-                except PlaywrightTimeoutError:
-                    continue
+                    await like_button_element.click(force=True)
+                    print(f"[❤️] Liked the Facebook post by clicking: {name}")
+                    clicked_successfully = True
+                    result["liked"] = True
+                    # After clicking, confirm the like by checking for the 'liked' state
+                    await wait_for_dom_quiet(page, 2000, label="like state update")
+                    confirm_selector, _ = await first_visible(page, liked_state_locators, 3000, label="like confirmation", group="liked_state")
+                    if confirm_selector is not None:
+                        print(f"[✅] Confirmed like by seeing '{confirm_selector}'.")
+                    else:
+                        print("[⚠️] Post was clicked but could not confirm liked state.")
                 except Exception as e:
-                    print(f"[⚠️] Error checking liked state with locator `{locator_str}`: {e}")
-
-            if not is_already_liked:
-                print("[🤍] Facebook post not liked yet. Attempting to click the 'Like' button...")
-                clicked_successfully = False
-                # Selectors for the "unlike" state (i.e., the button to click to like)
-                # Prioritize specific combination of role="button" and aria-label/span text
-                like_button_locators = [
-                    # Most specific: role="button" with aria-label matching "Tetszik" or "Like"
-                    'div[role="button"][aria-label="Tetszik"]',
-                    'div[role="button"][aria-label="Like"]',
-                    # Less specific but still good: role="button" containing the 'Tetszik' span without color
-                    'div[role="button"]:has(span[data-ad-rendering-role="tetszik_button"][style=""])',
-                    'div[role="button"]:has(span[data-ad-rendering-role="tetszik_button"]):not(:has(span[style*="color: var(--reaction-like"]'
-                ]
-
-                for name, locator_str in [
-                    ("Like Button (aria-label Tetszik/Like)", 'div[role="button"][aria-label="Tetszik"], div[role="button"][aria-label="Like"]'),
-                    ("Like Button (Text Tetszik/Like without color)", 'div[role="button"]:has(span[data-ad-rendering-role="tetszik_button"][style=""]), div[role="button"]:has(span:has-text("Like"):not([style*="color"]))')
-                ]:
-                    try:
-                        like_button_element = page.locator(locator_str).first
-                        await like_button_element.wait_for(state="visible", timeout=5000)
-                        await like_button_element.click(force=True)
-                        print(f"[❤️] Liked the Facebook post by clicking: {name}")
-                        clicked_successfully = True
-                        # After clicking, confirm the like by checking for the 'liked' state
-                        await page.wait_for_timeout(2000) # Small pause
-                        is_now_liked = False
-                        for liked_locator_str_confirm in liked_state_locators:
-                            try:
-                                await page.locator(liked_locator_str_confirm).first.wait_for(state="visible", timeout=3000)
-                                is_now_liked = True
-                                print(f"[✅] Confirmed like by seeing '{liked_locator_str_confirm}'.")
-                                break
-                            except PlaywrightTimeoutError:
-                                continue
-                        if not is_now_liked:
-                            print("[⚠️] Post was clicked but could not confirm liked state.")
-                        break # Stop trying to click if one succeeded
-                    except PlaywrightTimeoutError:
-                        print(f"[⚠️] Like button '{name}' not found or visible. Trying next...")
-                    except Exception as e:
-                        print(f"[❌] Click on '{name}' failed: {e}")
-                
-                if not clicked_successfully:
-                    print("[❌] Failed to find and click any 'Like' button.")
-                    await page.screenshot(path="facebook_like_fail.png")
-
-        except Exception as e:
-            print(f"[❌] Facebook Like process failed: {e}")
-            await page.screenshot(path="facebook_like_error.png")
-
-        # === COMMENT SECTION (ALWAYS RUNS) ===
-        try:
-            comment = random.choice(COMMENT_OPTIONS)
-            print(f"[💬] Preparing to comment on Facebook post: {comment}")
+                    print(f"[❌] Click on '{name}' failed: {e}")
+            
+            if not clicked_successfully:
+                print("[❌] Failed to find and click any 'Like' button.")
+                await capture_diagnostics(page, "like_fail")
+
+    except Exception as e:
+        print(f"[❌] Facebook Like process failed: {e}")
+        await capture_diagnostics(page, "like_error")
+    like_span.end(outcome="already_liked" if result["already_liked"] else ("liked" if result["liked"] else "failed"))
+
+    # === COMMENT SECTION (UNLESS THE POST ALREADY HAS OUR COMMENT) ===
+    if skip_comment:
+        print("[⏭️] Already commented on this post (see ledger.py). Skipping the comment.")
+        result["comment_skipped"] = True
+        await wait_for_network_idle(page, 2000, label="pending requests")
+        return result
+
+    try:
+        comment = random.choice(COMMENT_OPTIONS)
+        print(f"[💬] Preparing to comment on Facebook post: {comment}")
+        
+        comment_box_locators = [
+            'div[aria-label="Hozzászólás írása…"][contenteditable="true"][role="textbox"]',
+            'div[aria-label="Write a comment…"][contenteditable="true"][role="textbox"]',
+            'div[role="textbox"][contenteditable="true"]',
+            'textarea[aria-label*="comment"]',
+            'textarea[placeholder*="comment"]',
+        ]
+        
+        async def is_interactive(locator):
+            return await locator.is_editable() or await locator.is_enabled()
+
+        comment_selector, comment_box = await first_visible(page, comment_box_locators, 5000, label="comment box", accept=is_interactive, group="comment_box")
+        if comment_box:
+            print(f"[✅] Found comment box using selector: {comment_selector}")
+
+        if comment_box:
+            with span("typing", chars=len(comment)):
+                await comment_box.click(force=True)
+                await wait_for_dom_quiet(page, 1000, label="comment box focus", quiet_ms=200)
+                await comment_box.fill("")
+                await page.keyboard.type(comment, delay=100)
             
-            comment_box_locators = [
-                'div[aria-label="Hozzászólás írása…"][contenteditable="true"][role="textbox"]',
-                'div[aria-label="Write a comment…"][contenteditable="true"][role="textbox"]',
-                'div[role="textbox"][contenteditable="true"]',
-                'textarea[aria-label*="comment"]',
-                'textarea[placeholder*="comment"]',
+            post_button_locators = [
+                'div[aria-label="Post"]',
+                'div[aria-label="Comment"]',
+                'div[role="button"]:has(span:has-text("Post"))',
+                'div[role="button"]:has(span:has-text("Comment"))',
             ]
             
-            comment_box = None
-            for selector in comment_box_locators:
-                current_locator = page.locator(selector).first
+            post_button_found = False
+            post_btn_selector, post_button = await first_visible(page, post_button_locators, 2000, label="comment post button", group="post_button")
+            if post_button is not None:
                 try:
-                    await current_locator.wait_for(state="visible", timeout=5000)
-                    if await current_locator.is_editable() or await current_locator.is_enabled():
-                        comment_box = current_locator
-                        print(f"[✅] Found comment box using selector: {selector}")
-                        break
-                except PlaywrightTimeoutError:
-                    print(f"[ℹ️] Comment box not found with selector: {selector}. Trying next...")
+                    await post_button.click(force=True)
+                    print(f"[✅] Clicked 'Post' button for comment.")
+                    post_button_found = True
                 except Exception as e:
-                    print(f"[⚠️] Error checking selector {selector}: {e}")
+                    print(f"[⚠️] Error clicking post button with selector {post_btn_selector}: {e}")
 
-            if comment_box:
-                await comment_box.click(force=True)
-                await page.wait_for_timeout(1000)
-                await comment_box.fill("")
-                await page.keyboard.type(comment, delay=100)
-                
-                post_button_locators = [
-                    'div[aria-label="Post"]',
-                    'div[aria-label="Comment"]',
-                    'div[role="button"]:has(span:has-text("Post"))',
-                    'div[role="button"]:has(span:has-text("Comment"))',
-                ]
-                
-                post_button_found = False
-                for post_btn_selector in post_button_locators:
-                    try:
-                        post_button = page.locator(post_btn_selector).first
-                        await post_button.wait_for(state="visible", timeout=2000)
-                        await post_button.click(force=True)
-                        print(f"[✅] Clicked 'Post' button for comment.")
-                        post_button_found = True
-                        break
-                    except PlaywrightTimeoutError:
-                        continue
-                    except Exception as e:
-                        print(f"[⚠️] Error clicking post button with selector {post_btn_selector}: {e}")
-
-                if not post_button_found:
-                    print("[ℹ️] No explicit 'Post' button found. Attempting to press Enter.")
-                    await page.keyboard.press("Enter")
-
-                print(f"[✅] Commented: {comment}")
-                await page.wait_for_timeout(3000)
-            else:
-                print("[❌] Could not find an interactive comment box after trying all selectors.")
-                await page.screenshot(path="facebook_comment_box_not_found.png")
-        except Exception as e:
-            print(f"[❌] Facebook Comment failed: {e}")
-            await page.screenshot(path="facebook_comment_error.png")
-
-        await page.wait_for_timeout(2000)
-        await browser.close()
+            if not post_button_found:
+                print("[ℹ️] No explicit 'Post' button found. Attempting to press Enter.")
+                await page.keyboard.press("Enter")
+
+            print(f"[✅] Commented: {comment}")
+            result["commented"] = True
+            result["comment"] = comment
+            await wait_for_dom_quiet(page, 3000, label="comment to post")
+        else:
+            print("[❌] Could not find an interactive comment box after trying all selectors.")
+            await capture_diagnostics(page, "comment_box_not_found")
+    except Exception as e:
+        print(f"[❌] Facebook Comment failed: {e}")
+        await capture_diagnostics(page, "comment_error")
+
+    await wait_for_network_idle(page, 2000, label="pending requests")
+    return result
+
+# === PLATFORM ADAPTER ===
+# Login, manual mode, worker/batch runs and the command line live in engine.py.
+PLATFORM = Platform(
+    name="facebook",
+    label="Facebook",
+    agent_name=AGENT_NAME,
+    base_url=FACEBOOK_URL,
+    user_data_dir=USER_DATA_DIR,
+    session_file=SESSION_FILE,
+    login_state_file=LOGIN_STATE_FILE,
+    login_cache_seconds=LOGIN_CACHE_SECONDS,
+    session_cookies=SESSION_COOKIES,
+    login_ui_selectors=LOGIN_UI_SELECTORS,
+    login_paths=LOGIN_PATHS,
+    browser_profile=BROWSER_PROFILE,
+    resource_filter_mode=RESOURCE_FILTER_MODE,
+    resource_stats_file=RESOURCE_STATS_FILE,
+    runtime_stats_file=RUNTIME_STATS_FILE,
+    profile_bundles_dir=PROFILE_BUNDLES_DIR,
+    ledger_file=LEDGER_FILE,
+    process_post=process_post,
+    session_mode=SESSION_MODE,
+    activate=use_agent_settings,
+)
+
+# === COMPATIBILITY ===
+# launch_browser, the login-state helpers, wait_until_logged_in, manual_mode,
+# interact_with_post, run_jobs, worker_mode and batch_mode (see engine.script_entry_points)
+globals().update(script_entry_points(PLATFORM))
 
 # === ENTRYPOINT ===
 if __name__ == "__main__":
-    if len(sys.argv) == 2 and sys.argv[1] == "--manual":
-        asyncio.run(manual_mode())
-    elif len(sys.argv) == 2 and sys.argv[1].startswith("https://www.facebook.com/"):
-        post_url = sys.argv[1]
-        asyncio.run(interact_with_post(post_url))
-    else:
-        print("Usage:")
-        print("  Manual login mode: python fb_bot.py --manual")
-        print("  Auto post mode:    python fb_bot.py <facebook_post_url>")
-        sys.exit(1)
+    use_agent_settings()
+    run_cli(PLATFORM, sys.argv[1:])
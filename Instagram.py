@@ -4,17 +4,64 @@ import sys
 import os
 import json
 import re # Import regex module
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import time
+import hashlib
+import subprocess
+from urllib.parse import urljoin
+import sqlite3
+from collections import OrderedDict
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from waits import wait_for_locator, wait_for_url, wait_for_dom_quiet, wait_for_network_idle
+from locators import first_visible, use_selector_stats
+from resources import record_page_load
+from diagnostics import use_diagnostics, capture_diagnostics
+from telemetry import use_telemetry, span, record_span
+from engine import Platform, run_cli, run_single_job, take_profile_flag, script_entry_points
+from thread_state import ThreadStateStore
+from captions import CaptionCache, caption_from_page
+from ledger import canonical_post_id
 
 # --- TOGETHER AI INTEGRATION ---
-from dotenv import load_dotenv
-from together import Together
+# Nothing in this section runs at import time. The .env file, the Together SDK,
+# the prompt files and the response cache are all set up on first use, so
+# `--manual` runs and tools that only import helpers start fast without credentials.
+LLM_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
+
+_ai_config = None
+
+def ai_config():
+    global _ai_config
+    if _ai_config is None:
+        from dotenv import load_dotenv
+        load_dotenv() # Load environment variables from .env file
+        _ai_config = {
+            "api_key": os.getenv("TOGETHER_API_KEY"),
+            "timeout": float(os.getenv("LLM_TIMEOUT", "30")),                       # seconds per request
+            "max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "2")),          # parallel requests in flight
+            "cache_ttl": int(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600))),        # seconds
+            "cache_max_entries": int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000")),    # on-disk rows
+            "comment_batch_size": int(os.getenv("AI_COMMENT_BATCH_SIZE", "10")),    # captions per batched request
+        }
+    return _ai_config
+
+_client = None
+
+# Together AI client (async, so LLM calls don't block the Playwright event loop)
+def get_client():
+    global _client
+    if _client is None:
+        from together import AsyncTogether
+        _client = AsyncTogether(api_key=ai_config()["api_key"])
+    return _client
 
-load_dotenv() # Load environment variables from .env file
-API_KEY = os.getenv("TOGETHER_API_KEY")
+# Created lazily so it binds to the event loop started by asyncio.run()
+_llm_semaphore = None
 
-# Initialize Together AI client
-client = Together(api_key=API_KEY)
+def get_llm_semaphore():
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(max(1, ai_config()["max_concurrency"]))
+    return _llm_semaphore
 
 # Function to load prompts from files
 def load_prompt(path):
@@ -34,20 +81,176 @@ def load_prompt(path):
             file.write(default_content)
         return default_content
 
-# Load specific prompts for different contexts
-SYSTEM_PROMPT_COMMENT = load_prompt("prompt_instagram_comment.txt")
-SYSTEM_PROMPT_MESSAGE_REPLY = load_prompt("prompt_instagram_message.txt")
+# Specific prompts for different contexts, loaded on first use
+PROMPT_FILES = {
+    "comment": "prompt_instagram_comment.txt",
+    "message_reply": "prompt_instagram_message.txt",
+}
+_system_prompts = {}
+
+def get_system_prompt(prompt_type):
+    if prompt_type not in _system_prompts:
+        _system_prompts[prompt_type] = load_prompt(PROMPT_FILES[prompt_type])
+    return _system_prompts[prompt_type]
+
+# --- AI RESPONSE CACHE ---
+# Two layers: a small in-memory LRU in front of a SQLite store under USER_DATA_DIR,
+# so repeated captions / "hi" DMs skip the LLM round trip across runs.
+AI_CACHE_MEMORY_ENTRIES = 256    # in-memory LRU size
+
+class ResponseCache:
+    def __init__(self, path, ttl, max_entries, memory_entries=AI_CACHE_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> (value, created_at)
+        self._db = None
+
+    @staticmethod
+    def make_key(prompt_type, text, template):
+        normalized = " ".join(text.lower().split())
+        template_hash = hashlib.sha256(f"{LLM_MODEL}\x00{template}".encode("utf-8")).hexdigest()
+        raw = f"{prompt_type}\x00{normalized}\x00{template_hash}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, prompt_type TEXT, value TEXT, created_at REAL, last_used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+        return self._db
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if now - created_at <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._memory[key]
+
+        try:
+            db = self._connect()
+            row = db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                db.commit()
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"[⚠️] AI cache read failed: {e}")
+
+        self.misses += 1
+        return None
+
+    def put(self, key, prompt_type, value):
+        now = time.time()
+        self._remember(key, value, now)
+        try:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, prompt_type, value, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, prompt_type, value, now, now)
+            )
+            self._evict(db, now)
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"[⚠️] AI cache write failed: {e}")
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        db.execute(
+            "DELETE FROM responses WHERE key NOT IN "
+            "(SELECT key FROM responses ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def stats(self):
+        total = self.hits + self.misses
+        hit_rate = (self.hits / total * 100) if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({hit_rate:.0f}% hit rate)"
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+_response_cache = None
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        config = ai_config()
+        _response_cache = ResponseCache(AI_CACHE_FILE, ttl=config["cache_ttl"], max_entries=config["cache_max_entries"])
+    return _response_cache
+
+# Single completion request, bounded by the concurrency semaphore and LLM_TIMEOUT
+async def request_completion(messages_payload, max_tokens=50):
+    async with get_llm_semaphore():
+        with span("llm_call", max_tokens=max_tokens):
+            response = await asyncio.wait_for(
+                get_client().chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages_payload,
+                    max_tokens=max_tokens,
+                    temperature=0.7
+                ),
+                timeout=ai_config()["timeout"]
+            )
+    return response.choices[0].message.content.strip()
+
+# Placeholder caption when a post's caption couldn't be read
+NO_CAPTION = "No description found."
+
+# User turn of a single-post comment request. The batched request in
+# generate_ai_comments_batch sends the same captions, so both fill the cache alike.
+COMMENT_REQUEST = "Write one short, positive comment for this Instagram post.\n\nPost caption: {caption}"
+COMMENT_REQUEST_NO_CAPTION = "Generate a short, positive comment for an Instagram post."
+
+def get_cache_key(prompt_type, user_message, sender_name=""):
+    # Comments without a caption would all share one key, so only cache real input text.
+    # Replies may address the sender by name, so the sender is part of the key.
+    if not user_message.strip() or user_message == NO_CAPTION:
+        return None
+    if prompt_type == "comment":
+        return ResponseCache.make_key(prompt_type, user_message, get_system_prompt("comment") + COMMENT_REQUEST)
+    return ResponseCache.make_key(prompt_type, f"{sender_name}\x00{user_message}", get_system_prompt("message_reply"))
+
+def fallback_response(prompt_type):
+    if prompt_type == "comment":
+        return random.choice(["Great post!", "Awesome!", "Nice one!"])
+    elif prompt_type == "message_reply":
+        return random.choice(["Thanks for your message!", "Got it!"])
+    return "Sorry, I can't generate a response right now."
 
 # Asynchronous function to call Together AI
-async def generate_ai_response(prompt_type: str, user_message: str = "", sender_name: str = ""):
+async def generate_ai_response(prompt_type: str, user_message: str = "", sender_name: str = "", use_cache: bool = True):
     messages_payload = []
     current_system_prompt = ""
 
     if prompt_type == "comment":
-        current_system_prompt = SYSTEM_PROMPT_COMMENT
-        messages_payload.append({"role": "user", "content": "Generate a short, positive comment for an Instagram post."})
+        current_system_prompt = get_system_prompt("comment")
+        has_caption = user_message.strip() and user_message != NO_CAPTION
+        request = COMMENT_REQUEST.format(caption=user_message.strip()) if has_caption else COMMENT_REQUEST_NO_CAPTION
+        messages_payload.append({"role": "user", "content": request})
     elif prompt_type == "message_reply":
-        formatted_system_prompt = SYSTEM_PROMPT_MESSAGE_REPLY.format(
+        formatted_system_prompt = get_system_prompt("message_reply").format(
             last_message=user_message,
             sender_name=sender_name
         )
@@ -57,21 +260,113 @@ async def generate_ai_response(prompt_type: str, user_message: str = "", sender_
 
     messages_payload.insert(0, {"role": "system", "content": current_system_prompt})
 
+    cache_key = get_cache_key(prompt_type, user_message, sender_name) if use_cache else None
+    if cache_key is not None:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            print(f"[🗃️] Using cached AI {prompt_type} response.")
+            return cached
+
     try:
-        response = client.chat.completions.create(
-            model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-            messages=messages_payload,
-            max_tokens=50,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+        ai_text = await request_completion(messages_payload)
+        if cache_key is not None and ai_text:
+            get_response_cache().put(cache_key, prompt_type, ai_text)
+        return ai_text
+    except asyncio.CancelledError:
+        # Let the caller cancel an in-flight generation (e.g. the post was skipped)
+        raise
+    except asyncio.TimeoutError:
+        print(f"[⏳] AI response timed out after {ai_config()['timeout']}s. Using fallback.")
     except Exception as e:
         print(f"[❌] Error generating AI response: {e}")
-        if prompt_type == "comment":
-            return random.choice(["Great post!", "Awesome!", "Nice one!"])
-        elif prompt_type == "message_reply":
-            return random.choice(["Thanks for your message!", "Got it!"])
-        return "Sorry, I can't generate a response right now."
+
+    return fallback_response(prompt_type)
+
+# Pull a list of `expected` comments out of a batched completion.
+# Accepts a JSON array (optionally wrapped in a ```json fence or surrounding chatter)
+# or, failing that, one numbered line per comment. Returns None if the shape is wrong.
+def parse_batch_comments(raw_text, expected):
+    text = raw_text.strip()
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+
+    match = re.search(r"\[.*\]", text, re.DOTALL)
+    if match:
+        try:
+            parsed = json.loads(match.group(0))
+            if isinstance(parsed, list) and len(parsed) == expected:
+                comments = []
+                for item in parsed:
+                    if isinstance(item, dict):
+                        item = item.get("comment", "")
+                    if not isinstance(item, str) or not item.strip():
+                        break
+                    comments.append(item.strip())
+                else:
+                    return comments
+        except json.JSONDecodeError:
+            pass
+
+    numbered = re.findall(r"^\s*(\d+)[.):-]\s*(.+?)\s*$", text, re.MULTILINE)
+    if len(numbered) == expected and [int(n) for n, _ in numbered] == list(range(1, expected + 1)):
+        return [c.strip('"') for _, c in numbered]
+    return None
+
+# Generate one comment per caption. Cached captions are served directly; the rest
+# go out in chunks of AI_COMMENT_BATCH_SIZE, one completion per chunk. A chunk whose
+# output can't be parsed falls back to individual generate_ai_response calls.
+async def generate_ai_comments_batch(captions):
+    comments = [None] * len(captions)
+    pending = []  # indices still needing a comment
+
+    for i, caption in enumerate(captions):
+        cache_key = get_cache_key("comment", caption)
+        cached = get_response_cache().get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            comments[i] = cached
+        else:
+            pending.append(i)
+
+    if len(pending) < len(captions):
+        print(f"[🗃️] {len(captions) - len(pending)} of {len(captions)} comments served from cache.")
+
+    batch_size = max(1, ai_config()["comment_batch_size"])
+    for chunk_start in range(0, len(pending), batch_size):
+        chunk = pending[chunk_start:chunk_start + batch_size]
+        numbered_captions = "\n".join(f"{n}. {captions[i]}" for n, i in enumerate(chunk, start=1))
+        messages_payload = [
+            {"role": "system", "content": get_system_prompt("comment")},
+            {"role": "user", "content": (
+                f"Write one short, positive comment for each of these {len(chunk)} Instagram posts. "
+                f"Reply ONLY with a JSON array of {len(chunk)} strings, in the same order.\n\n"
+                f"Post captions:\n{numbered_captions}"
+            )},
+        ]
+
+        parsed = None
+        try:
+            raw_text = await request_completion(messages_payload, max_tokens=60 * len(chunk) + 20)
+            parsed = parse_batch_comments(raw_text, len(chunk))
+            if parsed is None:
+                print(f"[⚠️] Could not parse batched comments. Falling back to {len(chunk)} single requests.")
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            print(f"[⏳] Batched comment request timed out after {ai_config()['timeout']}s. Falling back to single requests.")
+        except Exception as e:
+            print(f"[❌] Error generating batched comments: {e}. Falling back to single requests.")
+
+        if parsed is not None:
+            for i, comment in zip(chunk, parsed):
+                comments[i] = comment
+                cache_key = get_cache_key("comment", captions[i])
+                if cache_key is not None:
+                    get_response_cache().put(cache_key, "comment", comment)
+        else:
+            singles = await asyncio.gather(*(generate_ai_response("comment", user_message=captions[i]) for i in chunk))
+            for i, comment in zip(chunk, singles):
+                comments[i] = comment
+
+    return comments
 
 # --- END TOGETHER AI INTEGRATION ---
 
@@ -80,265 +375,561 @@ async def generate_ai_response(prompt_type: str, user_message: str = "", sender_
 AGENT_NAME = "instagram_agent"
 USER_DATA_DIR = f"./user_data/{AGENT_NAME}"
 SESSION_FILE = f"{USER_DATA_DIR}/session_storage.json"
+# Automation session: profile (persistent USER_DATA_DIR) | storage (fresh context from SESSION_FILE), see engine.py
+SESSION_MODE = os.getenv("SESSION_MODE", "profile")
+
+# Site root; point INSTAGRAM_BASE_URL elsewhere (e.g. benchmark.py's fixture server) to run offline
+INSTAGRAM_URL = os.getenv("INSTAGRAM_BASE_URL", "https://www.instagram.com/").rstrip("/") + "/"
 
 MIN_DELAY = 30    # seconds
 MAX_DELAY = 60
 
+LOGIN_CACHE_SECONDS = 600    # trust a verified login this long before checking again (0 disables)
+LOGIN_STATE_FILE = f"{USER_DATA_DIR}/login_state.json"
+SESSION_COOKIES = ("ds_user_id", "sessionid")    # all must be present and unexpired for the cookie fast path
+
+# Learned selector order / pruning for the fallback lists (export: python locators.py <file>)
+SELECTOR_STATS_FILE = f"{USER_DATA_DIR}/selector_stats.json"
+THREAD_STATE_FILE = f"{USER_DATA_DIR}/thread_state.sqlite3"
+INBOX_SCAN_MAX_ROWS = 200         # stop scrolling a thread list after this many threads
+INBOX_SCAN_MAX_SECONDS = 30       # ...or after this long
+INBOX_SCAN_STABLE_ROUNDS = 2      # ...or once this many scrolls in a row load no new threads
+REPLY_PIPELINE_DEPTH = 4          # DM replies generated ahead of the thread the browser is on
+
+# Request filtering for post/inbox runs: off | lean | safe (see resources.py)
+RESOURCE_FILTER_MODE = os.getenv("RESOURCE_FILTER", "off")
+RESOURCE_STATS_FILE = f"{USER_DATA_DIR}/resource_stats.json"
+
+# Browser runtime profile: headed | headless | minimal (see runtime.py); manual login is always headed
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "headed")
+RUNTIME_STATS_FILE = f"{USER_DATA_DIR}/runtime_stats.json"    # per-profile CPU/RSS (report: python runtime.py <file>)
+PROFILE_BUNDLES_DIR = f"{USER_DATA_DIR}/profiles"    # --profile runs: trace, Python profile, CDP metrics
+
+# Which posts were already liked/commented on; handled posts are skipped before launching (see ledger.py)
+LEDGER_FILE = f"{USER_DATA_DIR}/post_ledger.sqlite3"
+
+# Failure snapshots: jpeg | dom | off, kept in a size-capped ring directory (see diagnostics.py)
+DIAGNOSTICS_MODE = os.getenv("DIAGNOSTICS", "jpeg")
+DIAGNOSTICS_DIR = f"{USER_DATA_DIR}/diagnostics"
+DIAGNOSTICS_MAX_MB = 50
+DIAGNOSTICS_MIN_INTERVAL = 30    # seconds between snapshots of the same job + phase
+
+# Per-phase timing spans as JSON lines (summary: python telemetry.py <file>); TELEMETRY=0 disables
+TELEMETRY_FILE = f"{USER_DATA_DIR}/telemetry.jsonl"
+
+# Point the shared helpers at this agent's files (called by the entry point, and
+# re-applied per job by engine.py; importing this module doesn't touch them)
+def use_agent_settings():
+    use_selector_stats(SELECTOR_STATS_FILE)
+    use_diagnostics(DIAGNOSTICS_DIR, DIAGNOSTICS_MODE, DIAGNOSTICS_MAX_MB, DIAGNOSTICS_MIN_INTERVAL)
+    use_telemetry(TELEMETRY_FILE if os.getenv("TELEMETRY", "1") != "0" else None)
+
+# Homepage UI that only shows when logged in (login probe)
+LOGIN_UI_SELECTORS = [
+    'svg[aria-label="New post"]',
+    'svg[aria-label="Home"]',
+    'a[href="/accounts/edit/"]',
+    'img[alt*="profile picture"]',
+]
+LOGIN_PATHS = ("accounts/login",)    # under INSTAGRAM_URL
+
+# Readiness signals used instead of fixed sleeps
+POST_READY_SELECTOR = (
+    'svg[aria-label="Mégsem tetszik"][width="24"], svg[aria-label="Unlike"][width="24"], '
+    'svg[aria-label="Tetszik"][width="24"], svg[aria-label="Like"][width="24"]'
+)
+INBOX_THREAD_SELECTOR = 'div.x13dflua.x19991ni'
+MESSAGE_INPUT_SELECTOR = (
+    'div[aria-label="Üzenet"][role="textbox"][contenteditable="true"], '
+    'div[aria-label="Message"][role="textbox"][contenteditable="true"]'
+)
+
+AI_CACHE_FILE = f"{USER_DATA_DIR}/ai_response_cache.sqlite3"
+CAPTION_CACHE_FILE = f"{USER_DATA_DIR}/caption_cache.sqlite3"    # captions by post ID (see captions.py)
+
+# Import/startup budget for short-lived cron runs (checked with --startup-check)
+IMPORT_TIME_BUDGET_MS = 500
+
+# Cold import of this module in a fresh interpreter, timed from before its first import (ms)
+def measure_import_time():
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    code = f"import time; t = time.perf_counter(); import {module}; print((time.perf_counter() - t) * 1000)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
 MESSAGE_OPTIONS = ["🔥🔥🔥", "Love this!", "Amazing post!", "💯", "So good!", "Thanks for reaching out!", "Got it, will get back to you soon!", "Appreciate the message!", "Hello there!"]
 
 
-# === LOGIN DETECTION ===
-async def wait_until_logged_in(page):
-    print("[🔐] Checking if we're logged in...")
-    while True:
+# === POST CAPTION ===
+# Caption for the comment prompt: cached per post ID, else read from the page
+# metadata, else (slowest) from the rendered caption element.
+_caption_cache = None
+
+def get_caption_cache():
+    global _caption_cache
+    if _caption_cache is None:
+        _caption_cache = CaptionCache(CAPTION_CACHE_FILE)
+    return _caption_cache
+
+async def read_post_caption(page, url):
+    post_id = canonical_post_id(PLATFORM.name, url)
+    caption_span = span("caption")
+    caption = get_caption_cache().get(post_id)
+    source = "cache"
+    if caption is None:
         try:
-            await page.goto("https://www.instagram.com/", timeout=60000)
-            await page.wait_for_timeout(5000)
-            selectors = [
-                'svg[aria-label="New post"]',
-                'svg[aria-label="Home"]',
-                'a[href="/accounts/edit/"]',
-                'img[alt*="profile picture"]',
-            ]
-            for selector in selectors:
-                try:
-                    el = page.locator(selector).first
-                    if await el.is_visible():
-                        print(f"[✅] Detected logged-in session via `{selector}`.")
-                        return
-                except PlaywrightTimeoutError:
-                    continue
-                except Exception as e:
-                    print(f"[⚠️] Error checking selector `{selector}`: {e}")
-            if "accounts/login" in page.url:
-                print("[🚫] Redirected to login page. Login required.")
-            cookies = await page.context.cookies()
-            if any(c['name'] == 'ds_user_id' for c in cookies):
-                print("[✅] Found valid Instagram session cookie.")
-                return
+            caption, source = await caption_from_page(page, post_id)
+        except Exception as e:
+            print(f"[⚠️] Could not read the post metadata: {e}")
+    if caption is None:
+        source = "dom"
+        try:
+            # Rendered caption: the text next to the author in the post dialog
+            caption_locator = page.locator('div[role="dialog"] div[role="button"] ~ div span[dir="auto"]').first
+            await caption_locator.wait_for(state="visible", timeout=3000)
+            caption = ((await caption_locator.text_content()) or "").strip() or None
         except PlaywrightTimeoutError:
-            print("[⏳] Page navigation timed out during login check. Retrying...")
+            pass
         except Exception as e:
-            print(f"[❌] An error occurred during login detection: {e}")
-        print("[⏳] Still waiting for manual login... (Browser open)")
-        await page.screenshot(path="login_wait.png")
-        await page.wait_for_timeout(5000)
-
-# === MANUAL MODE ===
-async def manual_mode():
-    print("[🧍] Launching browser in manual mode...")
-    os.makedirs(USER_DATA_DIR, exist_ok=True)
-    async with async_playwright() as p:
-        browser = await p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            viewport={"width": 1280, "height": 800},
-        )
-        page = await browser.new_page()
-        await page.goto("https://www.instagram.com/", timeout=0)
-        print("[✅] Please log in manually, then close the browser tab.")
-        while len(browser.pages) > 0:
-            await asyncio.sleep(2)
-        print("[💾] Saving cookies and localStorage...")
-        storage_state = await browser.storage_state()
-        with open(SESSION_FILE, "w") as f:
-            json.dump(storage_state, f, indent=2)
-        print(f"[✅] Session saved to {SESSION_FILE}")
-        await browser.close()
+            print(f"[⚠️] Error getting post description: {e}.")
+    if caption is None:
+        print("[⚠️] Post description not found. Using generic comment prompt.")
+        caption_span.end(outcome="not_found")
+        return NO_CAPTION
+    if source != "cache":
+        get_caption_cache().put(post_id, caption, source)
+    print(f"[💬] Found post description ({source}): '{caption[:50]}...'")
+    caption_span.end(outcome="found", source=source)
+    return caption
+
+# Batch look-ahead (see engine.batch_prefetch): comments for upcoming posts whose
+# caption is already known, from the job line ("caption") or cached from an
+# earlier visit, are generated in batched requests. They land in the response
+# cache, where process_post picks them up.
+async def prefetch_comments(jobs):
+    captions = []
+    for job in jobs:
+        post_id = canonical_post_id(PLATFORM.name, job["url"])
+        caption = (job.get("caption") or "").strip()
+        if caption:
+            get_caption_cache().put(post_id, caption, "job")
+        else:
+            caption = get_caption_cache().get(post_id)
+        if caption and (job.get("force") or "comment" not in PLATFORM.ledger().actions_done(PLATFORM.name, post_id)):
+            captions.append(caption)
+    if captions:
+        print(f"[🧠] Prefetching comments for {len(captions)} upcoming posts.")
+        await generate_ai_comments_batch(captions)
 
 # === AUTOMATION MODE - INTERACT WITH POST ===
-async def interact_with_post(url: str):
-    print(f"[🚀] Launching automation bot for {AGENT_NAME}")
-    os.makedirs(USER_DATA_DIR, exist_ok=True)
-    async with async_playwright() as p:
-        browser = await p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            viewport={"width": 1280, "height": 800},
-        )
-        page = await browser.new_page()
-        await wait_until_logged_in(page)
-        print(f"[📷] Navigating to post: {url}")
-        await page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        await page.wait_for_timeout(3000)
-
-        if not page.url.startswith(url):
-            print(f"[⚠️] Unexpected redirect. Still on: {page.url}")
-            await page.screenshot(path="redirect_error.png")
-            await browser.close()
-            return
-        else:
-            print("[📌] On correct post URL.")
+# Like + comment on one post using an already logged-in page. Returns a result record.
+async def process_post(page, url: str, skip_comment=False):
+    print(f"[📷] Navigating to post: {url}")
+    nav_span = span("navigation")
+    await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+    await record_page_load(page, "post")
+    ready = await wait_for_locator(page, POST_READY_SELECTOR, 3000, label="post like button")
+    nav_span.end(outcome="redirected" if not page.url.startswith(url) else ("ready" if ready else "not_ready"))
+
+    if not page.url.startswith(url):
+        print(f"[⚠️] Unexpected redirect. Still on: {page.url}")
+        await capture_diagnostics(page, "redirect")
+        if PLATFORM.on_login_page(page.url):
+            PLATFORM.clear_login_state()  # the cached login is stale; the next job re-probes
+        return {"status": "redirected", "final_url": page.url}
+    else:
+        print("[📌] On correct post URL.")
+
+    # === CAPTION + BACKGROUND COMMENT GENERATION ===
+    # Only needed for the comment, so posts the ledger already has a comment for skip both.
+    # The caption comes from the page metadata (see captions.py), which is complete
+    # at domcontentloaded, so the comment is generated during the delay below.
+    if skip_comment:
+        print("[⏭️] Already commented on this post (see ledger.py); only the like will run.")
+    else:
+        post_description = await read_post_caption(page, url)
+        comment_task = asyncio.ensure_future(generate_ai_response(prompt_type="comment", user_message=post_description))
 
-        delay = random.randint(MIN_DELAY, MAX_DELAY)
-        print(f"[🕒] Sleeping {delay} seconds before interacting...")
+    delay = random.randint(MIN_DELAY, MAX_DELAY)
+    print(f"[🕒] Sleeping {delay} seconds before interacting...")
+    with span("delay", seconds=delay):
         await page.wait_for_timeout(delay * 1000)
 
-        # === LIKE SECTION ===
-        try:
-            print("[🤍] Checking if post is already liked...")
-            liked_icon_locator = page.locator('svg[aria-label="Mégsem tetszik"][width="24"], svg[aria-label="Unlike"][width="24"]')
-            unliked_icon_locator = page.locator('svg[aria-label="Tetszik"][width="24"], svg[aria-label="Like"][width="24"]')
+    result = {"status": "done", "already_liked": False, "liked": False, "commented": False, "delay_s": delay}
 
-            is_already_liked = False
-            try:
-                await liked_icon_locator.first.wait_for(state="visible", timeout=3000)
-                is_already_liked = True
-                print("[❤️] Post already liked.")
-            except PlaywrightTimeoutError:
-                is_already_liked = False
-
-            if not is_already_liked:
-                print("[🤍] Post not liked yet. Attempting to click the 'Like' icon or its parents...")
-                like_svg_icon_element = page.locator(
-                    'svg[aria-label="Tetszik"][width="24"], '
-                    'svg[aria-label="Like"][width="24"]'
-                ).first
-
-                clickable_targets = []
-                clickable_targets.append(("SVG icon", like_svg_icon_element))
-
-                inner_button = like_svg_icon_element.locator('xpath=ancestor::div[contains(@role, "button")][1]').first
-                if await inner_button.is_visible():
-                    clickable_targets.append(("Inner Button DIV", inner_button))
-
-                outer_wrapper = like_svg_icon_element.locator('xpath=ancestor::div[contains(@class, "x1ypdohk")][1]').first
-                if await outer_wrapper.is_visible():
-                    clickable_targets.append(("Outer Wrapper", outer_wrapper))
-
-                top_span = like_svg_icon_element.locator('xpath=ancestor::span[contains(@class, "x1qfufaz")][1]').first
-                if await top_span.is_visible():
-                    clickable_targets.append(("Top Span", top_span))
-
-                for name, locator in clickable_targets:
-                    try:
-                        print(f"[🤍] Trying to click: {name}")
-                        await locator.click(force=True)
-                        await liked_icon_locator.first.wait_for(state="visible", timeout=5000)
-                        print(f"[❤️] Liked the post by clicking: {name}")
-                        break
-                    except Exception as e:
-                        print(f"[⚠️] Click on {name} failed: {e}")
-            else:
-                pass
-        except Exception as e:
-            print(f"[❌] Like process failed: {e}")
+    # === LIKE SECTION ===
+    like_span = span("like")
+    like_attempts = 0
+    try:
+        print("[🤍] Checking if post is already liked...")
+        liked_icon_locator = page.locator('svg[aria-label="Mégsem tetszik"][width="24"], svg[aria-label="Unlike"][width="24"]')
+        unliked_icon_locator = page.locator('svg[aria-label="Tetszik"][width="24"], svg[aria-label="Like"][width="24"]')
 
-        # === COMMENT SECTION (ALWAYS RUNS) ===
+        is_already_liked = False
         try:
-            # For comments on posts, we need the post description/caption
-            # This is a general attempt to find it. Instagram's caption is usually complex.
-            # You might need to refine this selector based on actual post HTML
-            post_description = "No description found."
-            try:
-                # Common pattern for Instagram post caption: div holding the text
-                caption_locator = page.locator('div[role="dialog"] div[role="button"] ~ div span[dir="auto"]').first
-                await caption_locator.wait_for(state="visible", timeout=3000)
-                post_description = await caption_locator.text_content()
-                post_description = post_description.strip()
-                print(f"[💬] Found post description: '{post_description[:50]}...'")
-            except PlaywrightTimeoutError:
-                print("[⚠️] Post description not found. Using generic comment prompt.")
-            except Exception as e:
-                print(f"[⚠️] Error getting post description: {e}. Using generic comment prompt.")
-
-            # Pass post_description to the AI for more contextual comment
-            comment = await generate_ai_response(prompt_type="comment", user_message=post_description)
-            print(f"[💬] Preparing to comment: {comment}")
-            
-            comment_box_locators = [
-                'textarea[aria-label*="Hozzászólás"]',
-                'textarea[aria-label*="Comment"]',
-                'textarea[placeholder*="Hozzászólás"]',
-                'textarea[placeholder*="Comment"]',
-                'div[aria-label*="Hozzászólás"]',
-                'div[aria-label*="Comment"]',
-                'div[role="textbox"]'
-            ]
-            
-            comment_box = None
-            for selector in comment_box_locators:
-                current_locator = page.locator(selector).first
+            await liked_icon_locator.first.wait_for(state="visible", timeout=3000)
+            is_already_liked = True
+            result["already_liked"] = result["liked"] = True
+            print("[❤️] Post already liked.")
+        except PlaywrightTimeoutError:
+            is_already_liked = False
+
+        if not is_already_liked:
+            print("[🤍] Post not liked yet. Attempting to click the 'Like' icon or its parents...")
+            like_svg_icon_element = page.locator(
+                'svg[aria-label="Tetszik"][width="24"], '
+                'svg[aria-label="Like"][width="24"]'
+            ).first
+
+            clickable_targets = []
+            clickable_targets.append(("SVG icon", like_svg_icon_element))
+
+            inner_button = like_svg_icon_element.locator('xpath=ancestor::div[contains(@role, "button")][1]').first
+            if await inner_button.is_visible():
+                clickable_targets.append(("Inner Button DIV", inner_button))
+
+            outer_wrapper = like_svg_icon_element.locator('xpath=ancestor::div[contains(@class, "x1ypdohk")][1]').first
+            if await outer_wrapper.is_visible():
+                clickable_targets.append(("Outer Wrapper", outer_wrapper))
+
+            top_span = like_svg_icon_element.locator('xpath=ancestor::span[contains(@class, "x1qfufaz")][1]').first
+            if await top_span.is_visible():
+                clickable_targets.append(("Top Span", top_span))
+
+            for name, locator in clickable_targets:
+                like_attempts += 1
                 try:
-                    await current_locator.wait_for(state="visible", timeout=5000)
-                    if await current_locator.is_editable() or await current_locator.is_enabled():
-                        comment_box = current_locator
-                        print(f"[✅] Found comment box using selector: {selector}")
-                        break
-                except PlaywrightTimeoutError:
-                    print(f"[ℹ️] Comment box not found with selector: {selector}. Trying next...")
+                    print(f"[🤍] Trying to click: {name}")
+                    await locator.click(force=True)
+                    await liked_icon_locator.first.wait_for(state="visible", timeout=5000)
+                    print(f"[❤️] Liked the post by clicking: {name}")
+                    result["liked"] = True
+                    break
                 except Exception as e:
-                    print(f"[⚠️] Error checking selector {selector}: {e}")
+                    print(f"[⚠️] Click on {name} failed: {e}")
+        else:
+            pass
+    except Exception as e:
+        print(f"[❌] Like process failed: {e}")
+    like_span.end(
+        outcome="already_liked" if result["already_liked"] else ("liked" if result["liked"] else "failed"),
+        retries=max(like_attempts - 1, 0)
+    )
+
+    # === COMMENT SECTION (UNLESS THE POST ALREADY HAS OUR COMMENT) ===
+    if skip_comment:
+        result["comment_skipped"] = True
+        await wait_for_network_idle(page, 2000, label="pending requests")
+        return result
 
-            if comment_box:
+    try:
+        # The comment was generated in the background during the delay and like section
+        with span("comment_llm_wait"):
+            comment = await comment_task
+        print(f"[💬] Preparing to comment: {comment}")
+        
+        comment_box_locators = [
+            'textarea[aria-label*="Hozzászólás"]',
+            'textarea[aria-label*="Comment"]',
+            'textarea[placeholder*="Hozzászólás"]',
+            'textarea[placeholder*="Comment"]',
+            'div[aria-label*="Hozzászólás"]',
+            'div[aria-label*="Comment"]',
+            'div[role="textbox"]'
+        ]
+        
+        async def is_interactive(locator):
+            return await locator.is_editable() or await locator.is_enabled()
+
+        comment_selector, comment_box = await first_visible(page, comment_box_locators, 5000, label="comment box", accept=is_interactive, group="comment_box")
+        if comment_box:
+            print(f"[✅] Found comment box using selector: {comment_selector}")
+
+        if comment_box:
+            with span("typing", chars=len(comment)):
                 await comment_box.click(force=True)
-                await page.wait_for_timeout(1000)
+                await wait_for_dom_quiet(page, 1000, label="comment box focus", quiet_ms=200)
                 await comment_box.fill("")
                 await page.keyboard.type(comment, delay=100)
                 await page.keyboard.press("Enter")
-                print(f"[✅] Commented: {comment}")
-                await page.wait_for_timeout(3000)
+            print(f"[✅] Commented: {comment}")
+            result["commented"] = True
+            result["comment"] = comment
+            await wait_for_dom_quiet(page, 3000, label="comment to post")
+        else:
+            print("[❌] Could not find an interactive comment box after trying all selectors.")
+            await capture_diagnostics(page, "comment_box_not_found")
+    except Exception as e:
+        print(f"[❌] Comment failed: {e}")
+        await capture_diagnostics(page, "comment_error")
+    finally:
+        if not comment_task.done():
+            comment_task.cancel()
+
+    await wait_for_network_idle(page, 2000, label="pending requests")
+    return result
+
+# --- Inbox thread helpers ---
+INBOX_URL = f"{INSTAGRAM_URL}direct/inbox/"
+REQUESTS_URL = f"{INSTAGRAM_URL}direct/requests/"
+THREAD_BUTTON_SELECTOR = f'{INBOX_THREAD_SELECTOR} div[role="button"][tabindex="0"]'
+THREAD_NAME_SELECTOR = 'span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft'
+THREAD_PREVIEW_SELECTOR = 'div.x6s0dn4.x78zum5 div.html-div.xmix8c7 span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft'
+
+# Per-thread watermarks (see thread_state.py), opened on first use.
+_thread_state = None
+
+def get_thread_state():
+    global _thread_state
+    if _thread_state is None:
+        _thread_state = ThreadStateStore(THREAD_STATE_FILE)
+    return _thread_state
+
+# Read name / preview / timestamp / unread state / chat link from one thread row.
+async def extract_thread_row(thread_wrapper_element, is_request=False):
+    thread_button_locator = thread_wrapper_element.locator('div[role="button"][tabindex="0"]').first
+
+    name_element = thread_button_locator.locator(THREAD_NAME_SELECTOR).first
+    await name_element.wait_for(state="visible", timeout=100)
+    user_group_name = (await name_element.text_content()).strip()
+
+    message_preview_locator = thread_button_locator.locator(THREAD_PREVIEW_SELECTOR).first
+    await message_preview_locator.wait_for(state="visible", timeout=100)
+    last_message_text = (await message_preview_locator.text_content()).strip()
+
+    timestamp_element = thread_button_locator.locator('abbr[aria-label]').first
+    await timestamp_element.wait_for(state="visible", timeout=100)
+    timestamp = await timestamp_element.get_attribute('aria-label')
+
+    if is_request:
+        status_during_scan = "REQUEST"
+    else:
+        try:
+            unread_indicator_locator = thread_button_locator.locator(
+                'span[data-visualcompletion="ignore"]:has-text("Unread")'
+            ).first
+            await unread_indicator_locator.wait_for(state="visible", timeout=100)
+            if await unread_indicator_locator.is_visible():
+                status_during_scan = "UNREAD"
             else:
-                print("[❌] Could not find an interactive comment box after trying all selectors.")
-                await page.screenshot(path="comment_box_not_found.png")
+                status_during_scan = "Read"
+        except PlaywrightTimeoutError:
+            status_during_scan = "Read"
+        except Exception as e:
+            status_during_scan = f"Error: {e}"
+
+    chat_url = None
+    chat_links = thread_wrapper_element.locator('a[href*="/direct/t/"]')
+    if await chat_links.count():
+        chat_url = urljoin(INBOX_URL, await chat_links.first.get_attribute("href"))
+
+    return {
+        "name": user_group_name,
+        "message": last_message_text,
+        "timestamp": timestamp,
+        "status_initial": status_during_scan,
+        "chat_url": chat_url,
+    }
+
+# One in-page pass over every thread row: same selectors as extract_thread_row(),
+# but a single round trip instead of several locator calls per row. Rows missing
+# a name, preview or timestamp are skipped, like the per-locator path does.
+# With `scroll`, the last row is then scrolled into view so the list loads more.
+_THREAD_ROWS_JS = """
+([wrapperSelector, nameSelector, previewSelector, scroll]) => {
+    const visible = (el) => !!el && el.getClientRects().length > 0;
+    const text = (el) => (el && el.textContent ? el.textContent.trim() : "");
+    const rows = [];
+    const wrappers = document.querySelectorAll(wrapperSelector);
+    for (const wrapper of wrappers) {
+        const button = wrapper.querySelector('div[role="button"][tabindex="0"]');
+        if (!visible(button)) continue;
+        const name = button.querySelector(nameSelector);
+        const preview = button.querySelector(previewSelector);
+        const stamp = button.querySelector('abbr[aria-label]');
+        if (!visible(name) || !visible(preview) || !visible(stamp)) continue;
+        const unread = Array.from(button.querySelectorAll('span[data-visualcompletion="ignore"]'))
+            .some((span) => visible(span) && span.textContent.includes("Unread"));
+        const link = wrapper.querySelector('a[href*="/direct/t/"]');
+        rows.push({
+            name: text(name),
+            message: text(preview),
+            timestamp: stamp.getAttribute("aria-label"),
+            unread: unread,
+            href: link ? link.href : null,
+        });
+    }
+    if (scroll) {
+        if (wrappers.length) wrappers[wrappers.length - 1].scrollIntoView({ block: "end" });
+        window.scrollTo(0, document.body.scrollHeight);
+    }
+    return { total: wrappers.length, rows: rows };
+}
+"""
+
+# Fast path: all rows in one page.evaluate(). Returns None if the evaluation failed.
+async def extract_thread_rows_in_page(page, is_request=False, scroll=False):
+    try:
+        scan = await page.evaluate(
+            _THREAD_ROWS_JS, [INBOX_THREAD_SELECTOR, THREAD_NAME_SELECTOR, THREAD_PREVIEW_SELECTOR, scroll]
+        )
+    except Exception as e:
+        print(f"[⚠️] In-page thread row extraction failed: {e}")
+        return None
+    threads = []
+    for row in scan["rows"]:
+        threads.append({
+            "name": row["name"],
+            "message": row["message"],
+            "timestamp": row["timestamp"],
+            "status_initial": "REQUEST" if is_request else ("UNREAD" if row["unread"] else "Read"),
+            "chat_url": row["href"],
+        })
+    return threads
+
+# Fallback path: one locator round trip per field per row.
+async def extract_thread_rows_per_locator(page, is_request=False):
+    label = "requests" if is_request else "inbox"
+    current_thread_wrappers = await page.locator(INBOX_THREAD_SELECTOR).all()
+
+    threads = []
+    for i, thread_wrapper_element in enumerate(current_thread_wrappers):
+        try:
+            threads.append(await extract_thread_row(thread_wrapper_element, is_request))
+        except PlaywrightTimeoutError:
+            continue # Skip if initial info not found
         except Exception as e:
-            print(f"[❌] Comment failed: {e}")
-            await page.screenshot(path="comment_error.png")
+            print(f"  [⚠️] Error collecting identifier for {label} thread {i+1}: {e}")
+    if current_thread_wrappers:
+        try:
+            await current_thread_wrappers[-1].scroll_into_view_if_needed(timeout=1000)
+        except Exception:
+            pass # Row re-rendered mid-scroll; the next round scrolls again
+    return threads
+
+# Stream the currently shown thread list: yield each unique thread as soon as it
+# has loaded, scrolling until no new rows show up for INBOX_SCAN_STABLE_ROUNDS
+# scrolls, INBOX_SCAN_MAX_ROWS rows were yielded, or INBOX_SCAN_MAX_SECONDS
+# passed. Only the seen-row keys are kept, never the row elements.
+async def stream_thread_rows(page, is_request=False):
+    label = "requests" if is_request else "inbox"
+    started = time.perf_counter()
+    seen_identifiers_set = set()
+    in_page = True
+    stable_rounds = 0
+    scrolls = 0
+    stop_reason = "list stable"
 
-        await page.wait_for_timeout(2000)
-        await browser.close()
+    while True:
+        rows = await extract_thread_rows_in_page(page, is_request, scroll=True) if in_page else None
+        if in_page and (rows is None or (not rows and not seen_identifiers_set)):
+            # Evaluation error (any round) or nothing parsed in-page (layout drift): go field by field from now on
+            in_page = False
+        if not in_page:
+            rows = await extract_thread_rows_per_locator(page, is_request)
+
+        new_rows = 0
+        for thread_info in rows:
+            chat_unique_key = (thread_info["name"], thread_info["message"], thread_info["timestamp"])
+            if chat_unique_key in seen_identifiers_set:
+                continue
+            seen_identifiers_set.add(chat_unique_key)
+            new_rows += 1
+            yield thread_info
+            if len(seen_identifiers_set) >= INBOX_SCAN_MAX_ROWS:
+                break
+
+        stable_rounds = 0 if new_rows else stable_rounds + 1
+        if len(seen_identifiers_set) >= INBOX_SCAN_MAX_ROWS:
+            stop_reason = f"row cap {INBOX_SCAN_MAX_ROWS}"
+            break
+        if time.perf_counter() - started >= INBOX_SCAN_MAX_SECONDS:
+            stop_reason = f"time cap {INBOX_SCAN_MAX_SECONDS}s"
+            break
+        if stable_rounds >= INBOX_SCAN_STABLE_ROUNDS:
+            break
+        scrolls += 1
+        await wait_for_dom_quiet(page, 1000, label=f"{label} scroll", quiet_ms=250)
+
+    elapsed = time.perf_counter() - started
+    print(f"[📋] Scanned {len(seen_identifiers_set)} {label} threads in {scrolls} scrolls, "
+          f"{elapsed:.1f}s ({stop_reason}, {'in-page' if in_page else 'per-locator'} extraction).")
+    record_span(f"{label}_scan", elapsed * 1000, rows=len(seen_identifiers_set), scrolls=scrolls,
+                outcome=stop_reason, extraction="in-page" if in_page else "per-locator")
+
+# Collect the threads worth opening from stream_thread_rows() as
+# (thread_info, reply_task) pairs. `keep(thread_info)` filters rows as they
+# stream in, so skipped rows are never held in memory. Replies for the first
+# REPLY_PIPELINE_DEPTH threads that need one start as soon as their row is
+# seen, so the LLM works while the list is still scrolling; the rest are
+# started by the reply pipeline as the browser gets to them.
+async def scan_thread_list(page, is_request=False, keep=None):
+    threads = []
+    started_replies = 0
+    try:
+        async for thread_info in stream_thread_rows(page, is_request):
+            if keep is not None and not keep(thread_info):
+                continue
+            reply_task = None
+            if started_replies < REPLY_PIPELINE_DEPTH and thread_needs_reply(thread_info):
+                reply_task = start_reply_generation(thread_info)
+                started_replies += 1
+            threads.append((thread_info, reply_task))
+    except BaseException:
+        cancel_reply_tasks(threads)
+        raise
+    return threads
+
+def cancel_reply_tasks(threads):
+    for _, reply_task in threads:
+        if reply_task is not None and not reply_task.done():
+            reply_task.cancel()
+
+# Open a thread without reloading the inbox per thread: jump to the chat URL from
+# its row's link when it has one, otherwise click its row in the thread list
+# (which stays on screen next to an open chat), and only reload the list if the
+# row is no longer there. Chat URLs are never looked up by display name: two
+# threads can share a name, and the reply would go to the wrong one.
+async def open_thread(page, thread_info, list_url):
+    if thread_info.get("chat_url"):
+        print(f"  [🌐] Opening chat for '{thread_info['name']}' directly: {thread_info['chat_url']}")
+        await page.goto(thread_info["chat_url"], wait_until="domcontentloaded", timeout=60000)
+        return
+
+    thread_button_locator = (
+        page.locator(THREAD_BUTTON_SELECTOR)
+        .filter(has_text=thread_info["name"])
+        .filter(has_text=thread_info["message"])
+        .first
+    )
+    try:
+        await thread_button_locator.wait_for(state="visible", timeout=2000)
+    except PlaywrightTimeoutError:
+        print(f"  [🔄] '{thread_info['name']}' not in the visible list. Reloading {list_url}...")
+        await page.goto(list_url, wait_until="domcontentloaded", timeout=60000)
+        await thread_button_locator.wait_for(state="visible", timeout=5000)
+    print(f"  [🌐] Clicking to open chat for '{thread_info['name']}'...")
+    await thread_button_locator.click(timeout=5000)
 
 # --- Helper function to process individual message threads ---
-async def process_message_thread(page, thread_button_locator, initial_inbox_url, is_request=False):
-    user_group_name = "N/A"
-    last_message_text = "N/A"
-    timestamp = "N/A"
-    status_initial = "N/A"
+# `reply_task` may be a reply already being generated by the inbox pipeline.
+async def process_message_thread(page, thread_info, list_url, is_request=False, reply_task=None):
+    user_group_name = thread_info["name"]
+    last_message_text = thread_info["message"]
+    timestamp = thread_info["timestamp"]
+    status_initial = thread_info["status_initial"]
     chat_url = "N/A"
     current_status_after_action = "N/A"
-    
-    core_info_extracted = False
+    ai_response = None
 
     try:
-        # Extract initial details from the thread card
-        name_element = thread_button_locator.locator(
-            'span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft'
-        ).first
-        await name_element.wait_for(state="visible", timeout=500)
-        user_group_name = (await name_element.text_content()).strip()
-
-        message_preview_locator = thread_button_locator.locator(
-            'div.x6s0dn4.x78zum5 div.html-div.xmix8c7 span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft'
-        ).first
-        await message_preview_locator.wait_for(state="visible", timeout=500)
-        last_message_text = (await message_preview_locator.text_content()).strip()
-
-        timestamp_element = thread_button_locator.locator('abbr[aria-label]').first
-        await timestamp_element.wait_for(state="visible", timeout=500)
-        timestamp = await timestamp_element.get_attribute('aria-label')
-        
-        core_info_extracted = True
-
-        if not is_request:
-            try:
-                unread_indicator_locator = thread_button_locator.locator(
-                    'span[data-visualcompletion="ignore"]:has-text("Unread")'
-                ).first
-                await unread_indicator_locator.wait_for(state="visible", timeout=200)
-                if await unread_indicator_locator.is_visible():
-                    status_initial = "UNREAD"
-                else:
-                    status_initial = "Read"
-            except PlaywrightTimeoutError:
-                status_initial = "Read"
-            except Exception:
-                status_initial = "Error checking unread"
-        else:
-            status_initial = "REQUEST"
+        # Start generating the reply now so the LLM call overlaps with opening the chat
+        if reply_task is None and thread_needs_reply(thread_info):
+            reply_task = start_reply_generation(thread_info)
 
-        # --- Click to get URL and potentially respond/accept ---
-        print(f"  [🌐] Clicking to open chat for '{user_group_name}'...")
-        await thread_button_locator.click(timeout=5000)
+        # --- Open chat to get URL and potentially respond/accept ---
+        await open_thread(page, thread_info, list_url)
         
         if is_request:
             try:
@@ -346,7 +937,7 @@ async def process_message_thread(page, thread_button_locator, initial_inbox_url,
                 await accept_button_locator.wait_for(state="visible", timeout=5000)
                 print("  [👍] Clicking 'Accept' request...")
                 await accept_button_locator.click(timeout=5000)
-                await page.wait_for_timeout(2000)
+                await wait_for_locator(page, MESSAGE_INPUT_SELECTOR, 2000, label="accepted chat input")
                 current_status_after_action = "Accepted"
             except PlaywrightTimeoutError:
                 print("  [❌] 'Accept' button not found or timed out. Could not accept request.")
@@ -364,23 +955,17 @@ async def process_message_thread(page, thread_button_locator, initial_inbox_url,
         if status_initial == "UNREAD" or (is_request and current_status_after_action == "Accepted"):
             print(f"  [💬] Status requires reply. Attempting to reply to '{user_group_name}'...")
             try:
-                ai_response = await generate_ai_response(
-                    prompt_type="message_reply",
-                    user_message=last_message_text,
-                    sender_name=user_group_name
-                )
+                with span("reply_llm_wait"):
+                    ai_response = await reply_task
                 
-                message_input_box_locator = page.locator(
-                    'div[aria-label="Üzenet"][role="textbox"][contenteditable="true"], '
-                    'div[aria-label="Message"][role="textbox"][contenteditable="true"]'
-                ).first
+                message_input_box_locator = page.locator(MESSAGE_INPUT_SELECTOR).first
                 
                 await message_input_box_locator.wait_for(state="visible", timeout=5000)
                 
                 await message_input_box_locator.fill(ai_response)
                 await page.keyboard.press("Enter")
                 print(f"  [✅] Replied: '{ai_response}' to '{user_group_name}'.")
-                await page.wait_for_timeout(3000)
+                await wait_for_dom_quiet(page, 3000, label="reply to send")
                 current_status_after_action = "Replied (was " + status_initial + ")" if not is_request else "Accepted & Replied"
             except PlaywrightTimeoutError:
                 print("  [❌] Message input box not found. Could not reply.")
@@ -398,7 +983,8 @@ async def process_message_thread(page, thread_button_locator, initial_inbox_url,
             "Initial Status": status_initial,
             "Outcome Status": current_status_after_action,
             "Timestamp": timestamp,
-            "Chat URL": chat_url
+            "Chat URL": chat_url,
+            "Reply": ai_response
         }
 
     except PlaywrightTimeoutError as e:
@@ -408,286 +994,248 @@ async def process_message_thread(page, thread_button_locator, initial_inbox_url,
         print(f"  [❌] Unexpected error processing thread '{user_group_name}': {e}")
         return None
     finally:
-        # Crucial: Always navigate back to the inbox after processing a thread, regardless of errors.
-        # This ensures the main loop can proceed to the next item reliably.
-        if "direct/inbox" not in page.url:
-            print(f"  [🔙] Navigating back to inbox (from {page.url})...")
-            await page.goto(initial_inbox_url, timeout=10000)
-            await page.wait_for_url(initial_inbox_url, timeout=10000)
-            await page.wait_for_timeout(2000)
-
-
-# === NEW MODE: LIST MESSAGES AND REPLY TO UNREAD (Includes Requests) ===
-async def list_messages():
-    print("[✉️] Launching bot to list Instagram messages...")
-    os.makedirs(USER_DATA_DIR, exist_ok=True)
-    async with async_playwright() as p:
-        browser = await p.chromium.launch_persistent_context(
-            USER_DATA_DIR,
-            headless=False,
-            viewport={"width": 1280, "height": 800},
+        if reply_task is not None and not reply_task.done():
+            reply_task.cancel()
+
+
+# === INBOX REPLY PIPELINE ===
+# Replies only depend on the preview text known from the scan, so they are
+# generated ahead of the browser: the first few start while the list is still
+# being scanned (see scan_thread_list), then a producer starts one generation
+# task per thread (concurrency still capped by LLM_MAX_CONCURRENCY) and hands it to the
+# browser consumer through a queue of REPLY_PIPELINE_DEPTH slots, so only a
+# few replies run ahead of the browser. Inbox time then tends towards
+# max(LLM time, browser time) instead of their sum.
+def thread_needs_reply(thread_info):
+    return thread_info["status_initial"] in ("UNREAD", "REQUEST")
+
+def start_reply_generation(thread_info):
+    return asyncio.ensure_future(generate_ai_response(
+        prompt_type="message_reply",
+        user_message=thread_info["message"],
+        sender_name=thread_info["name"]
+    ))
+
+async def produce_reply_tasks(threads, queue):
+    for thread_info, reply_task in threads:
+        if reply_task is None and thread_needs_reply(thread_info):
+            reply_task = start_reply_generation(thread_info)
+        try:
+            await queue.put((thread_info, reply_task))
+        except BaseException:
+            # Cancelled while waiting for a free slot: this task was never queued
+            if reply_task is not None:
+                reply_task.cancel()
+            raise
+    await queue.put(None)
+
+# Open and answer `threads` ((thread_info, reply_task) pairs from scan_thread_list)
+# in order while their replies are generated ahead. Returns processed records.
+async def process_thread_pipeline(page, threads, list_url, is_request=False):
+    label = "request" if is_request else "regular message"
+    started = time.perf_counter()
+    queue = asyncio.Queue(maxsize=REPLY_PIPELINE_DEPTH)
+    producer = asyncio.ensure_future(produce_reply_tasks(threads, queue))
+    processed_threads = []
+    try:
+        k = 0
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            thread_info, reply_task = item
+            k += 1
+            print(f"\n--- Processing {label} {k}/{len(threads)}: '{thread_info['name']}' ---")
+            thread_span = span("thread", request=is_request, initial=thread_info["status_initial"])
+            processed_data = await process_message_thread(page, thread_info, list_url, is_request, reply_task=reply_task)
+            thread_span.end(outcome=processed_data["Outcome Status"] if processed_data else "failed")
+            if processed_data:
+                processed_threads.append(processed_data)
+                record_handled_thread(thread_info, processed_data)
+                print(f"  [✅] Processed {label} {k}.")
+            else:
+                print(f"  [❌] Failed to fully process {label} {k}. Skipping.")
+    finally:
+        producer.cancel()
+        # Replies generated ahead for threads we never reached
+        while not queue.empty():
+            item = queue.get_nowait()
+            if item is not None and item[1] is not None:
+                item[1].cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        # Replies started during the scan for threads the producer never queued
+        cancel_reply_tasks(threads)
+    print(f"[⚡] Pipeline handled {len(threads)} {label} threads in {time.perf_counter() - started:.1f}s.")
+    return processed_threads
+
+# Outcomes after which the thread is settled; failed replies/accepts are retried next run.
+HANDLED_OUTCOMES = ("Replied", "Accepted & Replied", "Read (No Reply)")
+
+def record_handled_thread(thread_info, processed_data):
+    if processed_data["Outcome Status"].startswith(HANDLED_OUTCOMES):
+        get_thread_state().record(
+            processed_data["Chat URL"], thread_info["name"], thread_info["message"], thread_info["timestamp"],
+            reply=processed_data["Reply"], outcome=processed_data["Outcome Status"]
         )
-        page = await browser.new_page()
-        await wait_until_logged_in(page)
-        
-        print("[🔎] Navigating to Instagram Direct Inbox...")
-        initial_inbox_url = "https://www.instagram.com/direct/inbox/"
-        await page.goto(initial_inbox_url, wait_until="domcontentloaded", timeout=60000)
-        await page.wait_for_timeout(5000)
-
-        if "direct/inbox" not in page.url:
-            print(f"[⚠️] Failed to navigate to inbox. Current URL: {page.url}")
-            await page.screenshot(path="inbox_navigation_error.png")
-            await browser.close()
-            return
 
-        print("[✅] Successfully navigated to Direct Inbox.")
-
-        final_extracted_chat_data = [] # To store all processed chats (inbox and requests)
-
-        # --- PROCESS MESSAGE REQUESTS FIRST ---
-        print("\n--- Checking for Message Requests ---")
-        # Selector for the request tab based on text content, more robust
-        request_tab_xpath = '//span[contains(@dir, "auto") and (contains(text(), "Request") or contains(text(), "Kérelmek"))]'
-        
-        try:
+# === NEW MODE: LIST MESSAGES AND REPLY TO UNREAD (Includes Requests) ===
+# Scan the inbox (requests first, then regular threads) on an already logged-in page.
+# Each list is loaded once; threads are then opened directly instead of
+# re-entering the inbox for every thread. Regular threads whose watermark shows
+# no new activity since the last run are skipped unless `full_scan` is set.
+async def process_inbox(page, full_scan=False):
+    final_extracted_chat_data = [] # To store all processed chats (inbox and requests)
+
+    # --- PROCESS MESSAGE REQUESTS FIRST ---
+    print("\n--- Checking for Message Requests ---")
+    try:
+        print("[📬] Opening message requests directly...")
+        await page.goto(REQUESTS_URL, wait_until="domcontentloaded", timeout=60000)
+        if "direct/requests" not in page.url:
+            # Direct route unavailable: fall back to the requests tab in the inbox
+            # Selector for the request tab based on text content, more robust
+            request_tab_xpath = '//span[contains(@dir, "auto") and (contains(text(), "Request") or contains(text(), "Kérelmek"))]'
+            await page.goto(INBOX_URL, wait_until="domcontentloaded", timeout=60000)
             request_tab_locator = page.locator(request_tab_xpath).first
-            # We don't need the regex match if we just check if it's visible and contains number.
-            # If the element exists, click it. The number will be displayed on the page.
             await request_tab_locator.wait_for(state="visible", timeout=5000)
-            request_text_on_tab = await request_tab_locator.text_content()
-
-            # Click the requests tab
-            print(f"[📬] Found message requests tab: '{request_text_on_tab}'. Clicking to view requests...")
+            print(f"[📬] Found message requests tab: '{await request_tab_locator.text_content()}'. Clicking to view requests...")
             await request_tab_locator.click(timeout=5000)
-            await page.wait_for_timeout(3000) # Wait for requests page to load
-            
-            # Now, identify and process individual request threads on the requests page
-            request_thread_selector = 'div.x13dflua.x19991ni' # This is the same wrapper as regular chats
-            
-            # Scroll to ensure all requests are loaded if dynamic
-            for _ in range(3): 
-                await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                await page.wait_for_timeout(1000)
-
-            # Get all request thread wrappers
-            requests_to_process_wrappers = await page.locator(request_thread_selector).all()
-            
-            if requests_to_process_wrappers:
-                print(f"[📋] Found {len(requests_to_process_wrappers)} message requests. Processing...")
-                
-                # To avoid stale element references when navigating in/out of chats:
-                # 1. Collect identifiers for all requests that need processing.
-                request_identifiers_to_process = []
-                for req_wrapper_element in requests_to_process_wrappers:
-                    req_button_locator = req_wrapper_element.locator('div[role="button"][tabindex="0"]').first
-                    try:
-                        name_el = req_button_locator.locator('span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft').first
-                        msg_el = req_button_locator.locator('div.x6s0dn4.x78zum5 div.html-div.xmix8c7 span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft').first
-                        ts_el = req_button_locator.locator('abbr[aria-label]').first
-                        
-                        await name_el.wait_for(state="visible", timeout=100) # Quick check
-                        name = (await name_el.text_content()).strip()
-                        message = (await msg_el.text_content()).strip()
-                        timestamp = await ts_el.get_attribute('aria-label')
-                        
-                        request_identifiers_to_process.append({
-                            "name": name,
-                            "message": message,
-                            "timestamp": timestamp
-                        })
-                    except PlaywrightTimeoutError:
-                        pass # Skip if initial info not found
-                    except Exception as e:
-                        print(f"  [⚠️] Error collecting request identifier: {e}")
-
-                if request_identifiers_to_process:
-                    for k, req_data in enumerate(request_identifiers_to_process):
-                        print(f"\n--- Attempting to process Request {k+1}: '{req_data['name']}' ---")
-                        # Re-navigate to requests page for a fresh DOM before processing each request
-                        # This handles cases where accepting one request might change the list.
-                        await page.goto(initial_inbox_url, timeout=60000) # Go to main inbox
-                        await page.wait_for_url(initial_inbox_url, timeout=10000)
-                        await page.wait_for_timeout(2000)
-                        await page.locator(request_tab_xpath).first.click(timeout=5000) # Re-click requests tab
-                        await page.wait_for_timeout(3000)
-
-                        # Re-locate the specific request button using XPath with text content
-                        # This is the most critical part: robustly finding the *exact* thread
-                        target_req_button_xpath = (
-                            f'//div[contains(@class, "x13dflua") and contains(@class, "x19991ni")]'
-                            f'//div[@role="button" and @tabindex="0"]'
-                            f'[.//span[contains(text(), "{req_data["name"]}")]]' # Match name
-                            f'[.//span[contains(text(), "{req_data["message"]}")]]' # Match message
-                        )
-                        target_req_button_locator = page.locator(target_req_button_xpath).first
-
-                        try:
-                            await target_req_button_locator.wait_for(state="visible", timeout=5000)
-                            processed_data = await process_message_thread(page, target_req_button_locator, initial_inbox_url, is_request=True)
-                            if processed_data:
-                                final_extracted_chat_data.append(processed_data)
-                                print(f"  [✅] Successfully processed message request {k+1}.")
-                            else:
-                                print(f"  [❌] Failed to fully process message request {k+1}. Skipping.")
-                        except PlaywrightTimeoutError:
-                            print(f"  [❌] Timed out re-locating request from '{req_data['name']}'. It might have been processed or moved. Skipping.")
-                        except Exception as e:
-                            print(f"  [❌] Unexpected error re-locating or processing request from '{req_data['name']}': {e}. Skipping.")
-                else:
-                    print("[ℹ️] No identifiable request threads found after initial scan despite tab count.")
-            else:
-                print("[ℹ️] Request tab found but has no visible requests to process.")
-        except PlaywrightTimeoutError:
-            print("[ℹ️] No 'Request' tab found within timeout. Assuming no pending requests.")
-        except Exception as e:
-            print(f"[❌] Error checking for message requests: {e}")
-        
-        # --- PROCESS REGULAR INBOX MESSAGES ---
-        print("\n--- Checking for Regular Inbox Messages ---")
-        outer_thread_wrapper_selector = 'div.x13dflua.x19991ni' 
-        
-        # Ensure we are back on main inbox before processing regular messages
-        await page.goto(initial_inbox_url, wait_until="domcontentloaded", timeout=60000)
-        await page.wait_for_timeout(3000)
-        
-        await page.locator(outer_thread_wrapper_selector).first.wait_for(state="visible", timeout=10000)
-        
-        # Phase 1: Collect Identifiers for regular inbox threads
-        all_regular_thread_identifiers_to_process = [] 
-        seen_regular_identifiers_set = set()
-
-        for _ in range(3): 
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await page.wait_for_timeout(1000)
-        
-        current_thread_wrappers = await page.locator(outer_thread_wrapper_selector).all()
-        print(f"[📋] Found {len(current_thread_wrappers)} potential regular message entries for initial scan.")
+            await wait_for_url(page, lambda url_str: "direct/requests" in url_str, 3000, label="requests page")
+        await wait_for_locator(page, INBOX_THREAD_SELECTOR, 3000, label="requests list")
+
+        # To avoid stale element references when navigating in/out of chats:
+        # collect identifiers for all requests first, then process them.
+        request_identifiers_to_process = await scan_thread_list(page, is_request=True)
+        if request_identifiers_to_process:
+            print(f"[📋] Found {len(request_identifiers_to_process)} message requests. Processing...")
+            final_extracted_chat_data.extend(
+                await process_thread_pipeline(page, request_identifiers_to_process, REQUESTS_URL, is_request=True)
+            )
+        else:
+            print("[ℹ️] No message requests to process.")
+    except PlaywrightTimeoutError:
+        print("[ℹ️] No 'Request' tab found within timeout. Assuming no pending requests.")
+    except Exception as e:
+        print(f"[❌] Error checking for message requests: {e}")
+    
+    # --- PROCESS REGULAR INBOX MESSAGES ---
+    print("\n--- Checking for Regular Inbox Messages ---")
+    print("[🔎] Navigating to Instagram Direct Inbox...")
+    await page.goto(INBOX_URL, wait_until="domcontentloaded", timeout=60000)
+    await record_page_load(page, "inbox")
+
+    if "direct/inbox" not in page.url:
+        print(f"[⚠️] Failed to navigate to inbox. Current URL: {page.url}")
+        await capture_diagnostics(page, "inbox_navigation")
+        return {"status": "error", "error": "Failed to navigate to inbox.", "threads": final_extracted_chat_data}
+
+    await page.locator(INBOX_THREAD_SELECTOR).first.wait_for(state="visible", timeout=10000)
+    print("[✅] Successfully navigated to Direct Inbox.")
+    
+    # Phase 1: Collect Identifiers for regular inbox threads
+    skipped_unchanged = 0
+    if full_scan:
+        all_regular_thread_identifiers_to_process = await scan_thread_list(page, is_request=False)
+    else:
+        thread_state = get_thread_state()
 
-        for i, thread_wrapper_element in enumerate(current_thread_wrappers):
-            thread_button_locator = thread_wrapper_element.locator('div[role="button"][tabindex="0"]').first
+        def has_new_activity(thread_info):
+            nonlocal skipped_unchanged
+            if thread_state.has_new_activity(thread_info):
+                return True
+            skipped_unchanged += 1
+            return False
 
-            user_group_name = "N/A"
-            last_message_text = "N/A"
-            timestamp = "N/A"
-            status_during_scan = "N/A" 
-            
-            try:
-                name_element = thread_button_locator.locator(
-                    'span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft'
-                ).first
-                await name_element.wait_for(state="visible", timeout=100)
-                user_group_name = (await name_element.text_content()).strip()
-
-                message_preview_locator = thread_button_locator.locator(
-                    'div.x6s0dn4.x78zum5 div.html-div.xmix8c7 span[dir="auto"] > span.x1lliihq.x193iq5w.x6ikm8r.x10wlt62.xlyipyv.xuxw1ft'
-                ).first
-                await message_preview_locator.wait_for(state="visible", timeout=100)
-                last_message_text = (await message_preview_locator.text_content()).strip()
-
-                timestamp_element = thread_button_locator.locator('abbr[aria-label]').first
-                await timestamp_element.wait_for(state="visible", timeout=100)
-                timestamp = await timestamp_element.get_attribute('aria-label')
-                
-                try:
-                    unread_indicator_locator = thread_button_locator.locator(
-                        'span[data-visualcompletion="ignore"]:has-text("Unread")'
-                    ).first
-                    await unread_indicator_locator.wait_for(state="visible", timeout=100) 
-                    if await unread_indicator_locator.is_visible():
-                        status_during_scan = "UNREAD"
-                    else:
-                        status_during_scan = "Read"
-                except PlaywrightTimeoutError:
-                    status_during_scan = "Read"
-                except Exception as e:
-                    status_during_scan = f"Error: {e}"
+        all_regular_thread_identifiers_to_process = await scan_thread_list(page, is_request=False, keep=has_new_activity)
+        if skipped_unchanged:
+            print(f"[⏭️] Skipping {skipped_unchanged} threads with no new activity since they were last handled.")
 
-                chat_unique_key = (user_group_name, last_message_text, timestamp)
-                
-                if chat_unique_key not in seen_regular_identifiers_set:
-                    all_regular_thread_identifiers_to_process.append({
-                        "name": user_group_name,
-                        "message": last_message_text,
-                        "timestamp": timestamp,
-                        "status_initial": status_during_scan
-                    })
-                    seen_regular_identifiers_set.add(chat_unique_key)
-                    
-            except PlaywrightTimeoutError:
-                pass
-            except Exception as e:
-                print(f"  [⚠️] Error collecting identifier for regular thread {i+1}: {e}")
-            
-        if not all_regular_thread_identifiers_to_process:
-            print("[ℹ️] No identifiable regular message threads found after initial scan.")
-        else:
-            print(f"[✅] Identified {len(all_regular_thread_identifiers_to_process)} unique regular chat threads to process.")
-
-            # Phase 2: Process each regular inbox message
-            for j, identifier_data in enumerate(all_regular_thread_identifiers_to_process):
-                user_group_name = identifier_data['name']
-                last_message_text = identifier_data['message']
-                timestamp = identifier_data['timestamp']
-                initial_status = identifier_data['status_initial']
-
-                # Navigate back to inbox first for a fresh list of locators
-                await page.goto(initial_inbox_url, wait_until="domcontentloaded", timeout=60000)
-                await page.wait_for_timeout(3000)
-
-                # Re-locate the specific thread to click using XPath with text content
-                target_thread_button_xpath = (
-                    f'//div[contains(@class, "x13dflua") and contains(@class, "x19991ni")]'
-                    f'//div[@role="button" and @tabindex="0"]'
-                    f'[.//span[contains(text(), "{user_group_name}")]]'
-                    f'[.//span[contains(text(), "{last_message_text}")]]'
-                )
-                target_thread_button_locator = page.locator(target_thread_button_xpath).first
+    if not all_regular_thread_identifiers_to_process:
+        print("[ℹ️] No identifiable regular message threads found after initial scan.")
+    else:
+        print(f"[✅] Identified {len(all_regular_thread_identifiers_to_process)} unique regular chat threads to process.")
 
-                try:
-                    await target_thread_button_locator.wait_for(state="visible", timeout=5000)
-                    processed_data = await process_message_thread(page, target_thread_button_locator, initial_inbox_url, is_request=False)
-                    if processed_data:
-                        final_extracted_chat_data.append(processed_data)
-                        print(f"  [✅] Processed regular message {j+1}.")
-                    else:
-                        print(f"  [❌] Failed to fully process regular message {j+1}. Skipping.")
-                except PlaywrightTimeoutError:
-                    print(f"  [❌] Timed out re-locating regular message '{user_group_name}'. It might have changed or been processed already. Skipping.")
-                except Exception as e:
-                    print(f"  [❌] Unexpected error re-locating or processing regular message '{user_group_name}': {e}. Skipping.")
-        
-        # --- Final Summary ---
-        if final_extracted_chat_data:
-            print("\n--- All Processed Chat Threads ---")
-            for k, chat_data in enumerate(final_extracted_chat_data):
-                print(f"\n--- Chat Thread {k+1} ---")
-                print(f"User/Group: {chat_data['User/Group']}")
-                print(f"Last Message: {chat_data['Last Message']}")
-                print(f"Initial Status: {chat_data['Initial Status']}")
-                print(f"Outcome Status: {chat_data['Outcome Status']}")
-                print(f"Timestamp: {chat_data['Timestamp']}")
-                print(f"Chat URL: {chat_data['Chat URL']}")
-        else:
-            print("[ℹ️] No active chat threads (including requests) with extractable content were found after scanning and processing.")
+        # Phase 2: Process each regular inbox message straight from the scan data
+        final_extracted_chat_data.extend(
+            await process_thread_pipeline(page, all_regular_thread_identifiers_to_process, INBOX_URL, is_request=False)
+        )
+    
+    # --- Final Summary ---
+    if final_extracted_chat_data:
+        print("\n--- All Processed Chat Threads ---")
+        for k, chat_data in enumerate(final_extracted_chat_data):
+            print(f"\n--- Chat Thread {k+1} ---")
+            print(f"User/Group: {chat_data['User/Group']}")
+            print(f"Last Message: {chat_data['Last Message']}")
+            print(f"Initial Status: {chat_data['Initial Status']}")
+            print(f"Outcome Status: {chat_data['Outcome Status']}")
+            print(f"Timestamp: {chat_data['Timestamp']}")
+            print(f"Chat URL: {chat_data['Chat URL']}")
+    else:
+        print("[ℹ️] No active chat threads (including requests) with extractable content were found after scanning and processing.")
 
+    await wait_for_network_idle(page, 2000, label="pending requests")
+    return {"status": "done", "threads": final_extracted_chat_data, "skipped_unchanged": skipped_unchanged}
 
-        await page.wait_for_timeout(2000)
-        await browser.close()
-        print("[✅] Message listing and processing complete.")
+async def list_messages(full_scan=False):
+    print("[✉️] Launching bot to list Instagram messages...")
+    await run_single_job(PLATFORM, {"action": "messages", "full": full_scan})
+    print("[✅] Message listing and processing complete.")
+
+# `{"action": "messages"}` jobs for worker/batch runs; add "full": true to ignore thread watermarks.
+async def messages_job(page, job):
+    return await process_inbox(page, full_scan=bool(job.get("full")))
+
+def report_ai_cache():
+    if _response_cache is not None:
+        print(f"[🗃️] AI cache: {_response_cache.stats()}")
+
+# === PLATFORM ADAPTER ===
+# Login, manual mode, worker/batch runs and the command line live in engine.py.
+PLATFORM = Platform(
+    name="instagram",
+    label="Instagram",
+    agent_name=AGENT_NAME,
+    base_url=INSTAGRAM_URL,
+    user_data_dir=USER_DATA_DIR,
+    session_file=SESSION_FILE,
+    login_state_file=LOGIN_STATE_FILE,
+    login_cache_seconds=LOGIN_CACHE_SECONDS,
+    session_cookies=SESSION_COOKIES,
+    login_ui_selectors=LOGIN_UI_SELECTORS,
+    login_paths=LOGIN_PATHS,
+    browser_profile=BROWSER_PROFILE,
+    resource_filter_mode=RESOURCE_FILTER_MODE,
+    resource_stats_file=RESOURCE_STATS_FILE,
+    runtime_stats_file=RUNTIME_STATS_FILE,
+    profile_bundles_dir=PROFILE_BUNDLES_DIR,
+    ledger_file=LEDGER_FILE,
+    process_post=process_post,
+    session_mode=SESSION_MODE,
+    activate=use_agent_settings,
+    actions={"messages": messages_job},
+    prefetch=prefetch_comments,
+    on_finish=report_ai_cache,
+)
+
+# === COMPATIBILITY ===
+# launch_browser, the login-state helpers, wait_until_logged_in, manual_mode,
+# interact_with_post, run_jobs, worker_mode and batch_mode (see engine.script_entry_points)
+globals().update(script_entry_points(PLATFORM))
 
 # === ENTRYPOINT ===
 if __name__ == "__main__":
-    if len(sys.argv) == 2 and sys.argv[1] == "--manual":
-        asyncio.run(manual_mode())
-    elif len(sys.argv) == 2 and sys.argv[1] == "--messages":
-        asyncio.run(list_messages())
-    elif len(sys.argv) == 2 and sys.argv[1].startswith("https://www.instagram.com/"):
-        post_url = sys.argv[1]
-        asyncio.run(interact_with_post(post_url))
+    use_agent_settings()
+    args = take_profile_flag(PLATFORM, sys.argv[1:])
+    if args == ["--startup-check"]:
+        import_time_ms = measure_import_time()
+        within_budget = import_time_ms <= IMPORT_TIME_BUDGET_MS
+        print(f"[{'✅' if within_budget else '⚠️'}] Module import took {import_time_ms:.1f} ms (budget {IMPORT_TIME_BUDGET_MS} ms).")
+        sys.exit(0 if within_budget else 1)
+    elif args[:1] == ["--messages"] and args[1:] in ([], ["--full"]):
+        asyncio.run(list_messages(full_scan=args[1:] == ["--full"]))
     else:
-        print("Usage:")
-        print("  Manual login mode: python instagram.py --manual")
-        print("  List messages:     python instagram.py --messages")
-        print("  Auto post mode:    python instagram.py <instagram_post_url>")
-        sys.exit(1)
+        run_cli(PLATFORM, args, extra_usage=[
+            "List messages:     python {script} --messages [--full]",
+            "Startup check:     python {script} --startup-check",
+        ])
@@ -0,0 +1,378 @@
+import argparse
+import asyncio
+import html
+import importlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from urllib.parse import urlsplit, parse_qs
+
+# === OFFLINE BENCHMARK ===
+# Runs the real post and inbox code paths of Instagram.py / Facebook.py against
+# a local HTTP server that serves fixture pages (./fixtures) built to match the
+# DOM our selectors target, with a stubbed LLM and no configured delays:
+#   python benchmark.py [--posts 5] [--inbox-sizes 10,50,100,200] [--llm-ms 800]
+#                       [--latency-ms 0] [--profile headless] [--filter lean] [--out report.json]
+# Reports wall time per phase (from the telemetry spans), inbox size scaling
+# and round trips: Playwright protocol messages and HTTP requests to the fixture
+# server. All state lives in a temporary directory; nothing touches ./user_data.
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+POST_IMAGES = 6                # large images per post page (what the resource filter can drop)
+POST_IMAGE_BYTES = 150 * 1024
+AVATAR_BYTES = 8 * 1024
+UI_DELAY_MS = 150              # fixture reaction time for like clicks
+INBOX_PAGE_SIZE = 20           # thread rows per lazy-load request
+STUB_REPLY = "Thanks for the message! 🙌"
+STUB_COMMENT = "Love this! 🔥"
+
+# === FIXTURE SERVER ===
+class FixtureState:
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.inbox_size = 0
+        self.request_count = 0
+        self.unread_every = 3
+        self.hits = Counter()   # "document" | "api" | "static" -> requests
+        self.lock = threading.Lock()
+        self._templates = {}
+
+    def configure_inbox(self, inbox_size, request_count=0, unread_every=3):
+        self.inbox_size = inbox_size
+        self.request_count = request_count
+        self.unread_every = unread_every
+
+    def template(self, name):
+        if name not in self._templates:
+            with open(os.path.join(FIXTURES_DIR, name), "r", encoding="utf-8") as f:
+                self._templates[name] = Template(f.read())
+        return self._templates[name]
+
+    def threads(self, kind, offset, limit):
+        total = self.request_count if kind == "requests" else self.inbox_size
+        rows = []
+        for i in range(offset, min(offset + limit, total)):
+            rows.append({
+                "id": f"r{i}" if kind == "requests" else f"t{i}",
+                "name": f"{'Requester' if kind == 'requests' else 'Friend'} {i}",
+                "message": f"Benchmark message number {i}",
+                "timestamp": f"{i + 1} h",
+                "unread": kind == "inbox" and i % self.unread_every == 0,
+                "link": i != 1,   # like instagram.com, one row has no /direct/t/ link and opens on click
+            })
+        return rows
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.hits)
+
+def _images(prefix, count):
+    return "\n".join(f'<img src="/static/img/{prefix}-{n}.jpg" width="400" height="300">' for n in range(count))
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    state = None  # set by start_fixture_server()
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark output readable
+
+    def _count(self, kind):
+        with self.state.lock:
+            self.state.hits[kind] += 1
+        if self.state.latency_ms:
+            time.sleep(self.state.latency_ms / 1000)
+
+    def _send(self, body, content_type="text/html; charset=utf-8", status=200):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _page(self, template_name, **values):
+        self._count("document")
+        self._send(self.state.template(template_name).safe_substitute(ui_delay_ms=UI_DELAY_MS, **values))
+
+    def do_POST(self):
+        self._count("api")
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self._send(b"", status=204)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path
+        segments = [s for s in path.split("/") if s]
+
+        if path.startswith("/static/"):
+            self._count("static")
+            size = AVATAR_BYTES if "/avatar/" in path else POST_IMAGE_BYTES
+            return self._send(b"\xff\xd8" + bytes(size - 2), "image/jpeg")
+
+        if segments[:1] == ["ig"]:
+            base = "/ig/"
+            rest = segments[1:]
+            if not rest:
+                return self._page("instagram_home.html", base=base)
+            if rest[0] == "p" and len(rest) > 1:
+                return self._page("instagram_post.html", base=base, post_id=html.escape(rest[1]),
+                                  caption=f"Sunset over the lake, fixture post {html.escape(rest[1])} #bench",
+                                  images=_images(rest[1], POST_IMAGES))
+            if rest[:2] in (["direct", "inbox"], ["direct", "requests"]):
+                return self._page("instagram_inbox.html", base=base, page_size=INBOX_PAGE_SIZE,
+                                  kind="requests" if rest[1] == "requests" else "inbox")
+            if rest[:2] == ["direct", "t"] and len(rest) > 2:
+                thread_id = rest[2]
+                is_request = thread_id.startswith("r")
+                index = int(thread_id[1:]) if thread_id[1:].isdigit() else 0
+                return self._page("instagram_chat.html", base=base, thread_id=html.escape(thread_id),
+                                  name=f"{'Requester' if is_request else 'Friend'} {index}",
+                                  message=f"Benchmark message number {index}",
+                                  accept_display="block" if is_request else "none",
+                                  composer_display="none" if is_request else "block")
+            if rest[:2] == ["api", "threads"]:
+                self._count("api")
+                query = parse_qs(parts.query)
+                rows = self.state.threads(query.get("kind", ["inbox"])[0], int(query.get("offset", ["0"])[0]),
+                                          int(query.get("limit", [str(INBOX_PAGE_SIZE)])[0]))
+                return self._send(json.dumps(rows), "application/json")
+
+        if segments[:1] == ["fb"]:
+            base = "/fb/"
+            rest = segments[1:]
+            if not rest:
+                return self._page("facebook_home.html", base=base)
+            if rest[0] == "posts" and len(rest) > 1:
+                return self._page("facebook_post.html", base=base, post_id=html.escape(rest[1]),
+                                  caption=f"Fixture post {html.escape(rest[1])}", images=_images(rest[1], POST_IMAGES))
+
+        self._count("document")
+        self._send("<h1>Not found</h1>", status=404)
+
+def start_fixture_server(latency_ms=0):
+    state = FixtureState(latency_ms)
+    handler = type("BoundFixtureHandler", (FixtureHandler,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}/"
+
+# === PROTOCOL ROUND TRIPS ===
+# Counts messages the Python client sends to the Playwright driver. This hooks a
+# private Playwright method, so on versions without it the count is reported as n/a.
+class RoundTripCounter:
+    def __init__(self):
+        self.count = 0
+        self.available = False
+
+    def install(self):
+        try:
+            from playwright._impl._connection import Connection
+        except ImportError:
+            return self
+        original = getattr(Connection, "_send_message_to_server", None)
+        if original is None:
+            return self
+        counter = self
+
+        def counting_send(self, *args, **kwargs):
+            counter.count += 1
+            return original(self, *args, **kwargs)
+
+        Connection._send_message_to_server = counting_send
+        self.available = True
+        return self
+
+# === HARNESS ===
+# Import a bot script with its base URL pointed at the fixture server and every
+# USER_DATA_DIR-derived path moved into `workdir`.
+def load_bot(module_name, workdir):
+    module = importlib.import_module(module_name)
+    original_dir = module.USER_DATA_DIR
+    isolated_dir = os.path.join(workdir, module.AGENT_NAME)
+    for name, value in list(vars(module).items()):
+        if name.isupper() and isinstance(value, str) and value.startswith(original_dir):
+            setattr(module, name, isolated_dir + value[len(original_dir):])
+    for name, value in list(vars(module.PLATFORM).items()):
+        if isinstance(value, str) and value.startswith(original_dir):
+            setattr(module.PLATFORM, name, isolated_dir + value[len(original_dir):])
+    module.MIN_DELAY = module.MAX_DELAY = 0
+    module.PLATFORM.login_cache_seconds = 0
+    os.makedirs(isolated_dir, exist_ok=True)
+    return module
+
+def stub_llm(ig, llm_ms):
+    # Seeded config and prompts: no .env, SDK or prompt files are needed
+    ig._ai_config = {
+        "api_key": None, "timeout": 30.0, "max_concurrency": 2, "cache_ttl": 0,
+        "cache_max_entries": 1, "comment_batch_size": 10,
+    }
+    ig._system_prompts = {"comment": "Write a comment.", "message_reply": "Reply to {sender_name}: {last_message}"}
+
+    async def stub_completion(messages_payload, max_tokens=50):
+        async with ig.get_llm_semaphore():
+            with ig.span("llm_call", max_tokens=max_tokens, stub=True):
+                await asyncio.sleep(llm_ms / 1000)
+        return STUB_REPLY if "reply to" in messages_payload[-1]["content"] else STUB_COMMENT
+
+    ig.request_completion = stub_completion
+    # Inbox sizes reuse the same names and previews; caching would hide the LLM from later runs
+    ig.get_cache_key = lambda *args, **kwargs: None
+
+async def measure(name, coro, counter, fixture_state):
+    rt_before = counter.count
+    hits_before = fixture_state.snapshot()
+    started = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - started
+    hits_after = fixture_state.snapshot()
+    return {
+        "name": name,
+        "wall_s": round(elapsed, 3),
+        "round_trips": counter.count - rt_before if counter.available else None,
+        "http": {k: hits_after.get(k, 0) - hits_before.get(k, 0) for k in hits_after},
+        "status": (result or {}).get("status") if isinstance(result, dict) else None,
+        "result": result,
+    }
+
+def _fmt_rt(value, per=1):
+    return "n/a" if value is None else f"{value / per:.0f}"
+
+async def run_benchmark(args, workdir, base_url, fixture_state, counter):
+    from playwright.async_api import async_playwright
+    from runtime import launch_with_profile
+    from resources import use_resource_filter, report_resource_filter
+    from locators import use_selector_stats
+    from diagnostics import use_diagnostics
+    from engine import wait_until_logged_in
+    import telemetry
+
+    ig = load_bot("Instagram", workdir)
+    fb = load_bot("Facebook", workdir)
+    stub_llm(ig, args.llm_ms)
+    use_selector_stats(os.path.join(workdir, "selector_stats.json"))
+    use_diagnostics(os.path.join(workdir, "diagnostics"), "off")
+    telemetry_file = os.path.join(workdir, "telemetry.jsonl")
+    telemetry.use_telemetry(telemetry_file)
+
+    report = {"config": vars(args), "posts": [], "inbox": []}
+    async with async_playwright() as p:
+        started = time.perf_counter()
+        context = await launch_with_profile(p, os.path.join(workdir, "browser"), args.profile)
+        report["browser_launch_s"] = round(time.perf_counter() - started, 3)
+        # One page per platform, each with that platform's filter (and its fixture host allowed)
+        page = await context.new_page()
+        await use_resource_filter(page, "instagram", args.filter, ig.RESOURCE_STATS_FILE, ig.INSTAGRAM_URL)
+        fb_page = await context.new_page()
+        await use_resource_filter(fb_page, "facebook", args.filter, fb.RESOURCE_STATS_FILE, fb.FACEBOOK_URL)
+
+        telemetry.set_telemetry_job("login")
+        report["login"] = await measure("instagram login check", wait_until_logged_in(ig.PLATFORM, page, force=True), counter, fixture_state)
+
+        for i in range(args.posts):
+            telemetry.set_telemetry_job(f"ig-post-{i}")
+            url = f"{ig.INSTAGRAM_URL}p/bench{i}/"
+            report["posts"].append(await measure(f"instagram post {i}", ig.process_post(page, url), counter, fixture_state))
+        for i in range(args.posts):
+            telemetry.set_telemetry_job(f"fb-post-{i}")
+            url = f"{fb.FACEBOOK_URL}posts/bench{i}"
+            report["posts"].append(await measure(f"facebook post {i}", fb.process_post(fb_page, url), counter, fixture_state))
+
+        for size in args.inbox_sizes:
+            telemetry.set_telemetry_job(f"inbox-{size}")
+            fixture_state.configure_inbox(size, request_count=args.requests)
+            ig._thread_state = None
+            ig.THREAD_STATE_FILE = os.path.join(workdir, f"thread_state_{size}.sqlite3")
+            entry = await measure(f"inbox {size}", ig.process_inbox(page, full_scan=True), counter, fixture_state)
+            entry["size"] = size
+            entry["threads"] = len(entry["result"].get("threads", []))
+            report["inbox"].append(entry)
+
+        report_resource_filter()
+        await context.close()
+
+    telemetry.flush_telemetry()
+    for entry in report["posts"] + report["inbox"] + [report["login"]]:
+        entry.pop("result", None)
+    return report, telemetry_file
+
+def print_report(report, telemetry_file):
+    import telemetry
+
+    print("\n=== Scenarios ===")
+    print(f"browser launch ({report['config']['profile']}): {report['browser_launch_s']:.2f}s")
+    login = report["login"]
+    print(f"login check: {login['wall_s']:.2f}s, {_fmt_rt(login['round_trips'])} round trips")
+    print(f"{'scenario':<22} {'runs':>5} {'wall s/run':>11} {'round trips':>12} {'documents':>10} {'api':>5} {'static':>7}")
+    for platform in ("instagram", "facebook"):
+        runs = [r for r in report["posts"] if r["name"].startswith(platform)]
+        if not runs:
+            continue
+        n = len(runs)
+        rts = None if runs[0]["round_trips"] is None else sum(r["round_trips"] for r in runs)
+        http = Counter()
+        for r in runs:
+            http.update(r["http"])
+        print(f"{platform + ' post':<22} {n:>5} {sum(r['wall_s'] for r in runs) / n:>11.2f} {_fmt_rt(rts, n):>12} "
+              f"{http['document'] / n:>10.1f} {http['api'] / n:>5.1f} {http['static'] / n:>7.1f}")
+
+    if report["inbox"]:
+        print("\n=== Inbox scaling ===")
+        print(f"{'threads':>8} {'handled':>8} {'wall s':>8} {'ms/thread':>10} {'round trips':>12} {'rt/thread':>10} {'documents':>10} {'api':>5}")
+        for r in report["inbox"]:
+            per = max(r["threads"], 1)
+            print(f"{r['size']:>8} {r['threads']:>8} {r['wall_s']:>8.2f} {r['wall_s'] * 1000 / per:>10.0f} "
+                  f"{_fmt_rt(r['round_trips']):>12} {_fmt_rt(r['round_trips'], per):>10} "
+                  f"{r['http'].get('document', 0):>10} {r['http'].get('api', 0):>5}")
+
+    print("\n=== Phases ===")
+    if os.path.exists(telemetry_file):
+        telemetry.print_summary(telemetry.load_spans(telemetry_file))
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Offline benchmark against local fixture pages.")
+    parser.add_argument("--posts", type=int, default=5, help="posts per platform")
+    parser.add_argument("--inbox-sizes", default="10,50,100,200", help="comma-separated inbox sizes")
+    parser.add_argument("--requests", type=int, default=2, help="pending message requests per inbox run")
+    parser.add_argument("--llm-ms", type=int, default=800, help="stubbed LLM latency per call")
+    parser.add_argument("--latency-ms", type=int, default=0, help="added server latency per HTTP request")
+    parser.add_argument("--profile", default="headless", help="browser runtime profile (see runtime.py)")
+    parser.add_argument("--filter", default="lean", help="resource filter mode (see resources.py)")
+    parser.add_argument("--out", help="also write the report as JSON to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    args = parser.parse_args(argv)
+    args.inbox_sizes = [int(s) for s in args.inbox_sizes.split(",") if s.strip()]
+    return args
+
+def main(argv):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="social_bench_")
+    server, fixture_state, base_url = start_fixture_server(args.latency_ms)
+    # Must be set before the bot scripts are imported: their URLs are read at import time
+    os.environ["INSTAGRAM_BASE_URL"] = f"{base_url}ig/"
+    os.environ["FACEBOOK_BASE_URL"] = f"{base_url}fb/"
+    os.environ["DIAGNOSTICS"] = "off"
+    counter = RoundTripCounter().install()
+    print(f"[🧪] Fixture server at {base_url}, working directory {workdir}")
+    try:
+        report, telemetry_file = asyncio.run(run_benchmark(args, workdir, base_url, fixture_state, counter))
+        print_report(report, telemetry_file)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"[💾] Report written to {args.out}")
+    finally:
+        server.shutdown()
+        if args.keep:
+            print(f"[📁] Kept working directory {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,241 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from html.parser import HTMLParser
+
+# === CAPTION METADATA ===
+# A post's caption is already in the HTML the server sends, before anything is
+# rendered, so it can be read at domcontentloaded instead of waiting for the
+# caption element. Sources, most complete first:
+#   ld+json         schema.org data: articleBody / caption / description of
+#                   the item whose url / identifier is this post
+#   embedded JSON   the page's application/json data scripts; only the media
+#                   object whose "code" / "shortcode" is this post counts, so a
+#                   suggested or related post's caption is never picked up
+#   meta tags       og:description / description / twitter:description / og:title,
+#                   which Instagram shortens and wraps as
+#                   '12 likes, 3 comments - user on June 1, 2024: "caption"'
+# The rendered DOM is only the caller's fallback when none of these has it.
+CAPTION_META_KEYS = ("og:description", "description", "twitter:description", "og:title")
+CAPTION_JSON_KEYS = ("articleBody", "caption", "description")
+# Instagram's og:description / og:title always wrap the caption in quotes; without
+# them the tag is a profile or site description, not a caption
+QUOTED_META_KEYS = ("og:description", "og:title")
+# Text inside the quotes of an Instagram meta description / title
+META_CAPTION_QUOTED = re.compile(r'^[^"“]*?:\s*["“](.*)["”]\s*\.?\s*$', re.DOTALL)
+
+# The metadata nodes of a live page in one round trip: meta tags, ld+json, and
+# only the data scripts that mention the shortcode (the rest can be megabytes).
+_CAPTION_METADATA_JS = """
+(shortcode) => {
+    const meta = {};
+    for (const el of document.querySelectorAll("meta[property], meta[name]")) {
+        const key = (el.getAttribute("property") || el.getAttribute("name")).toLowerCase();
+        if (!(key in meta) && el.content) meta[key] = el.content;
+    }
+    const texts = (selector) => Array.from(document.querySelectorAll(selector), (s) => s.textContent);
+    const needle = '"' + shortcode + '"';
+    return {
+        meta: meta,
+        ld_json: texts('script[type="application/ld+json"]'),
+        data: shortcode ? texts('script[type="application/json"]').filter((t) => t.includes(needle) && t.includes("caption")) : [],
+    };
+}
+"""
+
+class _MetadataParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.metadata = {"meta": {}, "ld_json": [], "data": []}
+        self._script = None   # "ld_json" | "data" while inside a script we keep
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or "").lower()
+            if key and attrs.get("content"):
+                self.metadata["meta"].setdefault(key, attrs["content"])
+        elif tag == "script":
+            kind = (attrs.get("type") or "").lower()
+            self._script = {"application/ld+json": "ld_json", "application/json": "data"}.get(kind)
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._script = None
+
+    def handle_data(self, data):
+        if self._script:
+            self.metadata[self._script].append(data)
+
+# The strings an ld+json item names itself by: url, @id, identifier, mainEntityOfPage.
+def _ld_json_references(item):
+    references = []
+    for key in ("url", "@id", "identifier", "mainEntityOfPage"):
+        value = item.get(key)
+        if isinstance(value, dict):
+            value = value.get("@id") or value.get("url") or value.get("value")
+        if isinstance(value, str):
+            references.append(value)
+    return references
+
+# With `shortcode`, only items that reference the post (e.g. its /p/<shortcode>/
+# URL) count, so a related post's or the profile's block is never taken.
+def _ld_json_caption(text, shortcode=None):
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    items = data if isinstance(data, list) else [data]
+    if isinstance(data, dict) and isinstance(data.get("@graph"), list):
+        items = data["@graph"]
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        if shortcode and not any(re.search(rf"(^|/){re.escape(shortcode)}(/|$|\?)", ref)
+                                 for ref in _ld_json_references(item)):
+            continue
+        for key in CAPTION_JSON_KEYS:
+            if isinstance(item.get(key), str) and item[key].strip():
+                return item[key]
+    return None
+
+# Caption of one media object: {"caption": {"text": ...}} (current API shape)
+# or {"edge_media_to_caption": {"edges": [{"node": {"text": ...}}]}} (older).
+def _media_caption(media):
+    caption = media.get("caption")
+    if isinstance(caption, dict):
+        caption = caption.get("text")
+    if isinstance(caption, str) and caption.strip():
+        return caption
+    edges = (media.get("edge_media_to_caption") or {}).get("edges") or []
+    if edges and isinstance(edges[0], dict):
+        text = (edges[0].get("node") or {}).get("text")
+        if isinstance(text, str) and text.strip():
+            return text
+    return None
+
+def _embedded_json_caption(text, shortcode):
+    try:
+        stack = [json.loads(text)]
+    except ValueError:
+        return None
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            if shortcode in (item.get("code"), item.get("shortcode")):
+                caption = _media_caption(item)
+                if caption:
+                    return caption
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+    return None
+
+def _meta_caption(key, content):
+    match = META_CAPTION_QUOTED.match(content.strip())
+    if match:
+        return match.group(1)
+    return None if key in QUOTED_META_KEYS else content
+
+# (caption, source) from collected metadata ({"meta", "ld_json", "data"}), or (None, None).
+# With the post's `shortcode`, ld+json and embedded JSON only count when they
+# name that post; embedded JSON is not searched at all without it.
+def caption_from_metadata(metadata, shortcode=None):
+    for text in metadata["ld_json"]:
+        caption = _ld_json_caption(text, shortcode)
+        if caption:
+            return caption.strip(), "ld_json"
+    if shortcode:
+        for text in metadata["data"]:
+            caption = _embedded_json_caption(text, shortcode)
+            if caption:
+                return caption.strip(), "embedded_json"
+    for key in CAPTION_META_KEYS:
+        if metadata["meta"].get(key):
+            caption = (_meta_caption(key, metadata["meta"][key]) or "").strip()
+            if caption:
+                return caption, f"meta:{key}"
+    return None, None
+
+# (caption, source) from a saved page's HTML.
+def caption_from_html(html, shortcode=None):
+    parser = _MetadataParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass # Keep whatever was parsed before the broken markup
+    return caption_from_metadata(parser.metadata, shortcode)
+
+# (caption, source) from a live page. The nodes are read in the page; the JSON
+# parsing runs in a worker thread so it never blocks the event loop.
+async def caption_from_page(page, shortcode):
+    metadata = await page.evaluate(_CAPTION_METADATA_JS, shortcode)
+    return await asyncio.get_running_loop().run_in_executor(None, caption_from_metadata, metadata, shortcode)
+
+# === CAPTION CACHE ===
+# Captions by post ID (ledger.canonical_post_id), so a post seen again (retry,
+# like-only re-run, another batch) doesn't need its caption read at all.
+CAPTION_CACHE_TTL = 30 * 24 * 3600    # seconds; captions are rarely edited
+
+class CaptionCache:
+    def __init__(self, path, ttl=CAPTION_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS captions ("
+                "post_id TEXT PRIMARY KEY, caption TEXT, source TEXT, fetched_at REAL)"
+            )
+        return self._db
+
+    def get(self, post_id):
+        try:
+            row = self._connect().execute(
+                "SELECT caption, fetched_at FROM captions WHERE post_id = ?", (post_id,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[⚠️] Caption cache read failed: {e}")
+            return None
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return row[0]
+
+    def put(self, post_id, caption, source):
+        try:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO captions (post_id, caption, source, fetched_at) VALUES (?, ?, ?, ?)",
+                (post_id, caption, source, time.time())
+            )
+            db.execute("DELETE FROM captions WHERE fetched_at < ?", (time.time() - self.ttl,))
+            db.commit()
+        except sqlite3.Error as e:
+            print(f"[⚠️] Caption cache write failed: {e}")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+# === CHECK A SAVED PAGE ===
+# python captions.py post.html [SHORTCODE]   (e.g. a "dom" failure snapshot or a saved page)
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python captions.py <post.html> [shortcode]")
+        sys.exit(1)
+    with open(sys.argv[1], "r", encoding="utf-8", errors="replace") as f:
+        caption, source = caption_from_html(f.read(), sys.argv[2] if len(sys.argv) == 3 else None)
+    if caption is None:
+        print("[⚠️] No caption in the page metadata.")
+        sys.exit(1)
+    print(f"[💬] {source}: {caption}")
@@ -0,0 +1,110 @@
+import asyncio
+import contextvars
+import gzip
+import os
+import re
+import time
+
+# === DIAGNOSTIC SNAPSHOTS ===
+# Evidence for failure paths, kept cheap and bounded:
+#   jpeg  compressed viewport screenshot (default)
+#   dom   gzipped page HTML only, no rendering
+#   off   capture nothing
+# Snapshots are named <time>_<job>_<phase>.<ext> and written off the event loop
+# into one directory that works as a ring buffer: once it grows past its size
+# cap the oldest snapshots are deleted. Each phase is captured at most once per
+# `min_interval` seconds, so retry loops (e.g. waiting for a manual login) don't
+# write a file every few seconds. Nothing touches the disk before the first capture.
+DIAGNOSTIC_MODES = ("jpeg", "dom", "off")
+JPEG_QUALITY = 50
+
+_current_job = contextvars.ContextVar("diagnostics_job", default="run")
+
+def _slug(text, limit=40):
+    text = re.sub(r"^https?://(www\.)?", "", str(text))
+    return re.sub(r"[^A-Za-z0-9_-]+", "-", text).strip("-")[-limit:] or "job"
+
+class Diagnostics:
+    def __init__(self, directory, mode="jpeg", max_bytes=50 * 1048576, min_interval=30):
+        if mode not in DIAGNOSTIC_MODES:
+            raise ValueError(f"Unknown diagnostics mode '{mode}' (expected one of {', '.join(DIAGNOSTIC_MODES)}).")
+        self.directory = directory
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.min_interval = min_interval
+        self._last_capture = {}  # (job, phase) -> time of last capture
+        self._files = None       # [(mtime, path, size)] oldest first, loaded on first capture
+
+    def _index(self):
+        if self._files is None:
+            os.makedirs(self.directory, exist_ok=True)
+            files = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if os.path.isfile(path):
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, path, stat.st_size))
+            self._files = sorted(files)
+        return self._files
+
+    def _write(self, path, data):
+        files = self._index()
+        with open(path, "wb") as f:
+            f.write(data)
+        files.append((time.time(), path, len(data)))
+        total = sum(size for _, _, size in files)
+        while total > self.max_bytes and len(files) > 1:
+            _, oldest, size = files.pop(0)
+            try:
+                os.remove(oldest)
+            except OSError:
+                pass
+            total -= size
+
+    # Snapshot `page` for `phase`. Returns the file path, or None if skipped or failed. Never raises.
+    async def capture(self, page, phase):
+        if self.mode == "off":
+            return None
+        job = _current_job.get()
+        now = time.time()
+        if now - self._last_capture.get((job, phase), 0) < self.min_interval:
+            return None
+        self._last_capture[(job, phase)] = now
+
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        try:
+            if self.mode == "jpeg":
+                data = await page.screenshot(type="jpeg", quality=JPEG_QUALITY)
+                path = os.path.join(self.directory, f"{stamp}_{job}_{phase}.jpg")
+            else:
+                html = await page.content()
+                data = gzip.compress(f"<!-- {page.url} -->\n{html}".encode("utf-8"))
+                path = os.path.join(self.directory, f"{stamp}_{job}_{phase}.html.gz")
+            await asyncio.get_running_loop().run_in_executor(None, self._write, path, data)
+        except Exception as e:
+            print(f"[⚠️] Could not capture {phase} diagnostics: {e}")
+            return None
+        print(f"[📸] Saved {phase} diagnostics to {path} ({len(data) / 1024:.0f} KB).")
+        return path
+
+_diagnostics = None
+_diagnostics_by_settings = {}
+
+# Configure snapshot capture for this run. Nothing is created until the first capture.
+# The same settings again reactivate the existing instance and its rate limits.
+def use_diagnostics(directory, mode="jpeg", max_mb=50, min_interval=30):
+    global _diagnostics
+    settings = (directory, mode, max_mb, min_interval)
+    if settings not in _diagnostics_by_settings:
+        _diagnostics_by_settings[settings] = Diagnostics(directory, mode, int(max_mb * 1048576), min_interval)
+    _diagnostics = _diagnostics_by_settings[settings]
+    return _diagnostics
+
+# Name the current job (a job id or URL) for snapshot filenames; applies to the running task.
+def set_diagnostics_job(name):
+    _current_job.set(_slug(name))
+
+async def capture_diagnostics(page, phase):
+    if _diagnostics is None:
+        return None
+    return await _diagnostics.capture(page, phase)
@@ -0,0 +1,608 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from worker import run_worker, run_batch
+from locators import first_visible
+from resources import use_resource_filter, report_resource_filter
+from runtime import (launch_with_profile, launch_shared_browser, new_context_with_profile, measure_job,
+                     disk_usage, profile_in_use, prune_profile_caches)
+from diagnostics import set_diagnostics_job, capture_diagnostics
+from telemetry import set_telemetry_job, flush_telemetry, span
+from profiling import use_profiling, start_profiling, watch_profiled_page, finish_profiling
+from ledger import PostLedger, canonical_post_id
+
+# === PLATFORM ENGINE ===
+# The parts of Facebook.py / Instagram.py that don't depend on the site: login
+# detection, manual login, browser setup, job dispatch and the command line.
+# Each script describes itself with a Platform (URLs, session cookies, logged-in
+# selectors, its process_post and any extra job actions) and keeps only its own
+# like/comment/inbox steps.
+#
+# A single script runs on its persistent profile by default (SESSION_MODE=profile),
+# or with SESSION_MODE=storage on a fresh context in a plain browser, seeded from
+# the session saved by `--manual` (session_storage.json): no profile caches to
+# load, and nothing accumulates between runs. `python engine.py` runs a mixed
+# job list for both sites with one Playwright driver and one browser process,
+# always in storage mode with one context per platform. After a run with at
+# least one successful job the session file is refreshed from the context.
+SESSION_MODES = ("profile", "storage")
+
+class Platform:
+    def __init__(self, name, label, agent_name, base_url, user_data_dir, session_file,
+                 login_state_file, login_cache_seconds, session_cookies, login_ui_selectors,
+                 login_paths, browser_profile, resource_filter_mode, resource_stats_file,
+                 runtime_stats_file, profile_bundles_dir, ledger_file, process_post, session_mode="profile",
+                 activate=None, actions=None, on_finish=None, prefetch=None):
+        if session_mode not in SESSION_MODES:
+            raise ValueError(f"Unknown session mode '{session_mode}' (expected one of {', '.join(SESSION_MODES)}).")
+        self.name = name                          # resource filter rules and job "platform" key
+        self.label = label                        # for log lines
+        self.agent_name = agent_name
+        self.base_url = base_url
+        self.user_data_dir = user_data_dir
+        self.session_file = session_file
+        self.login_state_file = login_state_file
+        self.login_cache_seconds = login_cache_seconds
+        self.session_cookies = session_cookies    # all must be present and unexpired for the cookie fast path
+        self.login_ui_selectors = login_ui_selectors
+        self.login_paths = login_paths            # paths under base_url that mean "not logged in"
+        self.browser_profile = browser_profile
+        self.resource_filter_mode = resource_filter_mode
+        self.resource_stats_file = resource_stats_file
+        self.runtime_stats_file = runtime_stats_file
+        self.profile_bundles_dir = profile_bundles_dir  # one timestamped directory per --profile run
+        self.ledger_file = ledger_file
+        self._ledger = None
+        self.process_post = process_post          # async (page, url, skip_comment=False) -> result dict
+        self.session_mode = session_mode
+        self.activate = activate                  # re-applies the script's selector stats / diagnostics / telemetry
+        self.actions = actions or {}              # {"messages": async (page, job) -> result dict}
+        self.on_finish = on_finish                # called once after the last job
+        self.prefetch = prefetch                  # async (upcoming post jobs) -> None, batch mode only
+
+    # Post action ledger (see ledger.py), opened on first use.
+    def ledger(self):
+        if self._ledger is None:
+            self._ledger = PostLedger(self.ledger_file)
+        return self._ledger
+
+    def owns_url(self, url):
+        return url.startswith(self.base_url)
+
+    def on_login_page(self, url):
+        return url.startswith(tuple(f"{self.base_url}{path}" for path in self.login_paths))
+
+    # Tiered check state: a recently verified result, cached in login_state_file
+    # per session mode, since the profile and the saved session file can be
+    # logged in or out independently. Defaults to the platform's own mode.
+    def _read_login_states(self):
+        try:
+            with open(self.login_state_file, "r") as f:
+                states = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return states if isinstance(states, dict) else {}
+
+    def load_login_state(self, session_mode=None):
+        state = self._read_login_states().get(session_mode or self.session_mode)
+        return state if isinstance(state, dict) else {}
+
+    def save_login_state(self, method, session_mode=None):
+        states = {mode: state for mode, state in self._read_login_states().items() if mode in SESSION_MODES}
+        states[session_mode or self.session_mode] = {"verified_at": time.time(), "method": method}
+        os.makedirs(self.user_data_dir, exist_ok=True)
+        with open(self.login_state_file, "w") as f:
+            json.dump(states, f)
+
+    def clear_login_state(self):
+        if os.path.exists(self.login_state_file):
+            os.remove(self.login_state_file)
+
+    def live_cookie_names(self, cookies):
+        now = time.time()
+        return {c["name"] for c in cookies if c.get("expires", -1) == -1 or c["expires"] > now}
+
+    def has_session_cookies(self, cookies):
+        live = self.live_cookie_names(cookies)
+        return all(name in live for name in self.session_cookies)
+
+# "profile" for a persistent-profile context, "storage" for one opened from the
+# session file (Playwright gives persistent contexts no browser).
+def context_session_mode(context):
+    return "profile" if context.browser is None else "storage"
+
+# === LOGIN DETECTION ===
+# Tiered check: a recently verified result for this session mode (only while
+# the context still holds the main session cookie), then the session cookies
+# already in the context (no navigation), and only if both are inconclusive the
+# homepage navigation probe. The probe waits for a manual login in the open
+# browser unless `max_probes` is set. Returns True once logged in, False after max_probes.
+async def wait_until_logged_in(platform, page, force=False, max_probes=None):
+    print(f"[🔐] Checking if we're logged in to {platform.label}...")
+    started = time.perf_counter()
+    login_span = span("login_check", forced=force, platform=platform.name)
+    session_mode = context_session_mode(page.context)
+    cookies = await page.context.cookies()
+
+    if not force and platform.login_cache_seconds > 0:
+        verified_at = platform.load_login_state(session_mode).get("verified_at", 0)
+        if (time.time() - verified_at < platform.login_cache_seconds
+                and platform.session_cookies[0] in platform.live_cookie_names(cookies)):
+            print(f"[✅] Login verified {time.time() - verified_at:.0f}s ago ({session_mode} session). Skipping check.")
+            login_span.end(method="cache")
+            return True
+
+    if platform.has_session_cookies(cookies):
+        platform.save_login_state("cookies", session_mode)
+        print(f"[✅] Session cookies present. Logged in (checked in {time.perf_counter() - started:.2f}s, no navigation).")
+        login_span.end(method="cookies")
+        return True
+
+    print("[ℹ️] Session cookies inconclusive. Probing the homepage...")
+    probes = 0
+    while True:
+        probes += 1
+        try:
+            await page.goto(platform.base_url, timeout=60000)
+            matched_selector, _ = await first_visible(page, platform.login_ui_selectors, 5000, label="logged-in homepage UI", group="login_ui")
+            if matched_selector is not None:
+                print(f"[✅] Detected logged-in session via `{matched_selector}`.")
+                platform.save_login_state("selector", session_mode)
+                print(f"[⏱️] Login check took {time.perf_counter() - started:.1f}s.")
+                login_span.end(method="selector", probes=probes)
+                return True
+            if platform.on_login_page(page.url):
+                print("[🚫] Redirected to login page. Login required.")
+                platform.clear_login_state()
+            cookies = await page.context.cookies()
+            if any(c["name"] == platform.session_cookies[0] for c in cookies):
+                print(f"[✅] Found {platform.label} session cookie. Assuming logged in.")
+                platform.save_login_state("cookie_after_navigation", session_mode)
+                login_span.end(method="cookie_after_navigation", probes=probes)
+                return True
+        except PlaywrightTimeoutError:
+            print("[⏳] Page navigation timed out during login check. Retrying...")
+        except Exception as e:
+            print(f"[❌] An error occurred during login detection: {e}")
+        await capture_diagnostics(page, "login_wait")
+        if max_probes is not None and probes >= max_probes:
+            login_span.end(outcome="not_logged_in", probes=probes)
+            return False
+        print("[⏳] Still waiting for manual login... (Browser open)")
+        await page.wait_for_timeout(5000)
+
+# === BROWSER ===
+async def launch_browser(p, platform, profile=None):
+    return await launch_with_profile(p, platform.user_data_dir, profile or platform.browser_profile)
+
+# Context for automation runs in the platform's session mode. Returns (context, close).
+# Storage mode falls back to the profile when no session has been saved yet.
+async def open_automation_context(p, platform):
+    os.makedirs(platform.user_data_dir, exist_ok=True)
+    if platform.session_mode == "storage" and os.path.exists(platform.session_file):
+        with span("browser_launch", profile=platform.browser_profile):
+            browser = await launch_shared_browser(p, platform.browser_profile)
+        context = await open_storage_context(browser, platform, platform.browser_profile)
+
+        async def close():
+            await context.close()
+            await browser.close()
+        return context, close
+
+    if platform.session_mode == "storage":
+        print(f"[ℹ️] No saved session at {platform.session_file}. Using the persistent profile.")
+    with span("profile_launch", profile=platform.browser_profile) as launch_span:
+        started = time.perf_counter()
+        context = await launch_browser(p, platform)
+        launch_span.set(profile_mb=round(disk_usage(platform.user_data_dir) / 1048576, 1))
+    print(f"[⏱️] Persistent profile opened in {time.perf_counter() - started:.2f}s.")
+    return context, context.close
+
+async def open_storage_context(browser, platform, profile):
+    with span("context_open", platform=platform.name):
+        started = time.perf_counter()
+        context = await new_context_with_profile(browser, profile, platform.session_file)
+    print(f"[🧩] Opened {platform.label} context from {platform.session_file} in {time.perf_counter() - started:.2f}s.")
+    return context
+
+# Write the context's cookies/localStorage back to the session file (atomically).
+async def save_session(platform, context):
+    tmp_path = f"{platform.session_file}.tmp"
+    try:
+        await context.storage_state(path=tmp_path)
+        os.replace(tmp_path, platform.session_file)
+        print(f"[💾] Refreshed {platform.label} session in {platform.session_file}.")
+    except Exception as e:
+        print(f"[⚠️] Could not refresh the {platform.label} session: {e}")
+
+# === MANUAL MODE ===
+async def manual_mode(platform):
+    print(f"[🧍] Launching browser in manual mode for {platform.label}...")
+    os.makedirs(platform.user_data_dir, exist_ok=True)
+    async with async_playwright() as p:
+        browser = await launch_browser(p, platform, "headed")
+        page = await browser.new_page()
+        await page.goto(platform.base_url, timeout=0)
+        print(f"[✅] Please log in manually to {platform.label}, then close the browser tab.")
+        while len(browser.pages) > 0:
+            await asyncio.sleep(2)
+        print("[💾] Saving cookies and localStorage...")
+        storage_state = await browser.storage_state()
+        with open(platform.session_file, "w") as f:
+            json.dump(storage_state, f, indent=2)
+        print(f"[✅] Session saved to {platform.session_file}")
+        await browser.close()
+
+# === JOBS ===
+def job_name(job):
+    return job.get("id") or job.get("url") or job.get("action") or "job"
+
+def post_job_url(platform, job):
+    url = job.get("url") or ""
+    if job.get("action") in (None, "post") and platform.owns_url(url):
+        return url
+    return None
+
+# Ledger check for a post job, before any browser work: a post that was already
+# liked and commented on is answered from the ledger. Returns that result, or None.
+# Jobs with "force": true always run.
+def skip_handled_post(platform, job):
+    post_id = handled_post_id(platform, job)
+    if post_id is None:
+        return None
+    print(f"[⏭️] {platform.label} post {post_id} was already liked and commented on. Skipping.")
+    return {"status": "skipped", "reason": "already_handled", "post_id": post_id}
+
+# Post ID of a post job the ledger says is fully handled, else None.
+def handled_post_id(platform, job):
+    url = post_job_url(platform, job)
+    if url is None or job.get("force"):
+        return None
+    post_id = canonical_post_id(platform.name, url)
+    if {"like", "comment"} <= platform.ledger().actions_done(platform.name, post_id):
+        return post_id
+    return None
+
+# Batch look-ahead for run_batch: each platform's prefetch hook gets the
+# upcoming post jobs that will actually run (e.g. to batch their comments).
+# None when no platform has a hook, so run_batch reads plainly line by line.
+# The hooks run alongside the current job, so they don't activate() their
+# platform (that would switch the shared helpers under a job of another site).
+def batch_prefetch(platforms):
+    hooked = [platform for platform in platforms if platform.prefetch is not None]
+    if not hooked:
+        return None
+
+    async def prefetch(jobs):
+        for platform in hooked:
+            upcoming = [job for job in jobs if platform_for_job(platforms, job) is platform
+                        and post_job_url(platform, job) and handled_post_id(platform, job) is None]
+            if upcoming:
+                await platform.prefetch(upcoming)
+    return prefetch
+
+# Run one job (a post URL or one of the platform's actions) on a logged-in page.
+async def run_platform_job(platform, page, job):
+    if platform.activate:
+        platform.activate()
+    set_diagnostics_job(job_name(job))
+    set_telemetry_job(job_name(job))
+    # Logged out mid-run: nobody is there to log in during a worker/batch run,
+    # so one probe decides, and the job fails with a login error if it is negative
+    if platform.on_login_page(page.url) and not await wait_until_logged_in(platform, page, force=True, max_probes=1):
+        return {"status": "error", "reason": "login",
+                "error": f"{platform.label} session is logged out; run --manual to log in again."}
+    action = job.get("action")
+    url = post_job_url(platform, job)
+    if action in platform.actions:
+        work = platform.actions[action](page, job)
+    elif action not in (None, "post"):
+        return {"status": "rejected", "error": f"Unknown {platform.label} action '{action}'."}
+    elif url is None:
+        return {"status": "rejected", "error": f"Not a {platform.label} URL."}
+    else:
+        post_id = canonical_post_id(platform.name, url)
+        # Never comment twice on the same post, even when the like still has to be retried
+        commented = "comment" in platform.ledger().actions_done(platform.name, post_id) and not job.get("force")
+        work = platform.process_post(page, url, skip_comment=commented)
+    result = await measure_job(work, platform.browser_profile, platform.runtime_stats_file)
+    if url is not None:
+        platform.ledger().record_post_result(platform.name, post_id, url, result)
+    return result
+
+def finish_platform(platform):
+    if platform.activate:
+        platform.activate()
+    if platform.on_finish:
+        platform.on_finish()
+
+def job_succeeded(result):
+    return isinstance(result, dict) and result.get("status") == "done"
+
+# Hand a job handler to `runner`. Playwright, the platform's context (see
+# open_automation_context) and the login check start with the first job that
+# is not skipped by the ledger; every later job reuses the same page.
+async def run_jobs(platform, runner):
+    session = {}  # "playwright", "context", "close", "page" once the browser is up
+    succeeded = False
+
+    async def open_session():
+        playwright = await async_playwright().start()
+        try:
+            context, close = await open_automation_context(playwright, platform)
+            await use_resource_filter(context, platform.name, platform.resource_filter_mode, platform.resource_stats_file, platform.base_url)
+            page = await context.new_page()
+            await start_profiling(context, page)
+            await wait_until_logged_in(platform, page)
+        except BaseException:
+            await playwright.stop()  # the next job starts over
+            raise
+        session.update(playwright=playwright, context=context, close=close, page=page)
+
+    async def handle_job(job):
+        nonlocal succeeded
+        skipped = skip_handled_post(platform, job)
+        if skipped is not None:
+            return skipped
+        if not session:
+            await open_session()
+        if session["page"].is_closed():
+            session["page"] = await session["context"].new_page()
+            await watch_profiled_page(session["page"])
+        result = await run_platform_job(platform, session["page"], job)
+        succeeded = succeeded or job_succeeded(result)
+        return result
+
+    try:
+        await runner(handle_job)
+    finally:
+        if session:
+            await finish_profiling()
+            finish_platform(platform)
+            if succeeded:
+                await save_session(platform, session["context"])
+            report_resource_filter()
+            await session["close"]()
+            await session["playwright"].stop()
+        else:
+            print("[ℹ️] No job needed the browser; it was never launched.")
+        flush_telemetry()
+
+# One job in its own browser session (post URL from the command line, --messages).
+async def run_single_job(platform, job):
+    print(f"[🚀] Launching automation bot for {platform.agent_name} on {platform.label}")
+
+    async def runner(handle_job):
+        await handle_job(job)
+
+    await run_jobs(platform, runner)
+
+# Resident worker: jobs arrive over stdin (JSON lines) or a unix socket until shutdown.
+async def worker_mode(platform, socket_path=None):
+    print(f"[🏭] Starting resident {platform.label} worker for {platform.agent_name}...")
+    await run_jobs(platform, lambda handle_job: run_worker(handle_job, socket_path))
+
+# Batch: stream a manifest of URLs (file or "-" for stdin) through one session.
+async def batch_mode(platform, source, out_path=None):
+    print(f"[📦] Starting {platform.label} batch run from {'stdin' if source == '-' else source}...")
+    await run_jobs(platform, lambda handle_job: run_batch(handle_job, source, out_path, prefetch=batch_prefetch([platform])))
+
+# === MIXED JOBS ===
+# Route a job to a platform: an explicit "platform" key, then the URL's site,
+# then the only platform that offers the job's action.
+def platform_for_job(platforms, job):
+    if job.get("platform"):
+        return next((pl for pl in platforms if pl.name == job["platform"]), None)
+    url = job.get("url") or ""
+    for platform in platforms:
+        if platform.owns_url(url):
+            return platform
+    offering = [pl for pl in platforms if job.get("action") in pl.actions]
+    return offering[0] if len(offering) == 1 else None
+
+# One browser process for every platform, started with the first job the
+# ledger doesn't skip. Each platform gets its own context, created on its first
+# job from its saved session, so a list with only Instagram jobs never opens a
+# Facebook context.
+async def run_mixed_jobs(platforms, runner, profile):
+    shared = {}    # "playwright", "browser" once started
+    sessions = {}  # platform name -> {"context", "page", "succeeded"} or {"error"}
+
+    async def open_session(platform):
+        if platform.activate:
+            platform.activate()
+        if not os.path.exists(platform.session_file):
+            return {"error": f"No saved {platform.label} session; run its --manual mode first."}
+        if not shared:
+            shared["playwright"] = await async_playwright().start()
+            with span("browser_launch", profile=profile):
+                shared["browser"] = await launch_shared_browser(shared["playwright"], profile)
+        context = await open_storage_context(shared["browser"], platform, profile)
+        await use_resource_filter(context, platform.name, platform.resource_filter_mode, platform.resource_stats_file, platform.base_url)
+        page = await context.new_page()
+        if not await wait_until_logged_in(platform, page, max_probes=1):
+            return {"error": f"Saved {platform.label} session is not logged in; run its --manual mode again."}
+        return {"context": context, "page": page, "succeeded": False}
+
+    async def handle_job(job):
+        platform = platform_for_job(platforms, job)
+        if platform is None:
+            return {"status": "rejected", "error": "No platform handles this job."}
+        skipped = skip_handled_post(platform, job)
+        if skipped is not None:
+            skipped["platform"] = platform.name
+            return skipped
+        if platform.name not in sessions:
+            sessions[platform.name] = await open_session(platform)
+        session = sessions[platform.name]
+        if session.get("error"):
+            return {"status": "rejected", "platform": platform.name, "error": session["error"]}
+        if session["page"].is_closed():
+            session["page"] = await session["context"].new_page()
+        result = await run_platform_job(platform, session["page"], job)
+        session["succeeded"] = session["succeeded"] or job_succeeded(result)
+        if isinstance(result, dict):
+            result.setdefault("platform", platform.name)
+        return result
+
+    try:
+        await runner(handle_job)
+    finally:
+        for platform in platforms:
+            session = sessions.get(platform.name)
+            if session and not session.get("error"):
+                finish_platform(platform)
+                if session["succeeded"]:
+                    await save_session(platform, session["context"])
+        report_resource_filter()
+        flush_telemetry()
+        if shared:
+            await shared["browser"].close()
+            await shared["playwright"].stop()
+
+# === PROFILE MAINTENANCE ===
+# Prune the persistent profile's caches (see runtime.PROFILE_CACHE_DIRS) and
+# report disk usage before/after. With `measure`, a headless persistent launch
+# is timed before and after as well, plus a storage-mode launch for comparison.
+async def time_launches(platform):
+    timings = {}
+    async with async_playwright() as p:
+        started = time.perf_counter()
+        context = await launch_with_profile(p, platform.user_data_dir, "headless")
+        await context.new_page()
+        timings["profile"] = time.perf_counter() - started
+        await context.close()
+        if os.path.exists(platform.session_file):
+            started = time.perf_counter()
+            browser = await launch_shared_browser(p, "headless")
+            context = await new_context_with_profile(browser, "headless", platform.session_file)
+            await context.new_page()
+            timings["storage"] = time.perf_counter() - started
+            await browser.close()
+    return timings
+
+async def prune_profile(platform, site_data=False, measure=False):
+    if profile_in_use(platform.user_data_dir):
+        print(f"[⚠️] {platform.user_data_dir} is in use by a running browser. Stop it first.")
+        return None
+    before_bytes = disk_usage(platform.user_data_dir)
+    before = await time_launches(platform) if measure else {}
+    print(f"[🧹] Pruning {platform.label} profile caches{' and site data' if site_data else ''}...")
+    prune_profile_caches(platform.user_data_dir, site_data)
+    after_bytes = disk_usage(platform.user_data_dir)
+    after = await time_launches(platform) if measure else {}
+    print(f"[💽] Profile size: {before_bytes / 1048576:.1f} MB -> {after_bytes / 1048576:.1f} MB "
+          f"({(before_bytes - after_bytes) / 1048576:.1f} MB freed).")
+    if measure:
+        print(f"[⏱️] Persistent profile launch: {before['profile']:.2f}s -> {after['profile']:.2f}s.")
+        if "storage" in after:
+            print(f"[⏱️] Storage-state context launch: {after['storage']:.2f}s.")
+    return {"before_bytes": before_bytes, "after_bytes": after_bytes, "before_launch": before, "after_launch": after}
+
+# === COMPATIBILITY ===
+# The script-level entry points Facebook.py / Instagram.py had before this
+# module, bound to the script's Platform. Each script publishes them with
+# globals().update(script_entry_points(PLATFORM)) for code that imports them
+# from the script, under the same names and signatures as before.
+def script_entry_points(platform):
+    async def launch_script_browser(p, profile=None):
+        return await launch_browser(p, platform, profile)
+
+    async def wait_until_script_logged_in(page, force=False):
+        return await wait_until_logged_in(platform, page, force=force)
+
+    async def script_manual_mode():
+        await manual_mode(platform)
+
+    async def interact_with_post(url: str):
+        await run_single_job(platform, {"url": url})
+
+    async def run_script_jobs(runner):
+        await run_jobs(platform, runner)
+
+    async def script_worker_mode(socket_path=None):
+        await worker_mode(platform, socket_path)
+
+    async def script_batch_mode(source, out_path=None):
+        await batch_mode(platform, source, out_path)
+
+    return {
+        "launch_browser": launch_script_browser,
+        "load_login_state": platform.load_login_state,
+        "save_login_state": platform.save_login_state,
+        "clear_login_state": platform.clear_login_state,
+        "has_session_cookies": platform.has_session_cookies,
+        "on_login_page": platform.on_login_page,
+        "wait_until_logged_in": wait_until_script_logged_in,
+        "manual_mode": script_manual_mode,
+        "interact_with_post": interact_with_post,
+        "run_jobs": run_script_jobs,
+        "worker_mode": script_worker_mode,
+        "batch_mode": script_batch_mode,
+    }
+
+# === COMMAND LINE ===
+# `--profile` anywhere on a script's command line records that run into a new
+# bundle under profile_bundles_dir (see profiling.py). Returns the other arguments.
+def take_profile_flag(platform, args):
+    if "--profile" not in args:
+        return args
+    use_profiling(os.path.join(platform.profile_bundles_dir, time.strftime("%Y%m%d-%H%M%S")))
+    return [arg for arg in args if arg != "--profile"]
+
+# The common modes of a platform script. `extra_usage` lists the script's own modes ("{script}" is filled in).
+def run_cli(platform, args, extra_usage=()):
+    script = os.path.basename(sys.argv[0])
+    args = take_profile_flag(platform, args)
+    if args == ["--manual"]:
+        asyncio.run(manual_mode(platform))
+    elif len(args) in (1, 3) and args[0] == "--worker":
+        socket_path = args[2] if len(args) == 3 and args[1] == "--socket" else None
+        asyncio.run(worker_mode(platform, socket_path))
+    elif len(args) in (2, 4) and args[0] == "--batch":
+        out_path = args[3] if len(args) == 4 and args[2] == "--out" else None
+        asyncio.run(batch_mode(platform, args[1], out_path))
+    elif args[:1] == ["--prune-profile"] and set(args[1:]) <= {"--site-data", "--measure"}:
+        asyncio.run(prune_profile(platform, "--site-data" in args, "--measure" in args))
+    elif len(args) in (1, 2) and platform.owns_url(args[0]) and args[1:] in ([], ["--force"]):
+        asyncio.run(run_single_job(platform, {"url": args[0], "force": args[1:] == ["--force"]}))
+    else:
+        print("Usage:")
+        print(f"  Manual login mode: python {script} --manual")
+        for line in extra_usage:
+            print(f"  {line.format(script=script)}")
+        print(f"  Auto post mode:    python {script} <{platform.name}_post_url> [--force]")
+        print(f"  Worker mode:       python {script} --worker [--socket /tmp/{platform.name}_worker.sock]")
+        print(f"  Batch mode:        python {script} --batch <urls.txt|urls.jsonl|-> [--out results.jsonl]")
+        print(f"  Prune profile:     python {script} --prune-profile [--site-data] [--measure]")
+        print("  Add --profile to a post, worker or batch run to record a trace/profile bundle.")
+        sys.exit(1)
+
+# python engine.py --batch jobs.jsonl [--out results.jsonl]
+# python engine.py --worker [--socket /tmp/bots.sock]
+# Jobs for both sites in one list; set BROWSER_PROFILE for the shared browser.
+def load_platforms():
+    import Facebook
+    import Instagram
+    return [Facebook.PLATFORM, Instagram.PLATFORM]
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    profile = os.getenv("BROWSER_PROFILE", "headed")
+    if len(args) in (1, 3) and args[0] == "--worker":
+        socket_path = args[2] if len(args) == 3 and args[1] == "--socket" else None
+        print("[🏭] Starting resident mixed worker...")
+        asyncio.run(run_mixed_jobs(load_platforms(), lambda handle_job: run_worker(handle_job, socket_path), profile))
+    elif len(args) in (2, 4) and args[0] == "--batch":
+        out_path = args[3] if len(args) == 4 and args[2] == "--out" else None
+        print(f"[📦] Starting mixed batch run from {'stdin' if args[1] == '-' else args[1]}...")
+        platforms = load_platforms()
+        asyncio.run(run_mixed_jobs(platforms, lambda handle_job: run_batch(handle_job, args[1], out_path, prefetch=batch_prefetch(platforms)), profile))
+    else:
+        print("Usage:")
+        print("  Mixed batch:  python engine.py --batch <jobs.txt|jobs.jsonl|-> [--out results.jsonl]")
+        print("  Mixed worker: python engine.py --worker [--socket /tmp/bots.sock]")
+        sys.exit(1)
@@ -0,0 +1,135 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from urllib.parse import urlsplit, parse_qs
+
+# === POST ACTION LEDGER ===
+# What we already did to which post, so a re-submitted URL is answered from
+# SQLite before any browser work instead of after a launch, login check,
+# navigation, delay and selector probes. One row per (platform, post, action)
+# with the latest outcome:
+#   like     liked | already_liked | like_failed
+#   comment  commented | comment_failed
+# A post whose like and comment both succeeded is skipped; a post that was
+# commented on but not liked is re-run without the comment, so it never gets
+# a duplicate. Posts are keyed by a canonical ID, so the same post reached
+# through different URL shapes (tracking parameters, /reel/ vs /p/, a page
+# name prefix) shares one row.
+SUCCESS_OUTCOMES = {"liked", "already_liked", "commented"}
+
+# Path shapes that carry the post ID, tried in order
+POST_PATH_PATTERNS = {
+    "instagram": [
+        r"^/(?:[^/]+/)?(?:p|reel|reels|tv)/(?P<id>[A-Za-z0-9_-]+)",
+    ],
+    "facebook": [
+        r"^/groups/[^/]+/(?:posts|permalink)/(?P<id>[A-Za-z0-9]+)",
+        r"^/(?:[^/]+/)?(?:posts|videos|reel)/(?P<id>[A-Za-z0-9]+)",
+    ],
+}
+# Query parameters that carry the post ID (permalink.php, story.php, photo.php, watch)
+POST_QUERY_KEYS = {
+    "instagram": (),
+    "facebook": ("story_fbid", "fbid", "v"),
+}
+
+# Canonical post ID for `url`. Unknown shapes fall back to the URL without
+# scheme, www./m. prefix, query string, fragment and trailing slash.
+def canonical_post_id(platform, url):
+    parts = urlsplit(url.strip())
+    path = re.sub(r"/{2,}", "/", parts.path)
+    for pattern in POST_PATH_PATTERNS.get(platform, []):
+        match = re.search(pattern, path)
+        if match:
+            return match.group("id")
+    query = parse_qs(parts.query)
+    for key in POST_QUERY_KEYS.get(platform, ()):
+        if query.get(key):
+            return query[key][0]
+    host = re.sub(r"^(www|m|web)\.", "", (parts.hostname or "").lower())
+    return f"{host}{path.rstrip('/')}"
+
+class PostLedger:
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS post_actions ("
+                "platform TEXT, post_id TEXT, action TEXT, outcome TEXT, url TEXT, handled_at REAL, "
+                "PRIMARY KEY (platform, post_id, action))"
+            )
+        return self._db
+
+    # Actions whose latest outcome was a success, e.g. {"like", "comment"}.
+    def actions_done(self, platform, post_id):
+        rows = self._connect().execute(
+            "SELECT action, outcome FROM post_actions WHERE platform = ? AND post_id = ?", (platform, post_id)
+        ).fetchall()
+        return {action for action, outcome in rows if outcome in SUCCESS_OUTCOMES}
+
+    def record(self, platform, post_id, action, outcome, url=None):
+        db = self._connect()
+        db.execute(
+            "INSERT OR REPLACE INTO post_actions (platform, post_id, action, outcome, url, handled_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (platform, post_id, action, outcome, url, time.time())
+        )
+        db.commit()
+
+    # Record a process_post() result. Redirects and errors record nothing.
+    def record_post_result(self, platform, post_id, url, result):
+        if not isinstance(result, dict) or result.get("status") != "done":
+            return
+        like_outcome = "already_liked" if result.get("already_liked") else ("liked" if result.get("liked") else "like_failed")
+        self.record(platform, post_id, "like", like_outcome, url)
+        if result.get("commented"):
+            self.record(platform, post_id, "comment", "commented", url)
+        elif not result.get("comment_skipped"):
+            self.record(platform, post_id, "comment", "comment_failed", url)
+
+    def forget(self, post_id):
+        db = self._connect()
+        removed = db.execute("DELETE FROM post_actions WHERE post_id = ?", (post_id,)).rowcount
+        db.commit()
+        return removed
+
+    def rows(self):
+        cursor = self._connect().execute(
+            "SELECT platform, post_id, action, outcome, url, handled_at FROM post_actions ORDER BY handled_at DESC"
+        )
+        keys = [column[0] for column in cursor.description]
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+# === EXPORT / MAINTENANCE ===
+# python ledger.py ./user_data/instagram_agent/post_ledger.sqlite3 [--json | --forget POST_ID]
+def print_ledger_report(ledger):
+    rows = ledger.rows()
+    print(f"=== {len(rows)} post actions in {ledger.path} ===")
+    for row in rows:
+        handled = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["handled_at"]))
+        print(f"{handled}  {row['platform']}/{row['post_id']} {row['action']}: {row['outcome']}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        print_ledger_report(PostLedger(sys.argv[1]))
+    elif len(sys.argv) == 3 and sys.argv[2] == "--json":
+        print(json.dumps(PostLedger(sys.argv[1]).rows(), indent=2, ensure_ascii=False))
+    elif len(sys.argv) == 4 and sys.argv[2] == "--forget":
+        removed = PostLedger(sys.argv[1]).forget(sys.argv[3])
+        print(f"[🧹] Forgot {removed} actions for post {sys.argv[3]}.")
+    else:
+        print("Usage: python ledger.py <post_ledger.sqlite3> [--json | --forget POST_ID]")
+        sys.exit(1)
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import sys
+import time
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from telemetry import record_span
+
+# === SELECTOR RACE ===
+# "First visible match wins" over a fallback list of selectors. Instead of
+# trying each selector with its own timeout one after another (worst case =
+# sum of the timeouts), every candidate waits concurrently under one shared
+# deadline (worst case = the deadline). Returns (selector, locator) for the
+# winner, or (None, None) if nothing became visible in time.
+#
+# List order is priority: when a candidate resolves, every candidate listed
+# before it that is still waiting is re-checked on the spot, and the first of
+# those that is visible (and passes `accept`) wins instead. So a broad,
+# low-priority selector that resolves early can't beat a specific one that is
+# already on the page. `accept` is an optional `async (locator) -> bool` check
+# (e.g. "is editable"); a visible candidate that fails it is dropped and the
+# race continues.
+
+async def _wait_visible(locator, timeout_ms):
+    await locator.wait_for(state="visible", timeout=timeout_ms)
+    return locator
+
+async def _acceptable(selector, locator, label, accept):
+    try:
+        return accept is None or await accept(locator)
+    except Exception as e:
+        print(f"[⚠️] Selector `{selector}` matched but failed the check for {label}: {e}")
+        return False
+
+# Higher-priority (listed before `index`) candidates still waiting that are
+# visible right now; returns the first acceptable one, or None.
+async def _prefer_earlier(candidates, pending, index, label, accept):
+    earlier = sorted((candidates[task] for task in pending if candidates[task][0] < index), key=lambda item: item[0])
+    for _, selector, locator in earlier:
+        try:
+            visible = await locator.is_visible()
+        except Exception:
+            continue
+        if visible and await _acceptable(selector, locator, label, accept):
+            return (selector, locator)
+    return None
+
+async def _race(page, selectors, timeout_ms, label, accept):
+    started = time.perf_counter()
+    candidates = {}
+    for index, selector in enumerate(selectors):
+        locator = page.locator(selector).first
+        task = asyncio.ensure_future(_wait_visible(locator, timeout_ms))
+        candidates[task] = (index, selector, locator)
+
+    pending = set(candidates)
+    winner = (None, None)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            visible = []
+            for task in done:
+                index, selector, _ = candidates[task]
+                if task.cancelled():
+                    continue
+                error = task.exception()
+                if error is None:
+                    visible.append((index, selector, task.result()))
+                elif not isinstance(error, PlaywrightTimeoutError):
+                    print(f"[⚠️] Error checking selector `{selector}` for {label}: {error}")
+
+            for index, selector, locator in sorted(visible, key=lambda item: item[0]):
+                if await _acceptable(selector, locator, label, accept):
+                    winner = (selector, locator)
+                    break
+            if winner[0] is not None:
+                winner = await _prefer_earlier(candidates, pending, index, label, accept) or winner
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+        # Reap cancelled/failed tasks so no "exception was never retrieved" warnings are logged
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if winner[0] is not None:
+        print(f"[🏁] {label}: matched `{winner[0]}` in {elapsed_ms:.0f}ms ({len(selectors)} raced).")
+    else:
+        print(f"[🏁] {label}: no match among {len(selectors)} selectors within {timeout_ms}ms.")
+    return winner
+
+# Race `selectors` for the first visible match. With a `group` name and stats
+# enabled via use_selector_stats(), candidates are reordered/pruned from past
+# results and the outcome is recorded. Every race is also a "selector_race" telemetry span.
+async def first_visible(page, selectors, timeout_ms, label="element", accept=None, group=None):
+    started = time.perf_counter()
+    stats = _selector_stats if group else None
+    if stats is None:
+        winner = await _race(page, selectors, timeout_ms, label, accept)
+        _record_race(label, group, winner[0], len(selectors), started)
+        return winner
+
+    ordered, pruned = stats.plan(group, selectors)
+    raced = list(ordered)
+    winner = await _race(page, ordered, timeout_ms, label, accept)
+    if winner[0] is None and pruned:
+        # Pruned selectors get a quick look only, so a dead layout costs little but a revived one is still found.
+        raced += pruned
+        winner = await _race(page, pruned, PRUNED_QUICK_CHECK_MS, f"{label} (pruned selectors)", accept)
+    stats.record(group, raced, winner[0], (time.perf_counter() - started) * 1000)
+    _record_race(label, group, winner[0], len(raced), started)
+    return winner
+
+def _record_race(label, group, selector, candidates, started):
+    record_span("selector_race", (time.perf_counter() - started) * 1000, label=label, group=group,
+                selector=selector, candidates=candidates, outcome="matched" if selector else "no_match")
+
+# === ADAPTIVE SELECTOR ORDERING ===
+# Per-group hit statistics, persisted as JSON under the agent's USER_DATA_DIR.
+# A selector only "takes part" in races that some selector won, because a race
+# where nothing matched (e.g. the post simply isn't liked) says nothing about
+# which selector is dead. Ordering: smoothed win rate, then average match
+# latency, then the hand-written order. Selectors that have taken part in
+# SELECTOR_PRUNE_AFTER races without a single win are pruned, except on every
+# SELECTOR_FULL_PROBE_EVERY-th race of the group, which races the full list so
+# new layouts are still discovered.
+SELECTOR_PRUNE_AFTER = 20
+SELECTOR_FULL_PROBE_EVERY = 10
+PRUNED_QUICK_CHECK_MS = 250
+
+class SelectorStats:
+    def __init__(self, path):
+        self.path = path
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._data = {"groups": {}}
+        return self._data
+
+    def _group(self, group):
+        groups = self._load()["groups"]
+        return groups.setdefault(group, {"races": 0, "no_match": 0, "selectors": {}})
+
+    def plan(self, group, selectors):
+        data = self._group(group)
+        full_probe = data["races"] % SELECTOR_FULL_PROBE_EVERY == 0
+
+        def sort_key(item):
+            index, selector = item
+            entry = data["selectors"].get(selector)
+            if entry is None:
+                return (-0.5, float("inf"), index)
+            win_rate = (entry["wins"] + 1) / (entry["races"] + 2)
+            return (-win_rate, entry.get("avg_ms") or float("inf"), index)
+
+        ordered = [selector for _, selector in sorted(enumerate(selectors), key=sort_key)]
+        if full_probe:
+            return ordered, []
+
+        kept, pruned = [], []
+        for selector in ordered:
+            entry = data["selectors"].get(selector)
+            if entry and entry["races"] >= SELECTOR_PRUNE_AFTER and entry["wins"] == 0:
+                pruned.append(selector)
+            else:
+                kept.append(selector)
+        if not kept:
+            return ordered, []
+        return kept, pruned
+
+    def record(self, group, raced, winner, elapsed_ms):
+        data = self._group(group)
+        data["races"] += 1
+        if winner is None:
+            data["no_match"] += 1
+        else:
+            for selector in raced:
+                entry = data["selectors"].setdefault(selector, {"races": 0, "wins": 0, "avg_ms": None, "last_win": None})
+                entry["races"] += 1
+                if selector == winner:
+                    entry["wins"] += 1
+                    entry["last_win"] = time.time()
+                    # Exponential moving average so layout changes show up quickly
+                    entry["avg_ms"] = elapsed_ms if entry["avg_ms"] is None else round(0.8 * entry["avg_ms"] + 0.2 * elapsed_ms, 1)
+        self.save()
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._load(), f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[⚠️] Could not save selector stats: {e}")
+
+_selector_stats = None
+_selector_stats_by_path = {}
+
+# Enable adaptive ordering for grouped first_visible() calls. Nothing is read until the first race.
+# Using a path again reactivates its existing stats (engine.py switches platforms per job).
+def use_selector_stats(path):
+    global _selector_stats
+    if path and path not in _selector_stats_by_path:
+        _selector_stats_by_path[path] = SelectorStats(path)
+    _selector_stats = _selector_stats_by_path.get(path) if path else None
+    return _selector_stats
+
+# === EXPORT ===
+# python locators.py ./user_data/facebook_agent/selector_stats.json [--json]
+def print_selector_report(path):
+    stats = SelectorStats(path)
+    for group, data in sorted(stats._load()["groups"].items()):
+        print(f"\n=== {group}: {data['races']} races, {data['no_match']} with no match ===")
+        print(f"{'wins':>6} {'races':>6} {'rate':>6} {'avg ms':>8}  selector")
+        entries = sorted(data["selectors"].items(), key=lambda item: (-item[1]["wins"], item[0]))
+        for selector, entry in entries:
+            rate = entry["wins"] / entry["races"] * 100 if entry["races"] else 0
+            avg_ms = f"{entry['avg_ms']:.0f}" if entry["avg_ms"] is not None else "-"
+            dead = "  <- dead weight" if entry["races"] >= SELECTOR_PRUNE_AFTER and entry["wins"] == 0 else ""
+            print(f"{entry['wins']:>6} {entry['races']:>6} {rate:>5.0f}% {avg_ms:>8}  {selector}{dead}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        print_selector_report(sys.argv[1])
+    elif len(sys.argv) == 3 and sys.argv[2] == "--json":
+        print(json.dumps(SelectorStats(sys.argv[1])._load(), indent=2, ensure_ascii=False))
+    else:
+        print("Usage: python locators.py <selector_stats.json> [--json]")
+        sys.exit(1)
@@ -0,0 +1,152 @@
+import asyncio
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+from telemetry import add_span_listener, remove_span_listener
+
+# === ON-DEMAND PROFILING ===
+# `--profile` on Facebook.py / Instagram.py records one run into a timestamped
+# bundle directory, so a slow run can be analysed without reproducing it:
+#   trace.zip          Playwright trace: DOM snapshots, screenshots, network and
+#                      action timings (open with: playwright show-trace <bundle>/trace.zip)
+#   python.pstats      cProfile of the event loop thread, i.e. every asyncio task
+#   python_top.txt     functions by own time: what kept the event loop busy
+#   cdp_samples.jsonl  Chromium Performance.getMetrics every CDP_SAMPLE_SECONDS
+#   spans.jsonl        the run's telemetry spans (recorded even with TELEMETRY=0)
+#   phases.txt         per phase: wall time plus the Chromium task/script/layout/
+#                      style time and heap/DOM growth inside its spans
+# Profiling has overhead of its own (tracing, sampling), so compare profiled
+# runs with each other rather than with normal runs.
+CDP_SAMPLE_SECONDS = 0.25
+CDP_DURATIONS = ("TaskDuration", "ScriptDuration", "LayoutDuration", "RecalcStyleDuration")  # cumulative seconds
+CDP_GAUGES = ("JSHeapUsedSize", "Nodes")
+PYTHON_TOP_FUNCTIONS = 40
+
+class RunProfiler:
+    def __init__(self, directory):
+        self.directory = directory
+        self.spans = []
+        self.samples = []   # [(time.time(), {metric: value})]
+        self._python = cProfile.Profile()
+        self._listener = self.spans.append
+        self._context = None
+        self._cdp = None
+        self._sampler = None
+
+    async def start(self, context, page):
+        os.makedirs(self.directory, exist_ok=True)
+        self._context = context
+        try:
+            await context.tracing.start(screenshots=True, snapshots=True, sources=False)
+        except Exception as e:
+            print(f"[⚠️] Playwright tracing unavailable: {e}")
+        await self.watch_page(page)
+        add_span_listener(self._listener)
+        self._sampler = asyncio.ensure_future(self._sample())
+        self._python.enable()
+        print(f"[🔬] Profiling this run into {self.directory}")
+
+    # Sample CDP metrics from `page` (call again when the run switches to a new page).
+    async def watch_page(self, page):
+        try:
+            self._cdp = await self._context.new_cdp_session(page)
+            await self._cdp.send("Performance.enable")
+        except Exception as e:
+            self._cdp = None
+            print(f"[⚠️] CDP performance metrics unavailable: {e}")
+
+    async def _sample(self):
+        while True:
+            if self._cdp is not None:
+                try:
+                    response = await self._cdp.send("Performance.getMetrics")
+                    self.samples.append((time.time(), {m["name"]: m["value"] for m in response["metrics"]}))
+                except Exception:
+                    pass # Page navigating or closed; try again on the next tick
+            await asyncio.sleep(CDP_SAMPLE_SECONDS)
+
+    async def finish(self):
+        self._python.disable()
+        remove_span_listener(self._listener)
+        self._sampler.cancel()
+        await asyncio.gather(self._sampler, return_exceptions=True)
+        try:
+            await self._context.tracing.stop(path=os.path.join(self.directory, "trace.zip"))
+        except Exception as e:
+            print(f"[⚠️] Could not save the Playwright trace: {e}")
+
+        self._python.dump_stats(os.path.join(self.directory, "python.pstats"))
+        top = io.StringIO()
+        pstats.Stats(self._python, stream=top).sort_stats("tottime").print_stats(PYTHON_TOP_FUNCTIONS)
+        with open(os.path.join(self.directory, "python_top.txt"), "w", encoding="utf-8") as f:
+            f.write(top.getvalue())
+        with open(os.path.join(self.directory, "cdp_samples.jsonl"), "w", encoding="utf-8") as f:
+            for ts, metrics in self.samples:
+                f.write(json.dumps({"ts": round(ts, 3), "metrics": metrics}) + "\n")
+        with open(os.path.join(self.directory, "spans.jsonl"), "w", encoding="utf-8") as f:
+            for record in self.spans:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+        report = phase_report(self.spans, self.samples)
+        with open(os.path.join(self.directory, "phases.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(report) + "\n")
+        print("\n".join(report))
+        print(f"[🔬] Profile bundle saved to {self.directory} "
+              f"(trace: playwright show-trace {os.path.join(self.directory, 'trace.zip')}).")
+
+# === PHASE REPORT ===
+# A span covers [ts - ms, ts]; its Chromium cost is the difference of the
+# cumulative CDP counters between the last sample before it started and the
+# first sample after it ended, so short spans are rounded up to the sample grid.
+def _metrics_delta(sample_times, samples, start, end):
+    if not samples:
+        return None
+    before = max(bisect.bisect_right(sample_times, start) - 1, 0)
+    after = min(bisect.bisect_left(sample_times, end), len(samples) - 1)
+    first, last = samples[before][1], samples[after][1]
+    return {name: last.get(name, 0) - first.get(name, 0) for name in CDP_DURATIONS + CDP_GAUGES}
+
+def phase_report(spans, samples):
+    sample_times = [ts for ts, _ in samples]
+    phases = {}
+    for record in spans:
+        entry = phases.setdefault(record["phase"], {"count": 0, "ms": 0.0, "cdp": dict.fromkeys(CDP_DURATIONS + CDP_GAUGES, 0.0)})
+        entry["count"] += 1
+        entry["ms"] += record["ms"]
+        delta = _metrics_delta(sample_times, samples, record["ts"] - record["ms"] / 1000, record["ts"])
+        for name, value in (delta or {}).items():
+            entry["cdp"][name] += value
+
+    lines = [f"=== {len(spans)} spans, {len(samples)} CDP samples ===",
+             f"{'phase':<22} {'count':>6} {'wall ms':>9} {'task ms':>9} {'script ms':>10} {'layout ms':>10} "
+             f"{'style ms':>9} {'heap +MB':>9} {'nodes +':>8}"]
+    for phase, entry in sorted(phases.items(), key=lambda item: -item[1]["ms"]):
+        cdp = entry["cdp"]
+        lines.append(f"{phase:<22} {entry['count']:>6} {entry['ms']:>9.0f} {cdp['TaskDuration'] * 1000:>9.0f} "
+                     f"{cdp['ScriptDuration'] * 1000:>10.0f} {cdp['LayoutDuration'] * 1000:>10.0f} "
+                     f"{cdp['RecalcStyleDuration'] * 1000:>9.0f} {cdp['JSHeapUsedSize'] / 1048576:>9.1f} {cdp['Nodes']:>8.0f}")
+    return lines
+
+_profiler = None
+
+# Profile the next run into `directory` (None turns profiling off).
+def use_profiling(directory):
+    global _profiler
+    _profiler = RunProfiler(directory) if directory else None
+    return _profiler
+
+async def start_profiling(context, page):
+    if _profiler is not None:
+        await _profiler.start(context, page)
+
+async def watch_profiled_page(page):
+    if _profiler is not None:
+        await _profiler.watch_page(page)
+
+async def finish_profiling():
+    if _profiler is not None:
+        await _profiler.finish()
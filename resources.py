@@ -0,0 +1,182 @@
+import json
+import os
+import re
+from collections import Counter
+from urllib.parse import urlsplit
+
+# === RESOURCE FILTER ===
+# Route-level filter for the requests a bot page makes. None of the images,
+# autoplay video, fonts or tracking beacons are needed to find a like button,
+# comment box or DM row, but they dominate bandwidth and time to
+# domcontentloaded. Blocking them changes what the site sees, so filtering is
+# opt-in (RESOURCE_FILTER in the bot scripts). Modes:
+#   off   load everything (the default; also records the baseline for the report)
+#   lean  deny list: drop BLOCKED_TYPES and the platform's deny patterns
+#   safe  allow list: keep only SAFE_TYPES from the platform's own hosts
+#         (PLATFORM_RULES plus the host of the configured base URL, e.g. a
+#         custom deployment or benchmark.py's fixture server)
+# Blocked requests never transfer, so "bytes saved" is estimated from the
+# average size of each resource type seen while it was not blocked.
+RESOURCE_MODES = ("off", "lean", "safe")
+BLOCKED_TYPES = {"image", "media", "font", "manifest", "texttrack"}
+SAFE_TYPES = {"document", "script", "stylesheet", "xhr", "fetch", "websocket", "eventsource"}
+
+PLATFORM_RULES = {
+    "facebook": {
+        "hosts": [r"(^|\.)facebook\.com$", r"(^|\.)fbcdn\.net$", r"(^|\.)fbsbx\.com$"],
+        "deny": [r"/ajax/bz", r"/ajax/bnzai", r"/tr/?\?", r"/security/hsts-pixel", r"/ajax/webstorage/process_keys"],
+        "allow": [],
+    },
+    "instagram": {
+        "hosts": [r"(^|\.)instagram\.com$", r"(^|\.)cdninstagram\.com$", r"(^|\.)fbcdn\.net$", r"(^|\.)facebook\.com$"],
+        "deny": [r"/logging_client_events", r"/ajax/bz", r"/falco", r"/logging/", r"graph\.instagram\.com/logging"],
+        "allow": [],
+    },
+}
+
+# Resolves to [domContentLoaded ms, load ms] of the last navigation, or null.
+_NAVIGATION_TIMING_JS = """
+() => {
+    const nav = performance.getEntriesByType("navigation")[0];
+    return nav ? [nav.domContentLoadedEventEnd, nav.loadEventEnd] : null;
+}
+"""
+
+class ResourceFilter:
+    def __init__(self, platform, mode="off", stats_path=None, base_url=None):
+        if mode not in RESOURCE_MODES:
+            raise ValueError(f"Unknown resource filter mode '{mode}' (expected one of {', '.join(RESOURCE_MODES)}).")
+        rules = PLATFORM_RULES[platform]
+        self.platform = platform
+        self.mode = mode
+        self.stats_path = stats_path
+        self.hosts = [re.compile(p) for p in rules["hosts"]]
+        base_host = urlsplit(base_url).hostname if base_url else None
+        if base_host:
+            self.hosts.append(re.compile(f"^{re.escape(base_host)}$"))
+        self.deny = [re.compile(p) for p in rules["deny"]]
+        self.allow = [re.compile(p) for p in rules["allow"]]
+        self.blocked = Counter()     # resource type -> blocked requests
+        self.loaded_bytes = Counter()  # resource type -> bytes of responses with a content-length
+        self.loaded_count = Counter()
+        self.load_times = {}         # label -> [domcontentloaded ms, ...]
+        self.target = None
+
+    def should_block(self, resource_type, url):
+        if self.mode == "off":
+            return False
+        if any(p.search(url) for p in self.allow):
+            return False
+        if any(p.search(url) for p in self.deny):
+            return True
+        if self.mode == "lean":
+            return resource_type in BLOCKED_TYPES
+        host = urlsplit(url).hostname or ""
+        return resource_type not in SAFE_TYPES or not any(p.search(host) for p in self.hosts)
+
+    async def _handle_route(self, route):
+        request = route.request
+        try:
+            if self.should_block(request.resource_type, request.url):
+                self.blocked[request.resource_type] += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+        except Exception:
+            pass # Page/context closed while the request was in flight
+
+    def _on_response(self, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            resource_type = response.request.resource_type
+            self.loaded_bytes[resource_type] += int(length)
+            self.loaded_count[resource_type] += 1
+
+    # `target` is a page or a (persistent) browser context.
+    async def attach(self, target):
+        self.target = target
+        target.on("response", self._on_response)
+        if self.mode != "off":
+            await target.route("**/*", self._handle_route)
+        print(f"[🧹] Resource filter '{self.mode}' active for {self.platform}.")
+        return self
+
+    async def record_load(self, page, label):
+        try:
+            timing = await page.evaluate(_NAVIGATION_TIMING_JS)
+        except Exception:
+            return None
+        if timing and timing[0] > 0:
+            self.load_times.setdefault(label, []).append(timing[0])
+            return timing[0]
+        return None
+
+    def _load_stats(self):
+        try:
+            with open(self.stats_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"type_bytes": {}, "loads": {}}
+
+    # Merge this run into the persisted averages and print bytes saved / load-time deltas.
+    def report(self):
+        stats = self._load_stats() if self.stats_path else {"type_bytes": {}, "loads": {}}
+        for resource_type, total in self.loaded_bytes.items():
+            entry = stats["type_bytes"].setdefault(resource_type, [0, 0])
+            entry[0] += total
+            entry[1] += self.loaded_count[resource_type]
+        mode_loads = stats["loads"].setdefault(self.mode, {})
+        for label, times in self.load_times.items():
+            entry = mode_loads.setdefault(label, [0.0, 0])
+            entry[0] += sum(times)
+            entry[1] += len(times)
+
+        saved_bytes = 0
+        for resource_type, count in self.blocked.items():
+            total, seen = stats["type_bytes"].get(resource_type, [0, 0])
+            if seen:
+                saved_bytes += count * total / seen
+        blocked_total = sum(self.blocked.values())
+        loaded_total = sum(self.loaded_bytes.values())
+        print(f"[🧹] Resource filter '{self.mode}': blocked {blocked_total} requests "
+              f"({', '.join(f'{t} {n}' for t, n in self.blocked.most_common()) or 'none'}), "
+              f"~{saved_bytes / 1048576:.1f} MB saved, {loaded_total / 1048576:.1f} MB loaded.")
+
+        baseline = stats["loads"].get("off", {})
+        for label, times in self.load_times.items():
+            average = sum(times) / len(times)
+            base_total, base_count = baseline.get(label, [0.0, 0])
+            if self.mode != "off" and base_count:
+                base_average = base_total / base_count
+                print(f"[⏱️] {label} domcontentloaded: {average:.0f}ms vs {base_average:.0f}ms unfiltered "
+                      f"({average - base_average:+.0f}ms).")
+            else:
+                print(f"[⏱️] {label} domcontentloaded: {average:.0f}ms ({len(times)} loads).")
+
+        if self.stats_path:
+            try:
+                os.makedirs(os.path.dirname(self.stats_path) or ".", exist_ok=True)
+                with open(self.stats_path, "w", encoding="utf-8") as f:
+                    json.dump(stats, f, indent=2)
+            except OSError as e:
+                print(f"[⚠️] Could not save resource stats: {e}")
+
+# Filters attached since the last report; a mixed run (engine.py) has one per platform context.
+_resource_filters = []
+
+# Create the filter for `platform` and attach it to `target` (a context, or a page).
+async def use_resource_filter(target, platform, mode, stats_path=None, base_url=None):
+    resource_filter = await ResourceFilter(platform, mode, stats_path, base_url).attach(target)
+    _resource_filters.append(resource_filter)
+    return resource_filter
+
+# Record the navigation timing of `page` under `label` with the filter of its context (no-op without one).
+async def record_page_load(page, label):
+    for resource_filter in reversed(_resource_filters):
+        if resource_filter.target is page or resource_filter.target is page.context:
+            return await resource_filter.record_load(page, label)
+    return None
+
+def report_resource_filter():
+    while _resource_filters:
+        _resource_filters.pop(0).report()
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+
+# === BROWSER RUNTIME PROFILES ===
+# Bundles of launch settings for launch_persistent_context(). Pick one with the
+# BROWSER_PROFILE environment variable; "headed" is the original setup and is
+# always used for manual login.
+#   headed    visible window, 1280x800, default Chromium
+#   headless  no window/virtual display, 1280x800, reduced motion, no animations
+#   minimal   headless plus a smaller viewport and Chromium flags that trim
+#             memory and CPU (no GPU, no background work, fewer renderers)
+# Every profile keeps the viewport wide enough for the desktop layout the
+# selectors are written for.
+LEAN_CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--renderer-process-limit=2",
+    "--js-flags=--max-old-space-size=512",
+]
+
+RUNTIME_PROFILES = {
+    "headed": {
+        "headless": False,
+        "viewport": {"width": 1280, "height": 800},
+        "reduced_motion": None,
+        "disable_animations": False,
+        "args": [],
+    },
+    "headless": {
+        "headless": True,
+        "viewport": {"width": 1280, "height": 800},
+        "reduced_motion": "reduce",
+        "disable_animations": True,
+        "args": [],
+    },
+    "minimal": {
+        "headless": True,
+        "viewport": {"width": 1024, "height": 720},
+        "reduced_motion": "reduce",
+        "disable_animations": True,
+        "args": LEAN_CHROMIUM_ARGS,
+    },
+}
+
+# Injected into every page of an animation-free profile.
+_NO_ANIMATIONS_JS = """
+(() => {
+    const css = "*, *::before, *::after { animation: none !important; transition: none !important; caret-color: auto !important; }";
+    const inject = () => {
+        const style = document.createElement("style");
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+    };
+    if (document.readyState === "loading") document.addEventListener("DOMContentLoaded", inject);
+    else inject();
+})();
+"""
+
+def get_runtime_profile(name):
+    if name not in RUNTIME_PROFILES:
+        raise ValueError(f"Unknown browser profile '{name}' (expected one of {', '.join(RUNTIME_PROFILES)}).")
+    return RUNTIME_PROFILES[name]
+
+def _browser_options(profile):
+    options = {"headless": profile["headless"]}
+    if profile["args"]:
+        options["args"] = profile["args"]
+    return options
+
+def _context_options(profile):
+    options = {"viewport": profile["viewport"]}
+    if profile["reduced_motion"]:
+        options["reduced_motion"] = profile["reduced_motion"]
+    return options
+
+def _describe_profile(name, profile):
+    print(f"[🖥️] Browser profile '{name}': {'headless' if profile['headless'] else 'headed'}, "
+          f"{profile['viewport']['width']}x{profile['viewport']['height']}, {len(profile['args'])} extra flags.")
+
+# Launch a persistent context for `user_data_dir` with the named profile.
+async def launch_with_profile(p, user_data_dir, name):
+    profile = get_runtime_profile(name)
+    context = await p.chromium.launch_persistent_context(user_data_dir, **_browser_options(profile), **_context_options(profile))
+    if profile["disable_animations"]:
+        await context.add_init_script(_NO_ANIMATIONS_JS)
+    _describe_profile(name, profile)
+    return context
+
+# Launch a plain browser for several contexts (see new_context_with_profile).
+async def launch_shared_browser(p, name):
+    profile = get_runtime_profile(name)
+    browser = await p.chromium.launch(**_browser_options(profile))
+    _describe_profile(name, profile)
+    return browser
+
+# New isolated context in a shared browser, optionally seeded from a storage_state file.
+async def new_context_with_profile(browser, name, storage_state=None):
+    profile = get_runtime_profile(name)
+    context = await browser.new_context(storage_state=storage_state, **_context_options(profile))
+    if profile["disable_animations"]:
+        await context.add_init_script(_NO_ANIMATIONS_JS)
+    return context
+
+# === PROFILE DIRECTORY ===
+# A persistent profile only ever grows: HTTP and code caches, GPU shader caches
+# and the sites' service workers and IndexedDB. None of it is needed to stay
+# logged in (that's cookies and localStorage), so it can be pruned while no
+# browser is using the profile. Paths are relative to the user data directory.
+PROFILE_CACHE_DIRS = [
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "Default/DawnCache",
+    "Default/DawnGraphiteCache",
+    "Default/DawnWebGPUCache",
+    "Default/Service Worker/CacheStorage",
+    "Default/Service Worker/ScriptCache",
+    "GrShaderCache",
+    "GraphiteDawnCache",
+    "ShaderCache",
+    "component_crx_cache",
+]
+# Site storage; also pruned with site_data=True (sites rebuild it, the login survives)
+PROFILE_SITE_DATA_DIRS = [
+    "Default/Service Worker",
+    "Default/IndexedDB",
+    "Default/File System",
+]
+
+def disk_usage(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+# Chromium holds SingletonLock in the profile while it runs.
+def profile_in_use(user_data_dir):
+    return os.path.lexists(os.path.join(user_data_dir, "SingletonLock"))
+
+# Delete the cache directories of a profile that is not in use. Returns bytes freed.
+def prune_profile_caches(user_data_dir, site_data=False):
+    freed = 0
+    for relative in PROFILE_CACHE_DIRS + (PROFILE_SITE_DATA_DIRS if site_data else []):
+        path = os.path.join(user_data_dir, relative)
+        if os.path.isdir(path):
+            size = disk_usage(path)
+            shutil.rmtree(path, ignore_errors=True)
+            freed += size - (disk_usage(path) if os.path.exists(path) else 0)
+    return freed
+
+# === RESOURCE USAGE ===
+# Peak RSS and CPU seconds of this Python process plus every descendant process
+# (the Playwright driver and all Chromium processes), read from /proc. RSS is
+# sampled every USAGE_SAMPLE_SECONDS while a measurement is running; CPU is
+# the difference of cumulative user+system time. Linux only; elsewhere the
+# measurement reports nothing.
+USAGE_SAMPLE_SECONDS = 0.5
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def _process_table():
+    table = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue # Process exited while we were looking
+        # Fields after the ")" that closes the command name: state ppid ... utime(12) stime(13) ... rss(22)
+        fields = stat[stat.rfind(")") + 2:].split()
+        table[int(entry)] = (int(fields[1]), int(fields[11]) + int(fields[12]), int(fields[21]))
+    return table
+
+# (rss bytes, cpu seconds) summed over this process and its descendants.
+def process_tree_usage(root_pid=None):
+    root_pid = root_pid or os.getpid()
+    table = _process_table()
+    children = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+    rss = 0
+    ticks = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        if pid in table:
+            rss += table[pid][2] * _PAGE_SIZE
+            ticks += table[pid][1]
+        stack.extend(children.get(pid, []))
+    # Children that already exited and were reaped still count towards our own rusage
+    reaped = os.times()
+    return rss, ticks / _CLOCK_TICKS + reaped.children_user + reaped.children_system
+
+class UsageMeter:
+    def __init__(self):
+        self.enabled = os.path.isdir("/proc/self")
+        self.peak_rss = 0
+        self._cpu_started = 0.0
+        self._sampler = None
+
+    async def _sample(self):
+        while True:
+            self.peak_rss = max(self.peak_rss, process_tree_usage()[0])
+            await asyncio.sleep(USAGE_SAMPLE_SECONDS)
+
+    def start(self):
+        if not self.enabled:
+            return self
+        self.peak_rss, self._cpu_started = process_tree_usage()
+        self._sampler = asyncio.ensure_future(self._sample())
+        return self
+
+    # Stop sampling and return {"rss_peak_mb", "cpu_s"} (empty when unsupported).
+    async def stop(self):
+        if not self.enabled:
+            return {}
+        self._sampler.cancel()
+        await asyncio.gather(self._sampler, return_exceptions=True)
+        rss, cpu = process_tree_usage()
+        self.peak_rss = max(self.peak_rss, rss)
+        return {"rss_peak_mb": round(self.peak_rss / 1048576, 1), "cpu_s": round(cpu - self._cpu_started, 2)}
+
+# Add one job's usage to the per-profile totals in `path`.
+def record_profile_usage(path, profile_name, usage):
+    if not usage:
+        return
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            stats = json.load(f)
+    except (FileNotFoundError, ValueError):
+        stats = {}
+    entry = stats.setdefault(profile_name, {"jobs": 0, "cpu_s": 0.0, "rss_peak_mb_sum": 0.0, "rss_peak_mb_max": 0.0})
+    entry["jobs"] += 1
+    entry["cpu_s"] = round(entry["cpu_s"] + usage["cpu_s"], 2)
+    entry["rss_peak_mb_sum"] = round(entry["rss_peak_mb_sum"] + usage["rss_peak_mb"], 1)
+    entry["rss_peak_mb_max"] = max(entry["rss_peak_mb_max"], usage["rss_peak_mb"])
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+    except OSError as e:
+        print(f"[⚠️] Could not save runtime stats: {e}")
+
+# Await `job` (a coroutine) while measuring it; usage is printed, added to the
+# per-profile totals and merged into the job's result record.
+async def measure_job(job, profile_name, stats_path):
+    meter = UsageMeter().start()
+    try:
+        result = await job
+    finally:
+        usage = await meter.stop()
+    record_profile_usage(stats_path, profile_name, usage)
+    if usage:
+        print(f"[📈] Job used {usage['cpu_s']:.2f} CPU s, peak RSS {usage['rss_peak_mb']:.0f} MB ('{profile_name}' profile).")
+        if isinstance(result, dict):
+            result.update(usage)
+    return result
+
+# === EXPORT ===
+# python runtime.py ./user_data/instagram_agent/runtime_stats.json
+def print_profile_report(path):
+    with open(path, "r", encoding="utf-8") as f:
+        stats = json.load(f)
+    print(f"{'profile':<10} {'jobs':>6} {'cpu s/job':>10} {'avg peak MB':>12} {'max peak MB':>12}")
+    for name, entry in sorted(stats.items(), key=lambda item: item[1]["cpu_s"] / max(item[1]["jobs"], 1)):
+        jobs = max(entry["jobs"], 1)
+        print(f"{name:<10} {entry['jobs']:>6} {entry['cpu_s'] / jobs:>10.2f} "
+              f"{entry['rss_peak_mb_sum'] / jobs:>12.0f} {entry['rss_peak_mb_max']:>12.0f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        print_profile_report(sys.argv[1])
+    else:
+        print("Usage: python runtime.py <runtime_stats.json>")
+        sys.exit(1)
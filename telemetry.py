@@ -0,0 +1,174 @@
+import atexit
+import contextvars
+import json
+import math
+import os
+import sys
+import time
+
+# === RUN TELEMETRY ===
+# Timed spans for the phases of a run (login check, navigation, delay, like,
+# comment box search, LLM call, typing, inbox scan, per-thread processing...),
+# appended as JSON lines to one file per agent:
+#   {"ts": ..., "run": "20260101-120000-4242", "job": "...", "phase": "like",
+#    "ms": 812.4, "outcome": "liked", "retries": 1}
+# Extra attributes (selector used, retry counts, row counts) go in the same
+# record. Spans are buffered and written in small batches and at exit.
+# Summary over many runs: python telemetry.py <telemetry.jsonl> [--runs N]
+TELEMETRY_FLUSH_EVERY = 20
+
+_current_job = contextvars.ContextVar("telemetry_job", default=None)
+
+class Telemetry:
+    def __init__(self, path):
+        self.path = path
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self._buffer = []
+        atexit.register(self.flush)
+
+    def record(self, record):
+        record["run"] = self.run_id
+        self._buffer.append(record)
+        if len(self._buffer) >= TELEMETRY_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        lines = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in self._buffer)
+        self._buffer = []
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError as e:
+            print(f"[⚠️] Could not write telemetry: {e}")
+
+_telemetry = None
+_telemetry_by_path = {}
+_span_listeners = []  # called with every finished span record, even with recording off
+
+def _emit(record):
+    for listener in _span_listeners:
+        listener(record)
+    if _telemetry is not None:
+        _telemetry.record(record)
+
+class Span:
+    def __init__(self, phase, attrs):
+        self.phase = phase
+        self.attrs = dict(attrs)
+        self.started = time.perf_counter()
+        self.done = False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    # Close the span (once) with optional final attributes such as outcome=...
+    def end(self, **attrs):
+        if self.done:
+            return self
+        self.done = True
+        self.attrs.update(attrs)
+        if _telemetry is not None or _span_listeners:
+            record = {"ts": round(time.time(), 3), "job": _current_job.get(), "phase": self.phase,
+                      "ms": round((time.perf_counter() - self.started) * 1000, 1)}
+            record.update(self.attrs)
+            record.setdefault("outcome", "ok")
+            _emit(record)
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and "outcome" not in self.attrs:
+            self.attrs["outcome"] = "cancelled" if exc_type.__name__ == "CancelledError" else f"error:{exc_type.__name__}"
+        self.end()
+        return False
+
+# Start a span; close it with span.end(...) or use it as `with span("phase") as s:`.
+def span(phase, **attrs):
+    return Span(phase, attrs)
+
+# Record a phase that was already timed elsewhere.
+def record_span(phase, ms, **attrs):
+    if _telemetry is not None or _span_listeners:
+        record = {"ts": round(time.time(), 3), "job": _current_job.get(), "phase": phase, "ms": round(ms, 1)}
+        record.update(attrs)
+        record.setdefault("outcome", "ok")
+        _emit(record)
+
+# Enable span recording to `path` (None disables). Nothing is written before the first flush.
+# Using a path again reactivates its recorder, keeping its run id and buffer.
+def use_telemetry(path):
+    global _telemetry
+    if path and path not in _telemetry_by_path:
+        _telemetry_by_path[path] = Telemetry(path)
+    _telemetry = _telemetry_by_path.get(path) if path else None
+    return _telemetry
+
+# Also hand every finished span to `listener(record)` (see profiling.py).
+def add_span_listener(listener):
+    _span_listeners.append(listener)
+
+def remove_span_listener(listener):
+    if listener in _span_listeners:
+        _span_listeners.remove(listener)
+
+def set_telemetry_job(name):
+    _current_job.set(name)
+
+def flush_telemetry():
+    for telemetry in _telemetry_by_path.values():
+        telemetry.flush()
+
+# === SUMMARY ===
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def load_spans(path, last_runs=None):
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue # Partially written line from an interrupted run
+    if last_runs:
+        runs = []
+        for record in spans:
+            if record.get("run") not in runs:
+                runs.append(record.get("run"))
+        keep = set(runs[-last_runs:])
+        spans = [r for r in spans if r.get("run") in keep]
+    return spans
+
+def print_summary(spans):
+    phases = {}
+    for record in spans:
+        phases.setdefault(record["phase"], []).append(record)
+    runs = len({r.get("run") for r in spans})
+    print(f"=== {len(spans)} spans from {runs} runs ===")
+    print(f"{'phase':<22} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} {'not ok':>7}")
+    for phase, records in sorted(phases.items(), key=lambda item: -sum(r["ms"] for r in item[1])):
+        values = sorted(r["ms"] for r in records)
+        not_ok = sum(1 for r in records if str(r.get("outcome", "ok")).startswith(("error", "cancelled", "timeout", "failed")))
+        print(f"{phase:<22} {len(values):>6} {percentile(values, 50):>9.0f} {percentile(values, 90):>9.0f} "
+              f"{percentile(values, 99):>9.0f} {values[-1]:>9.0f} {not_ok:>7}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        print_summary(load_spans(sys.argv[1]))
+    elif len(sys.argv) == 4 and sys.argv[2] == "--runs":
+        print_summary(load_spans(sys.argv[1], int(sys.argv[3])))
+    else:
+        print("Usage: python telemetry.py <telemetry.jsonl> [--runs N]")
+        sys.exit(1)
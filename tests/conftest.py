@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The bot scripts and helpers are flat modules at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing a bot script must not write telemetry or snapshots into ./user_data
+os.environ["TELEMETRY"] = "0"
+os.environ["DIAGNOSTICS"] = "off"
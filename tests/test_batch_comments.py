@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("playwright")
+from Instagram import parse_batch_comments
+
+
+def test_json_array():
+    assert parse_batch_comments('["Nice!", "Love it"]', 2) == ["Nice!", "Love it"]
+
+
+def test_fenced_json_with_chatter_and_objects():
+    raw = 'Here you go:\n```json\n[{"comment": "Nice!"}, {"comment": "Love it"}]\n```'
+    assert parse_batch_comments(raw, 2) == ["Nice!", "Love it"]
+
+
+def test_numbered_lines():
+    assert parse_batch_comments('1. "Nice!"\n2) Love it', 2) == ["Nice!", "Love it"]
+
+
+@pytest.mark.parametrize("raw", ['["only one"]', '["a", ""]', "1. a\n3. b", "no comments here"])
+def test_wrong_shape_returns_none(raw):
+    assert parse_batch_comments(raw, 2) is None
@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+from captions import CaptionCache, caption_from_html, caption_from_page
+
+
+def test_og_description_quoted_caption():
+    html = ('<head><meta property="og:description" content="12 likes, 3 comments - someone on '
+            'June 1, 2024: &quot;Sunset &amp; lake&quot;"></head>')
+    assert caption_from_html(html) == ("Sunset & lake", "meta:og:description")
+
+
+def test_plain_meta_description():
+    assert caption_from_html('<meta name="description" content="Plain text">') == ("Plain text", "meta:description")
+
+
+def test_ld_json_wins_over_meta():
+    html = ('<script type="application/ld+json">[{"@type": "SocialMediaPosting", "articleBody": "Full body"}]</script>'
+            '<meta property="og:description" content="short">')
+    assert caption_from_html(html) == ("Full body", "ld_json")
+
+
+def _ld_json(items):
+    return f'<script type="application/ld+json">{json.dumps(items)}</script>'
+
+
+def test_ld_json_only_for_this_post():
+    html = _ld_json([
+        {"@type": "ProfilePage", "url": "https://www.instagram.com/someone/", "description": "Profile bio"},
+        {"@type": "SocialMediaPosting", "url": "https://www.instagram.com/p/OTHER/", "articleBody": "Related post"},
+        {"@type": "SocialMediaPosting", "url": "https://www.instagram.com/p/ABC/", "articleBody": "This post"},
+    ])
+    assert caption_from_html(html, "ABC") == ("This post", "ld_json")
+
+
+def test_unmatched_ld_json_falls_through_to_embedded_json():
+    html = (_ld_json({"@type": "ProfilePage", "description": "Profile bio"})
+            + _data_script([{"code": "ABC", "caption": {"text": "This post"}}]))
+    assert caption_from_html(html, "ABC") == ("This post", "embedded_json")
+
+
+def test_unquoted_og_description_is_not_a_caption():
+    html = ('<meta property="og:description" content="See Instagram photos and videos from someone">'
+            '<meta property="og:title" content="someone • Instagram">')
+    assert caption_from_html(html) == (None, None)
+
+
+def _data_script(items):
+    return f'<script type="application/json">{json.dumps({"items": items})}</script>'
+
+
+def test_embedded_json_only_for_this_post():
+    html = _data_script([
+        {"code": "OTHER", "caption": {"text": "Related post"}},
+        {"code": "ABC", "caption": {"text": "This post"}},
+    ]) + '<meta property="og:description" content="short">'
+    assert caption_from_html(html, "ABC") == ("This post", "embedded_json")
+
+
+def test_embedded_json_older_shape():
+    html = _data_script([{"shortcode": "ABC", "edge_media_to_caption": {"edges": [{"node": {"text": "Old shape"}}]}}])
+    assert caption_from_html(html, "ABC") == ("Old shape", "embedded_json")
+
+
+def test_embedded_json_ignored_without_matching_shortcode():
+    html = _data_script([{"code": "OTHER", "caption": {"text": "Related post"}}]) + '<meta name="description" content="Plain text">'
+    assert caption_from_html(html, "ABC") == ("Plain text", "meta:description")
+    assert caption_from_html(html) == ("Plain text", "meta:description")
+
+
+def test_caption_from_page_reads_evaluated_metadata():
+    class FakePage:
+        async def evaluate(self, script, shortcode):
+            return {"meta": {}, "ld_json": [], "data": [json.dumps({"code": shortcode, "caption": {"text": "Live"}})]}
+
+    assert asyncio.run(caption_from_page(FakePage(), "ABC")) == ("Live", "embedded_json")
+
+
+def test_no_metadata():
+    assert caption_from_html("<html><body><p>nothing</p></body></html>") == (None, None)
+
+
+def test_caption_cache_round_trip(tmp_path):
+    cache = CaptionCache(str(tmp_path / "captions.sqlite3"))
+    cache.put("ABC", "Sunset", "meta:og:description")
+    assert cache.get("ABC") == "Sunset"
+    assert cache.get("other") is None
+
+
+def test_caption_cache_expires(tmp_path):
+    cache = CaptionCache(str(tmp_path / "captions.sqlite3"), ttl=-1)
+    cache.put("ABC", "Sunset", "meta")
+    assert cache.get("ABC") is None
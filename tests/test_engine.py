@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("playwright")
+import engine
+
+
+def platform(tmp_path, session_mode="profile"):
+    async def process_post(page, url, skip_comment=False):
+        return {"status": "done"}
+
+    return engine.Platform(
+        name="instagram", label="Instagram", agent_name="test", base_url="https://www.instagram.com/",
+        user_data_dir=str(tmp_path), session_file=str(tmp_path / "session.json"),
+        login_state_file=str(tmp_path / "login_state.json"), login_cache_seconds=600,
+        session_cookies=["sessionid", "ds_user_id"], login_ui_selectors=[], login_paths=("accounts/login",),
+        browser_profile="headless", resource_filter_mode="off", resource_stats_file=None,
+        runtime_stats_file=None, profile_bundles_dir=str(tmp_path), ledger_file=str(tmp_path / "ledger.sqlite3"),
+        process_post=process_post, session_mode=session_mode,
+    )
+
+
+class FakeContext:
+    def __init__(self, cookies, persistent=True):
+        self._cookies = cookies
+        self.browser = None if persistent else object()
+
+    async def cookies(self):
+        return self._cookies
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+
+def test_login_state_is_kept_per_session_mode(tmp_path):
+    pl = platform(tmp_path)
+    pl.save_login_state("selector", "storage")
+    assert pl.load_login_state("storage")["method"] == "selector"
+    assert pl.load_login_state() == {}  # the profile was never verified
+    pl.save_login_state("cookies")
+    assert pl.load_login_state("profile")["method"] == "cookies"
+    assert pl.load_login_state("storage")["method"] == "selector"
+
+
+def test_old_single_state_file_is_ignored(tmp_path):
+    pl = platform(tmp_path)
+    (tmp_path / "login_state.json").write_text('{"verified_at": %f, "method": "cookies"}' % time.time())
+    assert pl.load_login_state() == {}
+
+
+def test_cached_login_needs_the_session_cookie(tmp_path, monkeypatch):
+    pl = platform(tmp_path)
+    pl.save_login_state("selector", "profile")
+    probed = []
+
+    async def first_visible(*args, **kwargs):
+        probed.append(True)
+        raise RuntimeError("stop after the first probe")
+
+    async def capture_diagnostics(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(engine, "first_visible", first_visible)
+    monkeypatch.setattr(engine, "capture_diagnostics", capture_diagnostics)
+
+    class ProbePage(FakePage):
+        url = "https://www.instagram.com/"
+
+        async def goto(self, url, timeout=None):
+            pass
+
+    # Main session cookie present: the cached verification is trusted
+    page = ProbePage(FakeContext([{"name": "sessionid", "expires": -1}]))
+    assert asyncio.run(engine.wait_until_logged_in(pl, page, max_probes=1))
+    assert probed == []
+    # Cookies gone: the cache is not enough, the homepage is probed
+    page = ProbePage(FakeContext([]))
+    assert not asyncio.run(engine.wait_until_logged_in(pl, page, max_probes=1))
+    assert probed == [True]
+    # A storage-mode context has no cached verification of its own
+    page = ProbePage(FakeContext([{"name": "sessionid", "expires": -1}], persistent=False))
+    assert not asyncio.run(engine.wait_until_logged_in(pl, page, max_probes=1))
+    assert len(probed) == 2
+
+
+def test_script_entry_points_are_bound_to_the_platform(tmp_path):
+    pl = platform(tmp_path)
+    entry_points = engine.script_entry_points(pl)
+    entry_points["save_login_state"]("cookies")
+    assert entry_points["load_login_state"]()["method"] == "cookies"
+    assert entry_points["on_login_page"]("https://www.instagram.com/accounts/login/")
+    assert {"launch_browser", "wait_until_logged_in", "manual_mode", "interact_with_post",
+            "run_jobs", "worker_mode", "batch_mode", "clear_login_state", "has_session_cookies"} <= set(entry_points)
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("playwright")
+import Instagram as ig
+from thread_state import ThreadStateStore
+
+
+def row(name, unread=True):
+    return {"name": name, "message": f"hi from {name}", "timestamp": "1h", "unread": unread, "href": None}
+
+
+class FakeLocator:
+    async def all(self):
+        return []
+
+
+class FakePage:
+    # page.evaluate() for the in-page row extraction: returns `rounds` in order;
+    # an Exception instance is raised instead. DOM-quiet waits resolve at once.
+    def __init__(self, rounds):
+        self.rounds = list(rounds)
+        self.extractions = 0
+
+    async def evaluate(self, script, args=None):
+        if script is not ig._THREAD_ROWS_JS:
+            return True
+        self.extractions += 1
+        result = self.rounds.pop(0) if self.rounds else {"total": 0, "rows": []}
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def locator(self, selector):
+        return FakeLocator()
+
+
+async def collect(page):
+    return [thread async for thread in ig.stream_thread_rows(page)]
+
+
+def test_evaluate_error_after_first_round_falls_back_to_locators():
+    page = FakePage([{"total": 2, "rows": [row("Anna"), row("Ben")]}, RuntimeError("context destroyed")])
+    threads = asyncio.run(collect(page))
+    assert [t["name"] for t in threads] == ["Anna", "Ben"]
+    assert page.extractions == 2  # no in-page retries once it failed
+
+
+def test_evaluate_error_on_first_round_falls_back_to_locators():
+    page = FakePage([RuntimeError("boom")])
+    assert asyncio.run(collect(page)) == []
+
+
+def test_scan_starts_replies_while_scanning(monkeypatch):
+    started = []
+
+    async def fake_reply(prompt_type, user_message="", sender_name="", use_cache=True):
+        started.append(sender_name)
+        return "ok"
+
+    monkeypatch.setattr(ig, "generate_ai_response", fake_reply)
+    rows = [row(f"User {i}") for i in range(ig.REPLY_PIPELINE_DEPTH + 2)] + [row("Read one", unread=False)]
+    page = FakePage([{"total": len(rows), "rows": rows}])
+
+    async def scan():
+        threads = await ig.scan_thread_list(page)
+        await asyncio.sleep(0)
+        ig.cancel_reply_tasks(threads)
+        return threads
+
+    threads = asyncio.run(scan())
+    with_tasks = [info["name"] for info, task in threads if task is not None]
+    assert with_tasks == [f"User {i}" for i in range(ig.REPLY_PIPELINE_DEPTH)]
+    assert started == with_tasks
+    assert len(threads) == len(rows)
+
+
+def test_producer_cancelled_on_full_queue_cancels_unqueued_reply(monkeypatch):
+    async def slow_reply(prompt_type, user_message="", sender_name="", use_cache=True):
+        await asyncio.sleep(10)
+
+    started = {}
+    start = ig.start_reply_generation
+
+    def tracked_start(thread_info):
+        started[thread_info["name"]] = start(thread_info)
+        return started[thread_info["name"]]
+
+    monkeypatch.setattr(ig, "generate_ai_response", slow_reply)
+    monkeypatch.setattr(ig, "start_reply_generation", tracked_start)
+    threads = [({"name": "A", "message": "a", "status_initial": "UNREAD"}, None),
+               ({"name": "B", "message": "b", "status_initial": "UNREAD"}, None)]
+
+    async def run():
+        queue = asyncio.Queue(maxsize=1)
+        producer = asyncio.ensure_future(ig.produce_reply_tasks(threads, queue))
+        await asyncio.sleep(0.01)  # A is queued, the producer waits to queue B
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        await asyncio.sleep(0)
+        states = {name: task.cancelled() for name, task in started.items()}
+        started["A"].cancel()
+        return states
+
+    assert asyncio.run(run()) == {"A": False, "B": True}
+
+
+def test_incremental_scan_skips_handled_rows_without_chat_links(tmp_path):
+    # Like instagram.com: no /direct/t/ link in the rows, so watermarks match by name + preview
+    store = ThreadStateStore(str(tmp_path / "threads.sqlite3"))
+    store.record("https://www.instagram.com/direct/t/111/", "Anna", "hi from Anna", "1h", reply="hey!")
+    rows = [row("Anna", unread=False), row("Ben", unread=False)]
+    page = FakePage([{"total": len(rows), "rows": rows}])
+    threads = asyncio.run(ig.scan_thread_list(page, keep=store.has_new_activity))
+    assert [info["name"] for info, _ in threads] == ["Ben"]
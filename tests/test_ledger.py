@@ -0,0 +1,52 @@
+import pytest
+
+from ledger import PostLedger, canonical_post_id
+
+
+@pytest.mark.parametrize("url, post_id", [
+    ("https://www.instagram.com/p/ABC_-1/", "ABC_-1"),
+    ("https://www.instagram.com/p/ABC_-1/?igsh=tracking", "ABC_-1"),
+    ("https://instagram.com/reel/ABC_-1", "ABC_-1"),
+    ("https://www.instagram.com/someone/p/ABC_-1/", "ABC_-1"),
+    ("https://www.instagram.com/tv/ABC_-1/#comments", "ABC_-1"),
+])
+def test_instagram_url_shapes_share_one_id(url, post_id):
+    assert canonical_post_id("instagram", url) == post_id
+
+
+@pytest.mark.parametrize("url, post_id", [
+    ("https://www.facebook.com/ExamplePage/posts/1234567890", "1234567890"),
+    ("https://m.facebook.com/ExamplePage/posts/1234567890/?ref=share", "1234567890"),
+    ("https://www.facebook.com/groups/42/permalink/777/", "777"),
+    ("https://www.facebook.com/permalink.php?story_fbid=555&id=1", "555"),
+    ("https://www.facebook.com/watch/?v=999", "999"),
+])
+def test_facebook_url_shapes(url, post_id):
+    assert canonical_post_id("facebook", url) == post_id
+
+
+def test_unknown_shape_falls_back_to_normalized_url():
+    assert canonical_post_id("facebook", "https://web.facebook.com/some/thing/?x=1") == "facebook.com/some/thing"
+
+
+def test_record_post_result_and_actions_done(tmp_path):
+    ledger = PostLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record_post_result("instagram", "A", "u", {"status": "done", "liked": True, "commented": False})
+    assert ledger.actions_done("instagram", "A") == {"like"}
+
+    ledger.record_post_result("instagram", "A", "u", {"status": "done", "already_liked": True, "liked": True, "commented": True})
+    assert ledger.actions_done("instagram", "A") == {"like", "comment"}
+
+    # A like-only re-run keeps the earlier comment
+    ledger.record_post_result("instagram", "A", "u", {"status": "done", "liked": True, "comment_skipped": True})
+    assert ledger.actions_done("instagram", "A") == {"like", "comment"}
+    assert ledger.actions_done("facebook", "A") == set()
+
+
+def test_redirects_are_not_recorded_and_forget_removes_rows(tmp_path):
+    ledger = PostLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record_post_result("instagram", "A", "u", {"status": "redirected", "final_url": "x"})
+    assert ledger.rows() == []
+    ledger.record("instagram", "A", "like", "liked")
+    assert ledger.forget("A") == 1
+    assert ledger.rows() == []
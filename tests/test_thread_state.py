@@ -0,0 +1,58 @@
+from thread_state import ThreadStateStore, thread_id_from_url
+
+CHAT_A = "https://www.instagram.com/direct/t/111/"
+CHAT_B = "https://www.instagram.com/direct/t/222/"
+
+
+def row(message="see you", status="Read", chat_url=CHAT_A, name="Anna"):
+    return {"name": name, "message": message, "timestamp": "1h", "status_initial": status, "chat_url": chat_url}
+
+
+def test_thread_id_from_url():
+    assert thread_id_from_url(CHAT_A + "?x=1") == "111"
+    assert thread_id_from_url("https://www.instagram.com/direct/inbox/") is None
+    assert thread_id_from_url(None) is None
+
+
+def test_watermark_skips_only_the_same_thread(tmp_path):
+    store = ThreadStateStore(str(tmp_path / "threads.sqlite3"))
+    assert store.record(CHAT_A, "Anna", "see you", "1h", reply="bye!", outcome="Replied")
+    assert not store.has_new_activity(row())
+    assert not store.has_new_activity(row(message="You: bye!"))
+    assert store.has_new_activity(row(message="one more thing"))
+    # Same display name, different thread
+    assert store.has_new_activity(row(chat_url=CHAT_B))
+
+
+def test_rows_without_a_chat_link_match_by_name_and_preview(tmp_path):
+    store = ThreadStateStore(str(tmp_path / "threads.sqlite3"))
+    store.record(CHAT_A, "Anna", "see you", "1h", reply="bye!")
+    assert not store.has_new_activity(row(chat_url=None))
+    assert not store.has_new_activity(row(message="You: bye!", chat_url=None))
+    assert store.has_new_activity(row(message="one more thing", chat_url=None))
+    assert store.has_new_activity(row(name="Ben", chat_url=None))
+    assert not store.record("N/A", "Anna", "see you", "1h")
+
+
+def test_linkless_rows_matching_several_threads_are_new(tmp_path):
+    store = ThreadStateStore(str(tmp_path / "threads.sqlite3"))
+    store.record(CHAT_A, "Anna", "ok", "1h")
+    store.record(CHAT_B, "Anna", "ok", "2h")
+    assert store.has_new_activity(row(message="ok", chat_url=None))
+    store.record(CHAT_B, "Anna", "later", "2h")
+    assert not store.has_new_activity(row(message="ok", chat_url=None))
+
+
+def test_unread_and_requests_are_always_new(tmp_path):
+    store = ThreadStateStore(str(tmp_path / "threads.sqlite3"))
+    store.record(CHAT_A, "Anna", "see you", "1h")
+    assert store.has_new_activity(row(status="UNREAD"))
+    assert store.has_new_activity(row(status="REQUEST"))
+
+
+def test_same_named_threads_keep_separate_watermarks(tmp_path):
+    store = ThreadStateStore(str(tmp_path / "threads.sqlite3"))
+    store.record(CHAT_A, "Anna", "from the first Anna", "1h")
+    store.record(CHAT_B, "Anna", "from the second Anna", "2h")
+    assert {r["thread_id"]: r["last_message"] for r in store.rows()} == {
+        "111": "from the first Anna", "222": "from the second Anna"}
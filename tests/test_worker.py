@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import worker
+from worker import parse_job_line, run_batch
+
+
+def test_bare_url_becomes_post_job():
+    assert parse_job_line("  https://www.instagram.com/p/abc/\n") == {"url": "https://www.instagram.com/p/abc/"}
+
+
+def test_json_job_is_returned_as_is():
+    assert parse_job_line('{"id": "1", "action": "messages", "full": true}') == {"id": "1", "action": "messages", "full": True}
+
+
+@pytest.mark.parametrize("line", ["", "   \n", "# a comment"])
+def test_blank_lines_and_comments_are_skipped(line):
+    assert parse_job_line(line) is None
+
+
+@pytest.mark.parametrize("line", ["{not json", '{"a": 1'])
+def test_invalid_json_raises_value_error(line):
+    with pytest.raises(ValueError):
+        parse_job_line(line)
+
+
+def _slow_manifest(monkeypatch, lines, more):
+    # Yields `lines`, then waits for `more` before EOF, like `--batch -` with a slow writer
+    async def read_job_lines(source):
+        for line in lines:
+            yield line
+        await more.wait()
+    monkeypatch.setattr(worker, "read_job_lines", read_job_lines)
+
+
+async def _run_streaming_batch(monkeypatch, tmp_path, prefetch):
+    more = asyncio.Event()
+    ran = []
+    _slow_manifest(monkeypatch, ["https://a/\n"], more)
+
+    async def handle_job(job):
+        ran.append(job["url"])
+        more.set()  # EOF only comes after the first job has run
+        return {"status": "done"}
+
+    await asyncio.wait_for(run_batch(handle_job, "-", str(tmp_path / "out.jsonl"), prefetch=prefetch), 5)
+    return ran
+
+
+@pytest.mark.parametrize("with_prefetch", [False, True])
+def test_batch_runs_jobs_before_eof(monkeypatch, tmp_path, with_prefetch):
+    async def prefetch(jobs):
+        pass
+    ran = asyncio.run(_run_streaming_batch(monkeypatch, tmp_path, prefetch if with_prefetch else None))
+    assert ran == ["https://a/"]
+
+
+def test_batch_prefetch_runs_in_background_and_failures_are_ignored(monkeypatch, tmp_path):
+    lines = [f"https://p/{i}\n" for i in range(worker.BATCH_PREFETCH_WINDOW + 3)] + ["{bad\n"]
+    more = asyncio.Event()
+    more.set()
+    _slow_manifest(monkeypatch, lines, more)
+    windows = []
+
+    async def prefetch(jobs):
+        windows.append([job["url"] for job in jobs])
+        raise RuntimeError("LLM down")
+
+    async def handle_job(job):
+        await asyncio.sleep(0)
+        return {"status": "done"}
+
+    out = tmp_path / "out.jsonl"
+    summary = asyncio.run(run_batch(handle_job, "-", str(out), prefetch=prefetch))
+    assert summary["processed"] == worker.BATCH_PREFETCH_WINDOW + 3
+    assert [len(w) for w in windows] == [worker.BATCH_PREFETCH_WINDOW, 3]
+    assert '"rejected"' in out.read_text().splitlines()[-1]
@@ -0,0 +1,133 @@
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+
+# === INBOX WATERMARKS ===
+# Per-thread record of what the last `--messages` run already handled, so the
+# next run only opens threads with new activity. One row per thread, keyed by
+# the thread id from the chat URL it was handled on (/direct/t/<id>/).
+# Instagram's inbox rows usually carry no chat link, so a row is matched to its
+# watermark by thread id when it has one, else by display name + preview (see
+# has_new_activity). Names alone are not unique (first names, group titles).
+#   name          the thread name shown in the inbox
+#   last_message  preview text of the incoming message we last handled
+#   last_reply    what we sent back (the preview shows it after our reply)
+#   timestamp     the row's timestamp label at that time
+#   chat_url      the thread's /direct/t/ URL
+#   handled_at    when the thread was last handled (epoch seconds)
+
+# Thread id from a chat URL, or None.
+def thread_id_from_url(chat_url):
+    match = re.search(r"/direct/t/([^/?#]+)", chat_url or "")
+    return match.group(1) if match else None
+
+WATERMARK_KEYS = ("name", "last_message", "last_reply", "timestamp", "chat_url", "outcome", "handled_at")
+
+# The preview still shows the message we handled, or the reply we sent to it.
+def shows_handled(entry, preview):
+    return preview == entry["last_message"] or bool(entry["last_reply"] and entry["last_reply"] in preview)
+
+class ThreadStateStore:
+    def __init__(self, path):
+        self.path = path
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS thread_watermarks ("
+                "thread_id TEXT PRIMARY KEY, name TEXT, last_message TEXT, last_reply TEXT, timestamp TEXT, "
+                "chat_url TEXT, outcome TEXT, handled_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS thread_watermarks_name ON thread_watermarks (name)")
+        return self._db
+
+    def get(self, thread_id):
+        row = self._connect().execute(
+            f"SELECT {', '.join(WATERMARK_KEYS)} FROM thread_watermarks WHERE thread_id = ?", (thread_id,)
+        ).fetchone()
+        return dict(zip(WATERMARK_KEYS, row)) if row else None
+
+    def by_name(self, name):
+        rows = self._connect().execute(
+            f"SELECT {', '.join(WATERMARK_KEYS)} FROM thread_watermarks WHERE name = ?", (name,)
+        ).fetchall()
+        return [dict(zip(WATERMARK_KEYS, row)) for row in rows]
+
+    # A thread is unchanged if it is not unread and its preview still shows what
+    # we handled. Rows with a chat link are looked up by thread id. Rows without
+    # one (the usual case on instagram.com) are unchanged only if exactly one
+    # watermark with the same name matches the preview; otherwise they count as new.
+    def has_new_activity(self, thread_info):
+        if thread_info["status_initial"] in ("UNREAD", "REQUEST"):
+            return True
+        thread_id = thread_id_from_url(thread_info.get("chat_url"))
+        entries = [self.get(thread_id)] if thread_id else self.by_name(thread_info["name"])
+        matches = [entry for entry in entries if entry and shows_handled(entry, thread_info["message"])]
+        return len(matches) != 1
+
+    # Returns False (nothing recorded) when `chat_url` carries no thread id.
+    def record(self, chat_url, name, message, timestamp, reply=None, outcome=None):
+        thread_id = thread_id_from_url(chat_url)
+        if thread_id is None:
+            return False
+        db = self._connect()
+        db.execute(
+            "INSERT OR REPLACE INTO thread_watermarks "
+            "(thread_id, name, last_message, last_reply, timestamp, chat_url, outcome, handled_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, name, message, reply, timestamp, chat_url, outcome, time.time())
+        )
+        db.commit()
+        return True
+
+    def rows(self):
+        cursor = self._connect().execute(
+            "SELECT thread_id, name, last_message, last_reply, timestamp, chat_url, outcome, handled_at "
+            "FROM thread_watermarks ORDER BY handled_at DESC"
+        )
+        keys = [column[0] for column in cursor.description]
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+    # Drop threads not handled for `max_age_days` and reclaim the file space.
+    def compact(self, max_age_days):
+        db = self._connect()
+        cutoff = time.time() - max_age_days * 86400
+        removed = db.execute(
+            "DELETE FROM thread_watermarks WHERE handled_at IS NULL OR handled_at < ?", (cutoff,)
+        ).rowcount
+        db.commit()
+        db.execute("VACUUM")
+        return removed
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+# === EXPORT / MAINTENANCE ===
+# python thread_state.py ./user_data/instagram_agent/thread_state.sqlite3 [--json | --compact DAYS]
+def print_thread_report(store):
+    rows = store.rows()
+    print(f"=== {len(rows)} threads in {store.path} ===")
+    for row in rows:
+        handled = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["handled_at"])) if row["handled_at"] else "never"
+        print(f"{handled}  {row['name']} ({row['thread_id']}): {row['outcome'] or '-'} | last: {row['last_message'] or '-'}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2:
+        print_thread_report(ThreadStateStore(sys.argv[1]))
+    elif len(sys.argv) == 3 and sys.argv[2] == "--json":
+        print(json.dumps(ThreadStateStore(sys.argv[1]).rows(), indent=2, ensure_ascii=False))
+    elif len(sys.argv) == 4 and sys.argv[2] == "--compact":
+        store = ThreadStateStore(sys.argv[1])
+        removed = store.compact(float(sys.argv[3]))
+        print(f"[🧹] Removed {removed} threads not handled in the last {sys.argv[3]} days; {len(store.rows())} kept.")
+    else:
+        print("Usage: python thread_state.py <thread_state.sqlite3> [--json | --compact DAYS]")
+        sys.exit(1)
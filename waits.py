@@ -0,0 +1,74 @@
+import time
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# === WAIT POLICY ===
+# Condition-based replacements for fixed `page.wait_for_timeout(...)` pauses.
+# Every wait returns as soon as its readiness signal fires, never runs past
+# `ceiling_ms`, never raises on timeout (the caller carries on, exactly like
+# after the old fixed sleep) and logs how long it actually took.
+# The deliberate MIN_DELAY..MAX_DELAY human-like pause is NOT routed through here.
+
+def _log_wait(label, signal, started, ready, ceiling_ms):
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    outcome = "ready" if ready else "ceiling hit"
+    print(f"[⏱️] Wait for {label}: {outcome} after {elapsed_ms:.0f}ms ({signal}, ceiling {ceiling_ms}ms)")
+    return ready
+
+# Wait until `selector` (may be a comma-separated list) reaches `state`.
+async def wait_for_locator(page, selector, ceiling_ms, label="element", state="visible"):
+    started = time.perf_counter()
+    try:
+        await page.locator(selector).first.wait_for(state=state, timeout=ceiling_ms)
+        ready = True
+    except PlaywrightTimeoutError:
+        ready = False
+    return _log_wait(label, "locator", started, ready, ceiling_ms)
+
+# Wait until the page URL satisfies `predicate(url) -> bool`.
+async def wait_for_url(page, predicate, ceiling_ms, label="navigation"):
+    started = time.perf_counter()
+    try:
+        await page.wait_for_url(predicate, timeout=ceiling_ms)
+        ready = True
+    except PlaywrightTimeoutError:
+        ready = False
+    return _log_wait(label, "url", started, ready, ceiling_ms)
+
+async def wait_for_network_idle(page, ceiling_ms, label="network idle"):
+    started = time.perf_counter()
+    try:
+        await page.wait_for_load_state("networkidle", timeout=ceiling_ms)
+        ready = True
+    except PlaywrightTimeoutError:
+        ready = False
+    return _log_wait(label, "networkidle", started, ready, ceiling_ms)
+
+# Resolves once no DOM mutation has happened for `quiet_ms`, or false at the ceiling.
+_DOM_QUIET_JS = """
+([quietMs, ceilingMs]) => new Promise((resolve) => {
+    let quietTimer = null;
+    let ceilingTimer = null;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    const finish = (quiet) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(ceilingTimer);
+        resolve(quiet);
+    };
+    observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    ceilingTimer = setTimeout(() => finish(false), ceilingMs);
+})
+"""
+
+async def wait_for_dom_quiet(page, ceiling_ms, label="DOM to settle", quiet_ms=300):
+    started = time.perf_counter()
+    try:
+        ready = bool(await page.evaluate(_DOM_QUIET_JS, [quiet_ms, ceiling_ms]))
+    except Exception:
+        # The page navigated mid-wait (execution context destroyed); that counts as settled enough.
+        ready = False
+    return _log_wait(label, "dom quiet", started, ready, ceiling_ms)
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+# === RESIDENT WORKER / BATCH RUNNER ===
+# Shared job loops for the `--worker` and `--batch` modes of Facebook.py / Instagram.py
+# and engine.py. The caller (engine.run_jobs / run_mixed_jobs) keeps its browser
+# context(s) open and logged in, and hands us a `handle_job(job) -> dict` coroutine. Jobs arrive as lines of
+# text, either a bare post URL or a JSON object such as:
+#   {"id": "42", "url": "https://www.instagram.com/p/abc/"}
+#   {"action": "messages"}
+#   {"action": "shutdown"}
+# Every job produces one JSON result line.
+
+# Parse one line of job input. Returns None for blank lines and comments.
+def parse_job_line(line):
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if line.startswith("{"):
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("Job must be a JSON object.")
+        return job
+    return {"url": line}
+
+async def run_job(handle_job, job):
+    started = time.perf_counter()
+    try:
+        result = await handle_job(job)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[❌] Job failed: {e}")
+        result = {"status": "error", "error": str(e)}
+    record = {"id": job.get("id"), "action": job.get("action", "post"), "url": job.get("url")}
+    record.update(result or {})
+    record["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return record
+
+def format_result(record):
+    return json.dumps(record, ensure_ascii=False)
+
+async def read_stdin_lines():
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            return
+        yield line
+
+def print_worker_summary(records):
+    ok = sum(1 for r in records if r.get("status") == "done")
+    print(f"[📊] Worker finished {len(records)} jobs ({ok} done, {len(records) - ok} not done).")
+
+# Results go to stdout as bare JSON lines (log lines always start with "[" or spaces).
+async def run_stdin_worker(handle_job):
+    print("[📥] Worker reading jobs from stdin (one URL or JSON object per line, EOF to stop)...")
+    records = []
+    async for line in read_stdin_lines():
+        try:
+            job = parse_job_line(line)
+        except ValueError as e:
+            print(format_result({"status": "rejected", "error": f"Invalid job line: {e}"}), flush=True)
+            continue
+        if job is None:
+            continue
+        if job.get("action") == "shutdown":
+            break
+        record = await run_job(handle_job, job)
+        records.append(record)
+        print(format_result(record), flush=True)
+    print_worker_summary(records)
+    return records
+
+# Each client connection may send any number of job lines and gets one result line per job.
+# Jobs from all connections share the single browser page, so they run one at a time.
+async def run_socket_worker(handle_job, socket_path):
+    lock = asyncio.Lock()
+    stop_event = asyncio.Event()
+    records = []
+
+    async def handle_client(reader, writer):
+        try:
+            while not stop_event.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    job = parse_job_line(line.decode("utf-8"))
+                except ValueError as e:
+                    record = {"status": "rejected", "error": f"Invalid job line: {e}"}
+                else:
+                    if job is None:
+                        continue
+                    if job.get("action") == "shutdown":
+                        stop_event.set()
+                        record = {"action": "shutdown", "status": "done"}
+                    else:
+                        async with lock:
+                            record = await run_job(handle_job, job)
+                        records.append(record)
+                writer.write((format_result(record) + "\n").encode("utf-8"))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = await asyncio.start_unix_server(handle_client, path=socket_path)
+    print(f"[🔌] Worker listening on unix socket {socket_path} (send {{\"action\": \"shutdown\"}} to stop)...")
+    try:
+        await stop_event.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    print_worker_summary(records)
+    return records
+
+async def run_worker(handle_job, socket_path=None):
+    if socket_path:
+        return await run_socket_worker(handle_job, socket_path)
+    return await run_stdin_worker(handle_job)
+
+# === BATCH MODE ===
+# Stream job lines from a manifest file (or stdin when source is "-") so huge
+# manifests are never loaded into memory at once.
+async def read_job_lines(source):
+    if source == "-":
+        async for line in read_stdin_lines():
+            yield line
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            for line in f:
+                yield line
+
+# Parse one manifest line into (job, None), (None, rejected record), or None for blank lines/comments.
+def parse_batch_line(line):
+    try:
+        job = parse_job_line(line)
+    except ValueError as e:
+        return None, {"status": "rejected", "error": f"Invalid job line: {e}", "line": line.strip()}
+    return None if job is None else (job, None)
+
+# With `prefetch`, a reader task stays up to BATCH_PREFETCH_WINDOW lines ahead of
+# the running job and hands every BATCH_PREFETCH_WINDOW upcoming jobs (and the
+# rest at EOF) to `prefetch(jobs)` in a background task. Jobs still run as soon
+# as their line is read, so `--batch -` keeps streaming line by line.
+BATCH_PREFETCH_WINDOW = 10
+
+async def run_prefetch(prefetch, jobs):
+    try:
+        await prefetch(jobs)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[⚠️] Prefetch failed, jobs will run without it: {e}")
+
+async def read_batch_entries(source, prefetch=None):
+    if prefetch is None:
+        async for line in read_job_lines(source):
+            entry = parse_batch_line(line)
+            if entry is not None:
+                yield entry
+        return
+
+    queue = asyncio.Queue(maxsize=BATCH_PREFETCH_WINDOW)
+    prefetch_tasks = set()
+
+    def start_prefetch(jobs):
+        task = asyncio.ensure_future(run_prefetch(prefetch, jobs))
+        prefetch_tasks.add(task)
+        task.add_done_callback(prefetch_tasks.discard)
+
+    async def read_ahead():
+        upcoming = []
+        try:
+            async for line in read_job_lines(source):
+                entry = parse_batch_line(line)
+                if entry is None:
+                    continue
+                if entry[0] is not None:
+                    upcoming.append(entry[0])
+                    if len(upcoming) >= BATCH_PREFETCH_WINDOW:
+                        start_prefetch(upcoming)
+                        upcoming = []
+                await queue.put(entry)
+            if upcoming:
+                start_prefetch(upcoming)
+        except Exception as e:
+            await queue.put(e)  # re-raised in manifest order by the job loop
+            return
+        await queue.put(None)
+
+    reader = asyncio.ensure_future(read_ahead())
+    try:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            if isinstance(entry, Exception):
+                raise entry
+            yield entry
+    finally:
+        # Look-ahead still running after the last job is of no use
+        reader.cancel()
+        for task in list(prefetch_tasks):
+            task.cancel()
+
+async def run_batch(handle_job, source, out_path=None, prefetch=None):
+    out_file = open(out_path, "a", encoding="utf-8") if out_path else None
+    started = time.perf_counter()
+    processed = 0
+    done = 0
+    delay_seconds = 0.0
+    entries = read_batch_entries(source, prefetch)
+    try:
+        async for job, record in entries:
+            if job is not None:
+                record = await run_job(handle_job, job)
+                processed += 1
+                done += record.get("status") == "done"
+                delay_seconds += record.get("delay_s", 0)
+            if out_file:
+                out_file.write(format_result(record) + "\n")
+                out_file.flush()
+            else:
+                print(format_result(record), flush=True)
+    finally:
+        await entries.aclose()
+        if out_file:
+            out_file.close()
+
+    # Throughput excludes the deliberate MIN_DELAY..MAX_DELAY pauses so it reflects our own overhead.
+    elapsed = time.perf_counter() - started
+    active = max(elapsed - delay_seconds, 0.001)
+    print(f"[📊] Batch finished: {processed} jobs ({done} done) in {elapsed:.1f}s, "
+          f"{delay_seconds:.0f}s of it configured delays.")
+    print(f"[⚡] Throughput: {processed / (active / 60):.1f} posts/min excluding delays.")
+    return {"processed": processed, "done": done, "elapsed_s": elapsed, "delay_s": delay_seconds}